@@ -0,0 +1,181 @@
+"""
+Bandwidth cap check: yodo.utils.bandwidth against a local throttled HTTP server.
+
+The media server of benchmarks/throughput.py (MediaHandler, throttled to --server-rate per connection) serves a
+random file, the streams read it through yt-dlp (YoutubeDL.urlopen) with '--limit-rate' set to --cap:
+  streams     --streams parallel streams of one process, with request pacing and the recorder of
+              yodo.utils.replay hooked in as well (all three request hooks at once)
+  processes   one stream in this process and one in a second process, sharing the cap through the state file
+
+Checks that the total rate stays at the cap (the first BURST_SECONDS of the cap may come on top), that parallel
+streams get even shares, that the state file is synced once per quantum rather than once per read, and that the
+recorder saw every byte the streams read. Exits with status 1 if a check fails.
+
+Usage (from the project root):
+  python benchmarks/bandwidth.py [--cap 2M] [--server-rate 8M] [--streams 4] [--seconds 5] [--json results.json]
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from yt_dlp import YoutubeDL
+from yodo.utils import bandwidth, ratelimit, replay
+from yodo.utils.bandwidth import BURST_SECONDS, CHUNK_SIZE, BandwidthLimiter, parse_rate
+from throughput import MediaHandler
+
+# accepted total rate, relative to the cap
+RATE_TOLERANCE = (0.85, 1.10)
+
+# min rate of the slowest parallel stream, relative to the fastest
+MIN_SHARE = 0.7
+
+
+def read_stream(url, seconds, results, index, ready):
+  """
+  Read the URL through yt-dlp for the given time, once all streams are connected (ready barrier).
+  Stores (bytes read, start, end) in results[index].
+  """
+  with YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+    response = ydl.urlopen(url)
+    ready.wait()
+    # wall clock, comparable with the times of the second process
+    start = time.time()
+    end = start + seconds
+    read = 0
+    while time.time() < end:
+      data = response.read(CHUNK_SIZE)
+      if not data:
+        break
+      read += len(data)
+    results[index] = (read, start, time.time())
+    response.close()
+
+
+def run_streams(url, streams, seconds):
+  """Read streams URLs in parallel, returns [(bytes read, start, end)] of the streams."""
+  results = [None] * streams
+  ready = threading.Barrier(streams)
+  threads = [threading.Thread(target=read_stream, args=(url, seconds, results, i, ready)) for i in range(streams)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return results
+
+
+def total_rate(results):
+  """Bytes per second of the streams, from the first read to the last."""
+  return sum(read for read, _, _ in results) / (max(end for *_, end in results) - min(start for _, start, _ in results))
+
+
+def count_syncs(limiter):
+  """Count the syncs of the limiter with the shared state file."""
+  syncs = []
+  original = limiter._sync
+
+  def sync(used, now):
+    syncs.append(used)
+    return original(used, now)
+
+  limiter._sync = sync
+  return syncs
+
+
+def child(url, state_file, cap, seconds):
+  """Second process of the 'processes' check, prints (bytes read, start, end) as JSON."""
+  bandwidth.install(BandwidthLimiter(cap, state_file))
+  print(json.dumps(run_streams(url, 1, seconds)[0]))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--cap", default="2M", help="bandwidth cap of the streams, bytes/s (default: 2M)")
+  parser.add_argument("--server-rate", default="8M", help="server throttle per connection, bytes/s (default: 8M)")
+  parser.add_argument("--streams", type=int, default=4, help="parallel streams (default: 4)")
+  parser.add_argument("--seconds", type=float, default=5.0, help="reading time per check (default: 5)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  parser.add_argument("--child", nargs=2, metavar=("URL", "STATE_FILE"), help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  cap = parse_rate(args.cap)
+  if args.child:
+    child(*args.child, cap, args.seconds)
+    return 0
+
+  checks = []
+  results = {"cap": cap}
+  with tempfile.TemporaryDirectory(prefix="yodo-bench-") as tmp:
+    # more than any stream can read at the server rate
+    size = int(parse_rate(args.server_rate) * args.seconds * 1.5)
+    with open(os.path.join(tmp, "media.bin"), "wb") as f:
+      f.write(os.urandom(size))
+    MediaHandler.throttle = parse_rate(args.server_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(MediaHandler, directory=tmp))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/media.bin"
+    state_file = os.path.join(tmp, "bandwidth")
+    low, high = RATE_TOLERANCE
+    max_rate = cap * (high + BURST_SECONDS / args.seconds)
+
+    # parallel streams of one process, all request hooks installed
+    limiter = BandwidthLimiter(cap, state_file)
+    syncs = count_syncs(limiter)
+    recorder = replay.Recorder()
+    replay.install(recorder)
+    ratelimit.install(ratelimit.RateLimiter(state_dir=os.path.join(tmp, "ratelimit")))
+    bandwidth.install(limiter)
+    streams = run_streams(url, args.streams, args.seconds)
+    replay.install(None)
+    sizes, rate = [read for read, _, _ in streams], total_rate(streams)
+    recorded = sum(len(exchange.get("_body") or b"") for exchange in recorder.exchanges)
+    max_syncs = sum(sizes) // limiter.quantum + 2
+    results["streams"] = {"bytes": sizes, "rate": rate, "syncs": len(syncs), "recorded": recorded}
+    checks += [
+      (f"{args.streams} streams: {rate / 1024 / 1024:.2f} MiB/s (cap {cap / 1024 / 1024:.2f} MiB/s)",
+        cap * low <= rate <= max_rate),
+      (f"{args.streams} streams: slowest/fastest share {min(sizes) / max(max(sizes), 1):.2f}",
+        min(sizes) >= MIN_SHARE * max(sizes)),
+      (f"{args.streams} streams: {len(syncs)} state file syncs for {sum(sizes) // CHUNK_SIZE} reads (max {max_syncs})",
+        len(syncs) <= max_syncs),
+      (f"{args.streams} streams: recorder saw {recorded} of {sum(sizes)} bytes", recorded == sum(sizes)),
+    ]
+
+    # two processes sharing the cap (the second one starts with its own burst)
+    bandwidth.install(BandwidthLimiter(cap, state_file))
+    command = [sys.executable, os.path.abspath(__file__), "--child", url, state_file, "--cap", str(cap), "--seconds", str(args.seconds)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=PROJECT_ROOT)
+    streams = run_streams(url, 1, args.seconds)
+    streams.append(tuple(json.loads(process.communicate()[0])))
+    rate = total_rate(streams)
+    results["processes"] = {"bytes": [read for read, _, _ in streams], "rate": rate}
+    checks.append((
+      f"2 processes: {rate / 1024 / 1024:.2f} MiB/s (cap {cap / 1024 / 1024:.2f} MiB/s)",
+      cap * low <= rate <= max_rate + cap * BURST_SECONDS / args.seconds
+    ))
+    server.shutdown()
+
+  for label, ok in checks:
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+  if args.json:
+    results["checks"] = [{"check": label, "ok": ok} for label, ok in checks]
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(results, f, indent=2)
+
+  return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Extraction benchmark and regression check on recorded fixtures (offline, deterministic).
+
+A fixture bundle (see yodo.utils.replay) holds the HTTP exchanges of one live extraction, its final info dict and
+the results YODO derived from it:
+  sizes    estimated size of every choice (options_file_size of fetch_details())
+  details  format attributes of every choice (options_details of fetch_details())
+  render   lines choice_input_handler() prints for every choice (options list and arguments overview, no colors)
+
+Subcommands:
+  record URL [URL ...]  extract live with the recorder installed, write one bundle per URL to --fixtures
+  check                 replay every bundle and compare the results with the recorded ones (exit status 1 on a
+                        difference), --update stores the new results instead
+  bench                 replay every bundle --runs times and report the median of
+                          extract  fetch_details() from the recorded exchanges (yt-dlp extraction, size probing,
+                                   format selection and pricing)
+                          select   fetch_details() on the recorded info dict (format index and pricing only)
+                          render   choice_input_handler() for every choice
+
+The yt-dlp cache (player scripts etc) is emptied before every extraction and the terminal is 80 columns wide, so a
+replay sends the same requests and renders the same text as the recording.
+
+Usage (from the project root):
+  python benchmarks/extraction.py record https://www.youtube.com/watch?v=... [--name youtube-many-formats]
+  python benchmarks/extraction.py check [--update]
+  python benchmarks/extraction.py bench [--runs 20] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import copy
+import difflib
+import glob
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_FIXTURES = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures")
+CHOICES = ("low", "medium", "high", "audio")
+METRICS = ("extract", "select", "render")
+
+# yt-dlp's cache of this process (emptied before every extraction)
+CACHE_DIR = tempfile.mkdtemp(prefix="yodo-extraction-")
+os.environ["XDG_CACHE_HOME"] = CACHE_DIR
+os.environ["COLUMNS"] = "80"
+os.environ["LINES"] = "24"
+
+from yodo.utils.replay import Recorder, Replayer, install, load_bundle, save_bundle, write_bundle
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_NAME_RE = re.compile(r"[^a-z0-9]+")
+
+
+def load_yodo():
+  """
+  Import yodo.main with the names its __main__ block imports, set up like a batch item: no loader animation,
+  no info cache, failures raise ItemFailed.
+  """
+  import shlex
+  import unicodedata
+  from threading import Thread
+  from urllib.parse import urlparse
+
+  from yt_dlp import YoutubeDL
+  from yt_dlp.utils import ReExtractInfo, DownloadError
+  from yt_dlp.utils import sanitize_filename as _ytdlp_sanitize
+
+  import yodo.main as yodo
+  from yodo.utils import yodo_documentation
+  from yodo.utils.format_index import FormatIndex
+  from yodo.utils.info_cache import InfoCache
+  from yodo.utils.playlist import is_playlist
+  from yodo.utils.size_probe import formats_to_probe, probe_sizes
+  from yodo.utils.terminal_utils import center_title, print_crossline
+
+  names = {name: value for name, value in vars(yodo_documentation).items() if not name.startswith("_")}
+  names.update(
+    re=re, shlex=shlex, unicodedata=unicodedata, urlparse=urlparse, Thread=Thread,
+    YoutubeDL=YoutubeDL, _ytdlp_sanitize=_ytdlp_sanitize, ReExtractInfo=ReExtractInfo, DownloadError=DownloadError,
+    print_crossline=print_crossline, center_title=center_title, InfoCache=InfoCache, FormatIndex=FormatIndex,
+    formats_to_probe=formats_to_probe, probe_sizes=probe_sizes, is_playlist=is_playlist,
+  )
+  vars(yodo).update(names)
+  yodo.BATCH = "-"
+  yodo.NO_CACHE = True
+  return yodo
+
+
+def clear_cache():
+  shutil.rmtree(CACHE_DIR, ignore_errors=True)
+  os.makedirs(CACHE_DIR)
+
+
+def extract(yodo, url, info=None):
+  """fetch_details() with its output discarded, returns (sizes, details, info)."""
+  if info is None:
+    clear_cache()
+  with contextlib.redirect_stdout(io.StringIO()):
+    return yodo.fetch_details(url, dict(yodo.CHOICE_FORMATS), info)
+
+
+def render(yodo, sizes, details, info, choice):
+  """Output of choice_input_handler() answering choice at the prompt (and 'cancel' if it isn't available)."""
+  answers = iter((choice, "cancel"))
+  yodo.prompt_screen = lambda hints=None: next(answers)
+  yodo.FINAL_FILENAME = yodo.sanitize_filename(info.get("title") or "")
+  output = io.StringIO()
+  with contextlib.redirect_stdout(output):
+    try:
+      yodo.choice_input_handler(sizes, details, yodo.build_completion_hints(info, dict(yodo.CHOICE_FORMATS)))
+    except SystemExit:
+      pass
+  return output.getvalue()
+
+
+def results(yodo, sizes, details, info):
+  """The recorded/compared results of an extraction (see module docstring)."""
+  return {
+    "sizes": {choice: _ANSI_RE.sub("", size) if size else size for choice, size in sizes.items()},
+    "details": details,
+    # lines, so a difference shows up as a line diff
+    "render": {choice: _ANSI_RE.sub("", render(yodo, sizes, details, info, choice)).splitlines() for choice in CHOICES},
+  }
+
+
+def fixture_name(info):
+  return _NAME_RE.sub("-", f"{info.get('extractor_key') or 'media'}-{info.get('id') or 'unknown'}".lower()).strip("-")
+
+
+def fixture_paths(fixtures):
+  paths = sorted(glob.glob(os.path.join(fixtures, "*.json.gz")))
+  if not paths:
+    sys.exit(f"no fixtures in {fixtures} (record some first)")
+  return paths
+
+
+def replayed(yodo, bundle):
+  """Extract the bundle's URL from its exchanges, returns (sizes, details, info, misses)."""
+  replayer = Replayer(bundle["exchanges"])
+  install(replayer)
+  try:
+    sizes, details, info = extract(yodo, bundle["url"])
+  finally:
+    install(None)
+  return sizes, details, info, replayer.misses
+
+
+def command_record(yodo, args):
+  failed = 0
+  for url in args.urls:
+    recorder = Recorder()
+    install(recorder)
+    try:
+      sizes, details, info = extract(yodo, url)
+    except yodo.ItemFailed as e:
+      print(f"{url}: {e}")
+      failed += 1
+      continue
+    finally:
+      install(None)
+    if sizes is None:
+      print(f"{url}: playlists can't be recorded, record their entries")
+      failed += 1
+      continue
+    name = args.name if args.name and len(args.urls) == 1 else fixture_name(info)
+    path = os.path.join(args.fixtures, f"{name}.json.gz")
+    exchanges = recorder.recorded()
+    save_bundle(path, url, exchanges, info, expected=results(yodo, sizes, details, info))
+    print(f"{path}: {len(exchanges)} requests, {len(info.get('formats') or ())} formats")
+  return 1 if failed else 0
+
+
+def command_check(yodo, args):
+  changed = 0
+  for path in fixture_paths(args.fixtures):
+    name = os.path.basename(path)
+    bundle = load_bundle(path)
+    try:
+      sizes, details, info, misses = replayed(yodo, bundle)
+    except yodo.ItemFailed as e:
+      print(f"FAIL {name}: {e}")
+      changed += 1
+      continue
+    for miss in misses:
+      print(f"     {name}: not recorded: {miss}")
+    got = results(yodo, sizes, details, info)
+    if got == bundle.get("expected"):
+      print(f"ok   {name}")
+      continue
+    if args.update:
+      bundle["expected"] = got
+      write_bundle(path, bundle)
+      print(f"upd  {name}")
+      continue
+    changed += 1
+    print(f"DIFF {name}")
+    expected = json.dumps(bundle.get("expected"), indent=1, ensure_ascii=False).splitlines()
+    actual = json.dumps(got, indent=1, ensure_ascii=False).splitlines()
+    sys.stdout.writelines(f"  {line}\n" for line in difflib.unified_diff(expected, actual, "recorded", "replayed", lineterm=""))
+  return 1 if changed else 0
+
+
+def timed(func, *args):
+  start = time.perf_counter()
+  func(*args)
+  return time.perf_counter() - start
+
+
+def measure(yodo, bundle, runs):
+  """Median seconds of every metric over runs."""
+  samples = {metric: [] for metric in METRICS}
+  sizes, details, info, misses = replayed(yodo, bundle)
+  if misses:
+    print(f"  warning: {len(misses)} requests not recorded, e.g. {misses[0]}")
+  for _ in range(runs):
+    replayer = Replayer(bundle["exchanges"])
+    install(replayer)
+    try:
+      samples["extract"].append(timed(extract, yodo, bundle["url"]))
+    finally:
+      install(None)
+    recorded_info = copy.deepcopy(bundle["info"])
+    samples["select"].append(timed(extract, yodo, bundle["url"], recorded_info))
+    samples["render"].append(timed(lambda: [render(yodo, sizes, details, info, choice) for choice in CHOICES]))
+  return {metric: statistics.median(values) for metric, values in samples.items()}
+
+
+def format_row(label, formats, metrics):
+  return (
+    f"{label:<40}{formats:>8}{metrics['extract'] * 1000:>10.1f}ms{metrics['select'] * 1000:>9.1f}ms"
+    f"{metrics['render'] * 1000:>9.1f}ms"
+  )
+
+
+def compare(rows, baseline_path):
+  """Print the change of every metric against an earlier --json file."""
+  with open(baseline_path, "r", encoding="utf-8") as f:
+    baseline = {r["fixture"]: r["metrics"] for r in json.load(f)["results"]}
+  print(f"\nchange against {baseline_path} (lower is better)")
+  for row in rows:
+    before = baseline.get(row["fixture"])
+    if not before:
+      continue
+    changes = "  ".join(
+      f"{metric} {(row['metrics'][metric] - before[metric]) * 100 / before[metric]:+6.1f}%"
+      for metric in METRICS if before.get(metric)
+    )
+    print(f"{row['fixture']:<40}{changes}")
+
+
+def git_commit():
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def command_bench(yodo, args):
+  rows = []
+  print(f"{'fixture':<40}{'formats':>8}{'extract':>12}{'select':>11}{'render':>11}")
+  for path in fixture_paths(args.fixtures):
+    name = os.path.basename(path)[:-len(".json.gz")]
+    bundle = load_bundle(path)
+    try:
+      metrics = measure(yodo, bundle, args.runs)
+    except yodo.ItemFailed as e:
+      print(f"{name:<40}{'failed: ' + str(e)}")
+      continue
+    formats = len(bundle["info"].get("formats") or ())
+    rows.append({"fixture": name, "formats": formats, "metrics": metrics})
+    print(format_row(name, formats, metrics))
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({
+        "commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"runs": args.runs, "python": sys.version.split()[0]}, "results": rows,
+      }, f, indent=2)
+  if args.compare:
+    compare(rows, args.compare)
+  return 0
+
+
+def main():
+  common = argparse.ArgumentParser(add_help=False)
+  common.add_argument("--fixtures", metavar="DIR", default=DEFAULT_FIXTURES, help="fixture directory (default: benchmarks/fixtures)")
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  commands = parser.add_subparsers(dest="command", required=True)
+  record = commands.add_parser("record", parents=[common], help="record live extractions")
+  record.add_argument("urls", nargs="+", metavar="URL")
+  record.add_argument("--name", help="fixture name of a single URL (default: <extractor>-<id>)")
+  check = commands.add_parser("check", parents=[common], help="compare replayed results with the recorded ones")
+  check.add_argument("--update", action="store_true", help="store the replayed results as the expected ones")
+  bench = commands.add_parser("bench", parents=[common], help="time extraction, format selection and rendering")
+  bench.add_argument("--runs", type=int, default=10, help="runs per fixture (default: 10)")
+  bench.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  bench.add_argument("--compare", metavar="PATH", help="compare with the results of an earlier --json run")
+  args = parser.parse_args()
+
+  yodo = load_yodo()
+  command = {"record": command_record, "check": command_check, "bench": command_bench}[args.command]
+  try:
+    return command(yodo, args)
+  finally:
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Postprocessing benchmark: bytes read/written and time of a video's postprocessing.
+
+Compares yt-dlp's chain of postprocessors (FFmpegVideoRemuxer, FFmpegThumbnailsConvertor, EmbedThumbnail,
+FFmpegMetadata, one full copy of the file each) with the single pass plan of yodo.utils.postprocess.
+A synthetic download (video, thumbnail, subtitles, chapters) is generated with ffmpeg for every run, either
+one file or separate video and audio formats (merged first, like yt-dlp does after the download).
+
+I/O is read from /proc/self/io, which includes the ffmpeg processes once they are reaped (Linux only).
+The median of --runs is reported.
+
+Usage (from the project root):
+  python benchmarks/postprocess_io.py [--seconds 60] [--runs 3] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from yt_dlp import YoutubeDL
+from yt_dlp.postprocessor import FFmpegMergerPP
+from yodo.utils.postprocess import plan
+
+# (downloaded file(s), chosen format)
+SCENARIOS = (
+  ("mp4+m4a", "mp4"), # separate video and audio formats (most YouTube downloads)
+  ("mp4+m4a", "mkv"),
+  ("mkv", "mp4"), # remux
+  ("mp4", "mp4"), # container already matches
+)
+
+ATTRIBUTES = {
+  "thumbnail": {"enabled": True, "ext": "jpg"},
+  "metadata": True,
+  "subtitles": {"enabled": True, "lang": "en", "subtitlesformat": "srt"},
+}
+
+
+def chain_opts(attributes):
+  """The postprocessors the video path queued before the planner (merged formats: yt-dlp's merge container)."""
+  return {
+    "postprocessors": [
+      {"key": "FFmpegVideoRemuxer", "preferedformat": attributes["format"]},
+      {"key": "FFmpegThumbnailsConvertor", "format": attributes["thumbnail"]["ext"]},
+      {"key": "EmbedThumbnail"},
+      {"key": "FFmpegMetadata"},
+    ]
+  }
+
+
+def io_counters():
+  counters = {}
+  with open("/proc/self/io", "r") as f:
+    for line in f:
+      key, _, value = line.partition(":")
+      counters[key] = int(value)
+  return counters["rchar"], counters["wchar"]
+
+
+def make_source(directory, seconds):
+  """Synthetic media (mpeg4/aac at a high bitrate), png thumbnail and srt subtitles, in the order of a download."""
+  src = os.path.join(directory, "source.mkv")
+  subprocess.run(
+    [
+      "ffmpeg", "-v", "error", "-y",
+      "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30",
+      "-f", "lavfi", "-i", "sine=frequency=440",
+      "-t", str(seconds), "-c:v", "mpeg4", "-q:v", "2", "-c:a", "aac", src
+    ],
+    check=True
+  )
+  subprocess.run(
+    ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "testsrc2=size=1280x720", "-frames:v", "1",
+     os.path.join(directory, "thumb.png")],
+    check=True
+  )
+  with open(os.path.join(directory, "subs.srt"), "w", encoding="utf-8") as f:
+    f.write("1\n00:00:01,000 --> 00:00:04,000\nHello\n")
+  return src
+
+
+def copy_streams(source, path, *opts):
+  subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", source, *opts, "-c", "copy", path], check=True)
+
+
+def run_once(source_dir, seconds, download, opts, work_dir):
+  """
+  Copy the synthetic download to work_dir as Clip.<ext> (or Clip.f1.<ext> + Clip.f2.<ext>) and postprocess it.
+
+  Returns:
+    tuple: (seconds, bytes read, bytes written)
+  """
+  shutil.rmtree(work_dir, ignore_errors=True)
+  os.makedirs(work_dir)
+  source = os.path.join(source_dir, "source.mkv")
+  extra = {}
+  if "+" in download:
+    video_ext, audio_ext = download.split("+")
+    # yt-dlp merges into mp4 if both formats fit in it, else mkv (unless 'merge_output_format' says otherwise)
+    source_ext = opts.get("merge_output_format") or ("mp4" if {video_ext, audio_ext} <= {"mp4", "m4a"} else "mkv")
+    video = os.path.join(work_dir, f"Clip.f1.{video_ext}")
+    audio = os.path.join(work_dir, f"Clip.f2.{audio_ext}")
+    copy_streams(source, video, "-an")
+    copy_streams(source, audio, "-vn")
+    formats = [
+      {"format_id": "1", "url": "https://example.com/1", "ext": video_ext, "vcodec": "mpeg4", "acodec": "none", "protocol": "https", "filepath": video},
+      {"format_id": "2", "url": "https://example.com/2", "ext": audio_ext, "vcodec": "none", "acodec": "aac", "protocol": "https", "filepath": audio},
+    ]
+    extra = {"requested_formats": formats, "__files_to_merge": [video, audio]}
+    media = os.path.join(work_dir, f"Clip.{source_ext}")
+  else:
+    source_ext = download
+    media = os.path.join(work_dir, f"Clip.{source_ext}")
+    copy_streams(source, media)
+  thumb = os.path.join(work_dir, "Clip.png")
+  subs = os.path.join(work_dir, "Clip.en.srt")
+  shutil.copy(os.path.join(source_dir, "thumb.png"), thumb)
+  shutil.copy(os.path.join(source_dir, "subs.srt"), subs)
+
+  info = {
+    "id": "bench", "title": "Clip", "ext": source_ext, "filepath": media,
+    "uploader": "YODO", "upload_date": "20240101", "webpage_url": "https://example.com/watch?v=bench",
+    "description": "benchmark", "vcodec": "mpeg4", "acodec": "aac", "duration": seconds,
+    "thumbnails": [{"url": "https://example.com/thumb.png", "filepath": thumb}],
+    "requested_subtitles": {"en": {"ext": "srt", "filepath": subs}},
+    "chapters": [{"start_time": 0, "end_time": seconds / 2, "title": "One"},
+                 {"start_time": seconds / 2, "end_time": seconds, "title": "Two"}],
+    **extra,
+  }
+  with YoutubeDL({**opts, "quiet": True, "no_warnings": True}) as ydl:
+    if extra:
+      info["__postprocessors"] = [FFmpegMergerPP(ydl)]
+    read, written = io_counters()
+    start = time.perf_counter()
+    ydl.post_process(media, info, {thumb: thumb, subs: subs})
+    elapsed = time.perf_counter() - start
+    read_after, written_after = io_counters()
+  return elapsed, read_after - read, written_after - written
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--seconds", type=int, default=60, help="length of the synthetic video (default: 60)")
+  parser.add_argument("--runs", type=int, default=3, help="runs per measurement (default: 3)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  args = parser.parse_args()
+
+  if not shutil.which("ffmpeg"):
+    sys.exit("ffmpeg is required")
+
+  mib = 1024 * 1024
+  results = []
+  with tempfile.TemporaryDirectory(prefix="yodo-bench-") as tmp:
+    make_source(tmp, args.seconds)
+    size = os.path.getsize(os.path.join(tmp, "source.mkv"))
+    print(f"synthetic download: {size / mib:.1f} MiB, {args.seconds}s\n")
+    print(f"{'download → format':<20}{'':<8}{'read':>10}{'written':>10}{'time':>9}")
+    for download, target_ext in SCENARIOS:
+      attributes = {**ATTRIBUTES, "format": target_ext}
+      row = {"download": download, "target": target_ext, "size": size}
+      for name, opts in (("chain", chain_opts(attributes)), ("planned", plan(attributes))):
+        samples = [
+          run_once(tmp, args.seconds, download, opts, os.path.join(tmp, "work"))
+          for _ in range(args.runs)
+        ]
+        elapsed, read, written = (statistics.median(values) for values in zip(*samples))
+        row[name] = {"seconds": elapsed, "read": read, "written": written}
+        label = f"{download} → {target_ext}" if name == "chain" else ""
+        print(f"{label:<20}{name:<8}{read / mib:>8.1f}Mi{written / mib:>8.1f}Mi{elapsed:>8.2f}s")
+      chain, planned = row["chain"], row["planned"]
+      print(
+        f"{'':<20}{'saved':<8}{(chain['read'] + chain['written']) / max(1, planned['read'] + planned['written']):>9.1f}x"
+        f"{'':>10}{chain['seconds'] / max(planned['seconds'], 1e-9):>8.1f}x\n"
+      )
+      results.append(row)
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+  main()
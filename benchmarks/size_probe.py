@@ -0,0 +1,171 @@
+"""
+Size probing check: yodo.utils.size_probe against a local HTTP stand-in server.
+
+The server answers like the CDNs YODO probes:
+  /head      HEAD with Content-Length
+  /range     HEAD refused (405), 'Range: bytes=0-0' answered with Content-Range
+  /nosize    neither Content-Length on HEAD nor a range answer (stays unknown)
+  /slow      HEAD answered after --slow seconds (past the deadline, stays unknown)
+
+Checks that the learned sizes are written back into the format dicts ('filesize'), that probe_sizes() returns
+within the deadline although /slow is still pending, and that the YoutubeDL created by probe_sizes() is closed
+once the late probe is finished. A second round passes a caller's YoutubeDL (with an extra header) and closes it
+as soon as probe_sizes() returns, like fetch_details() does: every probe has to carry the header and the late
+probe must not use the closed instance. Exits with status 1 if a check fails.
+
+Usage (from the project root):
+  python benchmarks/size_probe.py [--deadline 1.0] [--slow 3.0] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import yt_dlp
+from yodo.utils.size_probe import probe_sizes
+
+HEAD_SIZE = 12_345_678
+
+# header of the caller's YoutubeDL, the probes must send it
+CALLER_HEADER = "X-Yodo-Caller"
+RANGE_SIZE = 98_765_432
+
+# time probe_sizes() may take past its deadline (thread pool start, result collection)
+DEADLINE_SLACK = 0.25
+
+
+class ProbeHandler(BaseHTTPRequestHandler):
+  """CDN stand-in, the answer depends on the path (see the module docstring)."""
+
+  slow = 3.0
+  # (path, value of CALLER_HEADER) of every request
+  requests = []
+
+  def log_message(self, *args):
+    pass
+
+  def do_HEAD(self):
+    self.requests.append((self.path, self.headers.get(CALLER_HEADER)))
+    if self.path == "/slow":
+      time.sleep(self.slow)
+    if self.path in ("/range", "/nosize"):
+      self.send_response(405)
+      self.send_header("Content-Length", "0")
+      self.end_headers()
+      return
+    self.send_response(200)
+    self.send_header("Content-Length", str(HEAD_SIZE))
+    self.end_headers()
+
+  def do_GET(self):
+    self.requests.append((self.path, self.headers.get(CALLER_HEADER)))
+    if self.path == "/range" and self.headers.get("Range") == "bytes=0-0":
+      self.send_response(206)
+      self.send_header("Content-Range", f"bytes 0-0/{RANGE_SIZE}")
+      self.send_header("Content-Length", "1")
+      self.end_headers()
+      self.wfile.write(b"\0")
+      return
+    self.send_response(200)
+    self.send_header("Content-Length", "0")
+    self.end_headers()
+
+
+def count_closes():
+  """Record the YoutubeDL instances closed by YoutubeDL.close() (the only instances are the probe's and the caller's)."""
+  closed = []
+  original = yt_dlp.YoutubeDL.close
+
+  def close(self):
+    closed.append(self)
+    return original(self)
+
+  yt_dlp.YoutubeDL.close = close
+  return closed
+
+
+def wait_for_close(closed, count, seconds):
+  """Wait until count instances are closed (the probe's own one after the late /slow probe)."""
+  wait_until = time.monotonic() + seconds
+  while len(closed) < count and time.monotonic() < wait_until:
+    time.sleep(0.05)
+
+
+def probe_round(base, deadline, ydl=None):
+  """probe_sizes() on fresh format dicts of the four paths, returns (formats, probed, elapsed)."""
+  formats = [
+    {"format_id": name, "url": f"{base}/{name}", "protocol": "http"}
+    for name in ("head", "range", "nosize", "slow")
+  ]
+  start = time.monotonic()
+  probed = probe_sizes(formats, ydl, deadline=deadline)
+  return formats, probed, time.monotonic() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--deadline", type=float, default=1.0, help="probe deadline in seconds (default: 1.0)")
+  parser.add_argument("--slow", type=float, default=3.0, help="answer delay of /slow in seconds (default: 3.0)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  args = parser.parse_args()
+
+  ProbeHandler.slow = args.slow
+  server = ThreadingHTTPServer(("127.0.0.1", 0), ProbeHandler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  base = f"http://127.0.0.1:{server.server_port}"
+
+  expected = {"head": HEAD_SIZE, "range": RANGE_SIZE, "nosize": None, "slow": None}
+  closed = count_closes()
+  checks = []
+
+  # own instance
+  formats, probed, elapsed = probe_round(base, args.deadline)
+  closed_at_return = len(closed)
+  wait_for_close(closed, 1, args.slow + 2)
+  for f in formats:
+    size = f.get("filesize")
+    checks.append((f"{f['format_id']:<7} filesize {size}", size == expected[f["format_id"]]))
+  checks.append((f"returned {probed}", probed == {k: v for k, v in expected.items() if v}))
+  checks.append((f"took {elapsed:.2f}s (deadline {args.deadline:.2f}s)", elapsed <= args.deadline + DEADLINE_SLACK))
+  checks.append(("YoutubeDL still open while /slow is pending", closed_at_return == 0))
+  checks.append((f"YoutubeDL closed after the late probe ({len(closed)}x)", len(closed) == 1))
+  results = {"elapsed_s": elapsed, "deadline_s": args.deadline, "probed": probed}
+
+  # caller's instance, closed right after probe_sizes() returned
+  del closed[:], ProbeHandler.requests[:]
+  caller = yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True, "http_headers": {CALLER_HEADER: "1"}})
+  formats, probed, elapsed = probe_round(base, args.deadline, caller)
+  caller.close()
+  wait_for_close(closed, 2, args.slow + 2)
+  late = [path for path, _ in ProbeHandler.requests if path == "/slow"]
+  checks.append((f"caller's YoutubeDL: returned {probed}", probed == {k: v for k, v in expected.items() if v}))
+  checks.append((
+    f"caller's YoutubeDL: header sent with {sum(1 for _, value in ProbeHandler.requests if value)} of {len(ProbeHandler.requests)} requests",
+    all(value == "1" for _, value in ProbeHandler.requests)
+  ))
+  checks.append((
+    f"caller's YoutubeDL: late probe on the probe's own instance ({len(late)} /slow requests, {len(closed)} closes)",
+    len(late) >= 1 and len(closed) == 2 and closed[0] is caller and closed[1] is not caller
+  ))
+  server.shutdown()
+
+  for label, ok in checks:
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      results["checks"] = [{"check": label, "ok": ok} for label, ok in checks]
+      json.dump(results, f, indent=2)
+
+  return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Speculative download check: yodo.utils.speculative against a local two-format server.
+
+The server (MediaHandler of benchmarks/throughput.py) serves a video-only and an audio-only file, the info dict
+lists them as two formats and is processed with a video+audio selection, like the media_info of fetch_details().
+The speculative download of the 'high' choice is started on main.unselect_formats() of it.
+
+Checks that the audio stream is staged completely, that only the audio file was requested (no URL left over from
+the earlier selection) and that adopt() moves the staged stream to the name yt-dlp uses for it in the final
+video+audio download. Exits with status 1 if a check fails.
+
+Usage (from the project root):
+  python benchmarks/speculative.py [--size 2M] [--json results.json]
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from yt_dlp import YoutubeDL
+from yodo.main import unselect_formats
+from yodo.utils import speculative
+from yodo.utils.bandwidth import parse_rate
+from throughput import MediaHandler
+
+SELECTOR = "bv+ba"
+
+# seconds to wait for the staged stream
+TIMEOUT = 30
+
+
+class RecordingHandler(MediaHandler):
+  """MediaHandler that records the requested paths."""
+
+  paths = []
+
+  def _serve(self, body):
+    self.paths.append(self.path)
+    super()._serve(body)
+
+
+def media_info(base, sizes):
+  """Info dict of the two files, processed with SELECTOR (the selection fetch_details() leaves on it)."""
+  info = {
+    "id": "speculative",
+    "title": "Speculative",
+    "extractor": "generic",
+    "extractor_key": "Generic",
+    "webpage_url": f"{base}/",
+    "formats": [
+      {"format_id": "v", "url": f"{base}/v.mp4", "ext": "mp4", "protocol": "http",
+        "vcodec": "avc1.64001f", "acodec": "none", "height": 720, "filesize": sizes["v.mp4"]},
+      {"format_id": "a", "url": f"{base}/a.m4a", "ext": "m4a", "protocol": "http",
+        "vcodec": "none", "acodec": "mp4a.40.2", "abr": 128, "filesize": sizes["a.m4a"]},
+    ],
+  }
+  with YoutubeDL({"quiet": True, "no_warnings": True, "format": SELECTOR}) as ydl:
+    return ydl.process_ie_result(info, download=False)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--size", default="2M", help="size of each file, bytes (default: 2M)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  args = parser.parse_args()
+
+  checks = []
+  with tempfile.TemporaryDirectory(prefix="yodo-bench-") as tmp:
+    served = os.path.join(tmp, "served")
+    os.makedirs(served)
+    sizes = {}
+    for name in ("v.mp4", "a.m4a"):
+      sizes[name] = parse_rate(args.size)
+      with open(os.path.join(served, name), "wb") as f:
+        f.write(os.urandom(sizes[name]))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(RecordingHandler, directory=served))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    speculative.STAGING_BASE = os.path.join(tmp, "staging")
+
+    info = media_info(base, sizes)
+    options = {choice: SELECTOR for choice in speculative.CHOICES}
+    download = speculative.start_speculative_download(unselect_formats(info), options, "high")
+    checks.append((f"started: format {download and download.format_id}", download is not None and download.format_id == "a"))
+
+    if download:
+      download._thread.join(timeout=TIMEOUT)
+      staged = os.path.getsize(download.staged_path) if os.path.exists(download.staged_path) else None
+      checks.append((f"staged {staged} of {sizes['a.m4a']} bytes", download.finished and staged == sizes["a.m4a"]))
+      paths = sorted(set(RecordingHandler.paths))
+      checks.append((f"requested {paths}", paths == ["/a.m4a"]))
+
+      outtmpl = os.path.join(tmp, "out", "%(title)s.%(ext)s")
+      with YoutubeDL({"quiet": True, "no_warnings": True, "format": SELECTOR, "outtmpl": outtmpl}) as ydl:
+        reused = download.adopt(ydl, info, SELECTOR)
+      target = os.path.join(tmp, "out", "Speculative.fa.m4a")
+      checks.append((f"adopted as {os.path.basename(target)}", reused and os.path.getsize(target) == sizes["a.m4a"]))
+    server.shutdown()
+
+  for label, ok in checks:
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"checks": [{"check": label, "ok": ok} for label, ok in checks]}, f, indent=2)
+
+  return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Startup benchmark: extractor import time per site.
+
+Compares the old preload (always importing yt_dlp.extractor.youtube) with URL-driven pre-resolution
+(importing only the extractor module the domain index resolves for the URL).
+Every measurement runs in a fresh Python process, the median of --runs is reported.
+
+Usage (from the project root):
+  python benchmarks/startup_imports.py [--runs 7] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from yodo.utils.extractor_index import resolve_extractor_modules
+
+SITES = {
+  "YouTube": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+  "YouTube (short)": "https://youtu.be/dQw4w9WgXcQ",
+  "Instagram": "https://www.instagram.com/reel/C0000000000/",
+  "TikTok": "https://www.tiktok.com/@user/video/7000000000000000000",
+  "SoundCloud": "https://soundcloud.com/artist/track",
+  "Vimeo": "https://vimeo.com/76979871",
+  "X / Twitter": "https://x.com/user/status/1000000000000000000",
+  "Facebook": "https://www.facebook.com/watch/?v=1000000000000000",
+  "Direct link": "https://media.example.com/clip.mp4",
+}
+
+# yt-dlp modules of yodo.main.PRELOAD_MODULES
+BASE_MODULES = ("yt_dlp", "yt_dlp.utils", "yt_dlp.extractor.common")
+
+# preload set used before URL-driven pre-resolution
+OLD_MODULES = (*BASE_MODULES, "yt_dlp.extractor.youtube")
+
+_TIMER = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for module in sys.argv[1:]:
+  importlib.import_module(module)
+print(json.dumps(time.perf_counter() - start))
+"""
+
+
+def time_imports(modules, runs):
+  samples = []
+  for _ in range(runs):
+    out = subprocess.run(
+      [sys.executable, "-c", _TIMER, *modules],
+      capture_output=True, text=True, check=True, cwd=PROJECT_ROOT
+    ).stdout
+    samples.append(json.loads(out))
+  return statistics.median(samples)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--runs", type=int, default=7, help="runs per measurement (default: 7)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  args = parser.parse_args()
+
+  results = []
+  print(f"{'site':<18}{'extractor module(s)':<36}{'old':>10}{'new':>10}{'saved':>10}")
+  for site, url in SITES.items():
+    modules = resolve_extractor_modules(url)
+    # old path: YouTube preload, then the site extractor imported by yt-dlp during extraction
+    old = time_imports((*OLD_MODULES, *modules), args.runs)
+    new = time_imports((*BASE_MODULES, *modules), args.runs)
+    results.append({"site": site, "url": url, "modules": modules, "old_s": old, "new_s": new})
+    names = ", ".join(m.rsplit(".", 1)[-1] for m in modules) or "-"
+    print(f"{site:<18}{names:<36}{old * 1000:>8.1f}ms{new * 1000:>8.1f}ms{(old - new) * 1000:>8.1f}ms")
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+  main()
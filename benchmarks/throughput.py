@@ -0,0 +1,406 @@
+"""
+End-to-end download benchmark against a local synthetic media server (offline).
+
+A local HTTP server (Range requests, optional per connection throttling and latency) serves media generated with
+ffmpeg for every run of the suite:
+  progressive-mp4   one H.264/AAC file (top rendition)
+  progressive-webm  one VP9/Opus file (top rendition)
+  dash              DASH manifest, 360p/720p/1080p video and 48k/96k audio representations
+  hls               HLS master playlist with the same renditions (audio as an EXT-X-MEDIA group)
+The video bitrate of the top rendition is --bitrate (720p: 1/2, 360p: 1/5), constant bitrate, so the sizes
+follow --seconds and --bitrate.
+
+Every (media, preset) pair runs YODO itself in a fresh process ('yodo --batch', i.e. download_media() through
+yt-dlp's generic extractor) with its own cache directory, and reads its '--events' stream:
+  ttfb         job started (after extraction and the choice) → first downloaded bytes
+  throughput   downloaded bytes / time from the first byte to the end of the last download
+  postprocess  end of the last download → job finished
+  wall         process start → exit
+  peak rss     max resident set size of the YODO process and its children (ffmpeg)
+The median of --runs is reported. Unavailable presets (e.g. separate audio of a progressive file) are
+reported as such.
+
+Usage (from the project root):
+  python benchmarks/throughput.py [--seconds 30] [--bitrate 4M] [--throttle 20M] [--latency 50]
+                                  [--runs 3] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from yodo.utils.bandwidth import parse_rate
+
+# media → path on the server
+MEDIA_PATHS = {
+  "progressive-mp4": "progressive.mp4",
+  "progressive-webm": "progressive.webm",
+  "dash": "dash/manifest.mpd",
+  "hls": "hls/master.m3u8",
+}
+MEDIA = tuple(MEDIA_PATHS)
+PRESETS = ("low", "medium", "high", "audio")
+
+# (height, width, share of --bitrate)
+VIDEO_RENDITIONS = ((360, 640, 0.2), (720, 1280, 0.5), (1080, 1920, 1.0))
+AUDIO_BITRATES = ("48k", "96k")
+
+# seconds per DASH/HLS segment
+SEGMENT_SECONDS = 2
+FPS = 30
+
+CONTENT_TYPES = {
+  ".mp4": "video/mp4",
+  ".m4a": "audio/mp4",
+  ".m4s": "video/iso.segment",
+  ".webm": "video/webm",
+  ".mpd": "application/dash+xml",
+  ".m3u8": "application/vnd.apple.mpegurl",
+}
+
+METRICS = ("ttfb", "throughput", "postprocess", "wall", "peak_rss")
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+_BITRATE_RE = re.compile(r"^(\d+(?:\.\d+)?)([km]?)$", re.IGNORECASE)
+
+
+def parse_bitrate(value):
+  """'4M', '800k', '500000' → bits per second (1000 based, like ffmpeg)."""
+  match = _BITRATE_RE.match(value.strip())
+  if not match:
+    raise argparse.ArgumentTypeError(f"invalid bitrate '{value}' (e.g. 800k, 4M)")
+  return int(float(match.group(1)) * {"": 1, "k": 1000, "m": 1000 ** 2}[match.group(2).lower()])
+
+
+class MediaHandler(SimpleHTTPRequestHandler):
+  """Static files with Range requests, throttled to `throttle` bytes/s per connection after `latency` seconds."""
+
+  throttle = None
+  latency = 0.0
+  chunk_size = 64 * 1024
+
+  def log_message(self, *args):
+    pass
+
+  def do_HEAD(self):
+    self._serve(body=False)
+
+  def do_GET(self):
+    self._serve(body=True)
+
+  def _serve(self, body):
+    path = self.translate_path(self.path)
+    if not os.path.isfile(path):
+      self.send_error(404)
+      return
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    match = _RANGE_RE.match(self.headers.get("Range") or "")
+    if match and (match.group(1) or match.group(2)):
+      if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+      else:
+        start = max(0, size - int(match.group(2)))
+      if start > end:
+        self.send_response(416)
+        self.send_header("Content-Range", f"bytes */{size}")
+        self.end_headers()
+        return
+
+    if self.latency:
+      time.sleep(self.latency)
+    self.send_response(206 if match else 200)
+    self.send_header("Content-Type", CONTENT_TYPES.get(os.path.splitext(path)[1], "application/octet-stream"))
+    self.send_header("Content-Length", str(end - start + 1))
+    self.send_header("Accept-Ranges", "bytes")
+    if match:
+      self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+    self.end_headers()
+    if not body:
+      return
+
+    sent, began = 0, time.monotonic()
+    with open(path, "rb") as f:
+      f.seek(start)
+      remaining = end - start + 1
+      while remaining > 0:
+        chunk = f.read(min(self.chunk_size, remaining))
+        if not chunk:
+          break
+        try:
+          self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+          return
+        sent += len(chunk)
+        remaining -= len(chunk)
+        if self.throttle:
+          delay = sent / self.throttle - (time.monotonic() - began)
+          if delay > 0:
+            time.sleep(delay)
+
+
+def start_server(root, throttle=None, latency=0.0):
+  handler = type("Handler", (MediaHandler,), {"throttle": throttle, "latency": latency})
+  server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=root))
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server
+
+
+def ffmpeg(*args):
+  subprocess.run(["ffmpeg", "-v", "error", "-y", *args], check=True)
+
+
+def make_media(root, seconds, bitrate):
+  """Generate the renditions and package them as progressive files, DASH and HLS (see module docstring)."""
+  src = os.path.join(root, "src")
+  os.makedirs(src)
+  videos = []
+  for height, width, share in VIDEO_RENDITIONS:
+    rate = int(bitrate * share)
+    path = os.path.join(src, f"v{height}.mp4")
+    ffmpeg(
+      "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={FPS}", "-t", str(seconds),
+      "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+      "-b:v", str(rate), "-minrate", str(rate), "-maxrate", str(rate), "-bufsize", str(rate),
+      "-x264-params", "nal-hrd=cbr:force-cfr=1",
+      "-g", str(FPS * SEGMENT_SECONDS), "-keyint_min", str(FPS * SEGMENT_SECONDS), "-sc_threshold", "0",
+      path
+    )
+    videos.append((height, width, rate, path))
+  audios = []
+  for abr in AUDIO_BITRATES:
+    path = os.path.join(src, f"a{abr}.m4a")
+    ffmpeg("-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000", "-t", str(seconds), "-c:a", "aac", "-b:a", abr, path)
+    audios.append((abr, path))
+
+  top_height, top_width, top_rate, top_video = videos[-1]
+  ffmpeg("-i", top_video, "-i", audios[-1][1], "-c", "copy", "-movflags", "+faststart", os.path.join(root, "progressive.mp4"))
+  ffmpeg(
+    "-f", "lavfi", "-i", f"testsrc2=size={top_width}x{top_height}:rate={FPS}",
+    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000", "-t", str(seconds),
+    "-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-row-mt", "1",
+    "-b:v", str(top_rate), "-minrate", str(top_rate), "-maxrate", str(top_rate),
+    "-c:a", "libopus", "-b:a", AUDIO_BITRATES[-1], os.path.join(root, "progressive.webm")
+  )
+
+  # DASH: one adaptation set per type
+  os.makedirs(os.path.join(root, "dash"))
+  inputs = [arg for _, _, _, path in videos for arg in ("-i", path)] + [arg for _, path in audios for arg in ("-i", path)]
+  maps = [arg for i in range(len(videos) + len(audios)) for arg in ("-map", str(i))]
+  ffmpeg(
+    *inputs, *maps, "-c", "copy", "-f", "dash",
+    "-seg_duration", str(SEGMENT_SECONDS), "-use_template", "1", "-use_timeline", "1",
+    "-adaptation_sets", "id=0,streams=v id=1,streams=a",
+    os.path.join(root, "dash", "manifest.mpd")
+  )
+
+  # HLS (fragmented MP4 segments): a media playlist per rendition, the master playlist groups the audio renditions
+  hls = os.path.join(root, "hls")
+  os.makedirs(hls)
+  master = ["#EXTM3U", "#EXT-X-VERSION:7"]
+
+  def hls_rendition(path, name):
+    ffmpeg(
+      "-i", path, "-c", "copy", "-f", "hls", "-hls_time", str(SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+      "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", f"{name}_init.mp4",
+      "-hls_segment_filename", os.path.join(hls, f"{name}_%03d.m4s"), os.path.join(hls, f"{name}.m3u8")
+    )
+
+  for abr, path in reversed(audios):
+    hls_rendition(path, f"a{abr}")
+    default = "YES" if abr == AUDIO_BITRATES[-1] else "NO"
+    master.append(f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud",NAME="{abr}",DEFAULT={default},AUTOSELECT=YES,URI="a{abr}.m3u8"')
+  for height, width, rate, path in videos:
+    hls_rendition(path, f"v{height}")
+    master.append(f'#EXT-X-STREAM-INF:BANDWIDTH={rate + 128000},RESOLUTION={width}x{height},CODECS="avc1.640028,mp4a.40.2",AUDIO="aud"')
+    master.append(f"v{height}.m3u8")
+  with open(os.path.join(hls, "master.m3u8"), "w", encoding="utf-8") as f:
+    f.write("\n".join(master) + "\n")
+
+  shutil.rmtree(src)
+
+
+def write_pages(root, base, seconds):
+  """
+  One web page per media with a schema.org VideoObject (JSON-LD), the generic extractor takes the title, the
+  duration and the media URL from it (YODO rejects media without a duration).
+  """
+  for media, path in MEDIA_PATHS.items():
+    video = {
+      "@context": "https://schema.org", "@type": "VideoObject", "name": f"Benchmark {media}",
+      "duration": f"PT{seconds}S", "uploadDate": "2024-01-01", "contentUrl": f"{base}/{path}",
+    }
+    with open(os.path.join(root, f"{media}.html"), "w", encoding="utf-8") as f:
+      f.write(
+        f"<html><head><title>Benchmark {media}</title>"
+        f'<script type="application/ld+json">{json.dumps(video)}</script></head><body></body></html>\n'
+      )
+
+
+def run_once(url, preset, work_dir, log):
+  """
+  Download url with YODO in a fresh process.
+
+  Returns:
+    dict: metrics (see module docstring), None if the download failed
+  """
+  shutil.rmtree(work_dir, ignore_errors=True)
+  os.makedirs(work_dir)
+  urls = os.path.join(work_dir, "urls.txt")
+  events_path = os.path.join(work_dir, "events.jsonl")
+  with open(urls, "w", encoding="utf-8") as f:
+    f.write(url + "\n")
+  command = [
+    sys.executable, "-m", "yodo.main", "--batch", urls, "--choice", preset,
+    "--no-archive", "--no-cache", "--download-dir", os.path.join(work_dir, "downloads"), "--events", events_path,
+  ]
+  env = {**os.environ, "XDG_CACHE_HOME": os.path.join(work_dir, "cache"), "STAGING_DIR": "off"}
+
+  started = time.time()
+  process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=log)
+  _, status, rusage = os.wait4(process.pid, 0)
+  process.returncode = os.waitstatus_to_exitcode(status)
+  wall = time.time() - started
+
+  events = []
+  if os.path.exists(events_path):
+    with open(events_path, "r", encoding="utf-8") as f:
+      events = [json.loads(line) for line in f if line.strip()]
+  job_started = next((e["time"] for e in events if e["type"] == "job" and e["status"] == "started"), None)
+  job_finished = next((e["time"] for e in events if e["type"] == "job" and e["status"] == "finished"), None)
+  progress = [e for e in events if e["type"] == "progress"]
+  first_byte = next((e["time"] for e in progress if e["downloaded"]), None)
+  downloaded = [e for e in progress if e["status"] == "finished"]
+  if process.returncode != 0 or None in (job_started, job_finished, first_byte) or not downloaded:
+    return None
+
+  # bytes per downloaded file (separate video and audio formats are two files)
+  sizes = {}
+  for e in progress:
+    sizes[e["filename"]] = max(sizes.get(e["filename"], 0), e["downloaded"], e["total"] if e["status"] == "finished" else 0)
+  last_byte = max(e["time"] for e in downloaded)
+  return {
+    "ttfb": first_byte - job_started,
+    "throughput": sum(sizes.values()) / max(last_byte - first_byte, 1e-6),
+    "postprocess": job_finished - last_byte,
+    "wall": wall,
+    "peak_rss": rusage.ru_maxrss * 1024,
+    "bytes": sum(sizes.values()),
+  }
+
+
+def format_row(label, metrics):
+  mib = 1024 * 1024
+  if metrics is None:
+    return f"{label:<26}{'not available / failed':>40}"
+  return (
+    f"{label:<26}{metrics['ttfb'] * 1000:>8.0f}ms{metrics['throughput'] / mib:>9.1f}MiB/s"
+    f"{metrics['postprocess']:>9.2f}s{metrics['wall']:>8.2f}s{metrics['peak_rss'] / mib:>8.0f}MiB"
+  )
+
+
+def compare(results, baseline_path):
+  """Print the change of every metric against an earlier --json file."""
+  with open(baseline_path, "r", encoding="utf-8") as f:
+    baseline = {(r["media"], r["preset"]): r.get("metrics") for r in json.load(f)["results"]}
+  print(f"\nchange against {baseline_path} (throughput: higher is better, else lower)")
+  for row in results:
+    before = baseline.get((row["media"], row["preset"]))
+    if not before or not row["metrics"]:
+      continue
+    changes = "  ".join(
+      f"{metric} {(row['metrics'][metric] - before[metric]) * 100 / before[metric]:+6.1f}%"
+      for metric in METRICS if before.get(metric)
+    )
+    print(f"{row['media'] + ' ' + row['preset']:<26}{changes}")
+
+
+def git_commit():
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument("--seconds", type=int, default=30, help="length of the synthetic media (default: 30)")
+  parser.add_argument("--bitrate", type=parse_bitrate, default="4M", help="video bitrate of the top rendition, bits/s (default: 4M)")
+  parser.add_argument("--throttle", help="bandwidth per connection, bytes/s, e.g. 20M (default: unlimited)")
+  parser.add_argument("--latency", type=float, default=0, help="ms before every response (default: 0)")
+  parser.add_argument("--media", default=",".join(MEDIA), help=f"media to test (default: {','.join(MEDIA)})")
+  parser.add_argument("--presets", default=",".join(PRESETS), help=f"presets to test (default: {','.join(PRESETS)})")
+  parser.add_argument("--runs", type=int, default=3, help="runs per measurement (default: 3)")
+  parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+  parser.add_argument("--compare", metavar="PATH", help="compare with the results of an earlier --json run")
+  parser.add_argument("--keep-logs", metavar="DIR", help="keep the output of every YODO run in DIR")
+  args = parser.parse_args()
+
+  if not shutil.which("ffmpeg"):
+    sys.exit("ffmpeg is required")
+  media_list = [m for m in args.media.split(",") if m]
+  presets = [p for p in args.presets.split(",") if p]
+  unknown = set(media_list) - set(MEDIA) | set(presets) - set(PRESETS)
+  if unknown:
+    sys.exit(f"unknown media/presets: {', '.join(sorted(unknown))}")
+  bitrate = args.bitrate
+  throttle = parse_rate(args.throttle) if args.throttle else None
+
+  config = {
+    "seconds": args.seconds, "bitrate": bitrate, "throttle": throttle, "latency_ms": args.latency,
+    "runs": args.runs, "python": sys.version.split()[0],
+  }
+  results = []
+  with tempfile.TemporaryDirectory(prefix="yodo-bench-") as tmp:
+    media_root = os.path.join(tmp, "media")
+    os.makedirs(media_root)
+    print(f"generating {args.seconds}s of synthetic media ...")
+    make_media(media_root, args.seconds, bitrate)
+    server = start_server(media_root, throttle, args.latency / 1000)
+    base = f"http://127.0.0.1:{server.server_port}"
+    write_pages(media_root, base, args.seconds)
+    if args.keep_logs:
+      os.makedirs(args.keep_logs, exist_ok=True)
+
+    print(f"\n{'media / preset':<26}{'ttfb':>10}{'throughput':>14}{'postproc':>10}{'wall':>9}{'peak rss':>11}")
+    for media in media_list:
+      for preset in presets:
+        label = f"{media} {preset}"
+        log_path = os.path.join(args.keep_logs or tmp, f"{media}-{preset}.log")
+        samples = []
+        with open(log_path, "w", encoding="utf-8") as log:
+          for _ in range(args.runs):
+            samples.append(run_once(f"{base}/{media}.html", preset, os.path.join(tmp, "work"), log))
+        if None in samples:
+          metrics = None
+        else:
+          metrics = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+        results.append({"media": media, "preset": preset, "metrics": metrics})
+        print(format_row(label, metrics))
+    server.shutdown()
+
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, "results": results}, f, indent=2)
+  if args.compare:
+    compare(results, args.compare)
+
+
+if __name__ == "__main__":
+  main()
@@ -27,6 +27,154 @@ def parse_cli_args(version):
     help="Set custom download directory"
   )
 
+  parser.add_argument(
+    "--staging-dir",
+    metavar="PATH",
+    help="Download and postprocess in PATH (fast internal storage), then move the finished file to the download\ndirectory ('off' to disable, default on Termux: ~/.cache/yodo/staging)"
+  )
+
+  # Metadata cache
+  parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="Always fetch media information, don't use the metadata cache"
+  )
+
+  parser.add_argument(
+    "--cache-dir",
+    metavar="PATH",
+    help="Set custom metadata cache directory"
+  )
+
+  # Download archive
+  parser.add_argument(
+    "--no-archive",
+    action="store_true",
+    help="Don't skip media already in the download archive and don't record downloads"
+  )
+
+  parser.add_argument(
+    "--archive",
+    metavar="PATH",
+    help="Set custom download archive file (default: ~/.local/share/yodo/archive.sqlite3)"
+  )
+
+  parser.add_argument(
+    "--archive-import",
+    nargs="?",
+    const="",
+    metavar="DIR",
+    help="Index the media files of DIR (default: the download directory) into the download archive"
+  )
+
+  # Speculative download
+  parser.add_argument(
+    "--speculate",
+    nargs="?",
+    const="auto",
+    choices=("auto", "low", "medium", "high", "audio"),
+    metavar="CHOICE",
+    help="Start fetching the most likely stream while the choice prompt is open\n"
+         "(CHOICE: low, medium, high, audio or auto = guess from history)"
+  )
+
+  # Non-interactive batch mode
+  parser.add_argument(
+    "--batch",
+    nargs="?",
+    const="-",
+    metavar="FILE",
+    help="Download every URL of FILE (one per line, '#' comments) without prompts\n"
+         "(no FILE or '-' reads the URLs from stdin)"
+  )
+
+  parser.add_argument(
+    "--choice",
+    metavar="CHOICE",
+    help="Choice and arguments used for every batch item, as typed at the prompt\n"
+         "(default: 'high', e.g. --choice \"high quality=720p format=mkv\")"
+  )
+
+  parser.add_argument(
+    "-j", "--jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help="Number of batch items downloaded at the same time (default: 1)"
+  )
+
+  parser.add_argument(
+    "--per-site",
+    action="append",
+    metavar="LIMIT",
+    help="Max parallel batch downloads per site: 'N' for every site, 'site=N' for one site\n"
+         "(repeatable, default: 2, youtube=3, instagram=1, tiktok=1, facebook=1)"
+  )
+
+  # Batch pipeline
+  parser.add_argument(
+    "--pipeline-depth",
+    metavar="N[,N]",
+    help="Batch items queued in front of the download and the postprocess stage: N for both or DOWNLOAD,POSTPROCESS\n"
+         "(extraction, download and postprocessing of consecutive items overlap, default: 1, 0: one item after another)"
+  )
+
+  # Fragment concurrency
+  parser.add_argument(
+    "--fragments",
+    metavar="N|MIN-MAX",
+    help="Fragments of HLS/DASH streams downloaded at the same time: N (fixed) or MIN-MAX\n"
+         "(adapted to the measured throughput and errors, default: 1-8)"
+  )
+
+  # Job journal
+  parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="Continue every unfinished download of earlier runs from its partial files"
+  )
+
+  # Request pacing
+  parser.add_argument(
+    "--request-rate",
+    action="append",
+    metavar="LIMIT",
+    help="Requests per second per host: 'R[/BURST]' for every site, 'site=R[/BURST]' for one site\n"
+         "(repeatable, default: youtube=2/10, instagram=0.5/4, tiktok=0.5/4, facebook=0.5/4,\n"
+         "other hosts such as media CDNs are not paced, they only back off after HTTP 429/403)"
+  )
+
+  # Bandwidth cap
+  parser.add_argument(
+    "--limit-rate",
+    metavar="RATE",
+    help="Total download bandwidth of all running downloads, e.g. 500K or 20M (bytes per second)"
+  )
+
+  # Progress events
+  parser.add_argument(
+    "--events",
+    metavar="PATH",
+    help="Append the progress events of every download (bytes, speed, ETA, fragments, postprocessors)\nto PATH as JSON lines"
+  )
+
+  # Profiling
+  parser.add_argument(
+    "--profile",
+    nargs="?",
+    const="",
+    metavar="DIR",
+    help="Record where the time goes (span tree as JSON, cProfile statistics and collapsed stacks for\nflame graphs) and write it to DIR at exit (default: ~/.cache/yodo/profiles/<time>)"
+  )
+
+  # Warm background daemon
+  parser.add_argument(
+    "--daemon",
+    choices=("start", "stop", "status"),
+    metavar="{start,stop,status}",
+    help="Manage the warm background daemon (keeps yt-dlp loaded between runs)"
+  )
+
   # Version
   parser.add_argument(
     "--version",
@@ -41,4 +189,52 @@ def parse_cli_args(version):
     help="Update YODO and yt-dlp to the latest stable versions"
   )
 
-  return parser.parse_args()
\ No newline at end of file
+  args = parser.parse_args()
+
+  # batch only flags
+  if args.batch is None:
+    if args.choice is not None:
+      parser.error("--choice requires --batch")
+    if args.jobs != 1 or args.per_site or args.pipeline_depth:
+      parser.error("--jobs/--per-site/--pipeline-depth require --batch")
+  if args.resume and args.batch is not None:
+    parser.error("--resume can't be combined with --batch")
+  if args.jobs < 1:
+    parser.error("--jobs must be at least 1")
+  if args.per_site:
+    from yodo.utils.scheduler import parse_site_limits
+    try:
+      parse_site_limits(args.per_site)
+    except ValueError as e:
+      parser.error(str(e))
+
+  if args.request_rate:
+    from yodo.utils.ratelimit import parse_rate_limits
+    try:
+      parse_rate_limits(args.request_rate)
+    except ValueError as e:
+      parser.error(str(e))
+  if args.limit_rate:
+    from yodo.utils.bandwidth import parse_rate
+    try:
+      parse_rate(args.limit_rate)
+    except ValueError as e:
+      parser.error(str(e))
+  if args.pipeline_depth:
+    from yodo.utils.pipeline import parse_depths
+    try:
+      parse_depths(args.pipeline_depth)
+    except ValueError as e:
+      parser.error(str(e))
+  if args.fragments:
+    from yodo.utils.fragments import parse_bounds
+    try:
+      parse_bounds(args.fragments)
+    except ValueError as e:
+      parser.error(str(e))
+
+  if args.choice is not None:
+    if (args.choice.split() or [""])[0].lower() not in ("low", "medium", "high", "audio"):
+      parser.error(f"invalid --choice '{args.choice}' (must start with low, medium, high or audio)")
+
+  return args
\ No newline at end of file
@@ -0,0 +1,399 @@
+"""
+YODO warm daemon.
+
+A long-lived background process that keeps yt-dlp (and its extractor registry) imported and warm. It builds one
+YoutubeDL at start, so the process-wide state yt-dlp sets up for its first instance (extractor classes, plugins)
+is inherited by every run. The YoutubeDL instances of a run are still created by the run: their options differ
+from run to run, and yt-dlp applies them only when an instance is constructed.
+`yodo` connects to it over a Unix socket and passes its own terminal (stdin, stdout, stderr file descriptors),
+argv, cwd and environment. The daemon forks a child for every run, the child attaches to the passed terminal
+and runs the normal YODO flow (`yodo.main` as __main__). All prompts and download progress go straight to the
+client's terminal, while the client only waits for the exit code and forwards signals (Ctrl+C).
+
+If no daemon is running, `yodo` falls back to the normal in-process path.
+
+Usage:
+  yodo --daemon start|stop|status
+"""
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from yodo.utils.colors import *
+
+# env var set in daemon children so they never try to delegate to the daemon again
+CHILD_ENV = "YODO_DAEMON_CHILD"
+
+# max size of a request message (argv, cwd, env)
+MAX_MESSAGE_BYTES = 256 * 1024
+
+# seconds a client may take to send its request
+REQUEST_TIMEOUT = 5
+
+
+def socket_path():
+  """Return the daemon Unix socket path ($XDG_RUNTIME_DIR or ~/.cache/yodo)."""
+  base = os.getenv("XDG_RUNTIME_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo"
+  )
+  return os.path.join(base, "yodo.sock")
+
+
+def _send(conn, message):
+  conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _recv_lines(conn):
+  """Yield JSON messages (one per line) until the connection is closed."""
+  buffer = b""
+  while True:
+    try:
+      chunk = conn.recv(4096)
+    except InterruptedError:
+      continue
+    if not chunk:
+      return
+    buffer += chunk
+    while b"\n" in buffer:
+      line, buffer = buffer.split(b"\n", 1)
+      if line:
+        yield json.loads(line)
+
+
+def _request(message, fds=(), timeout=None):
+  """Connect to the daemon and send a request. Returns the connected socket, or None if no daemon is listening."""
+  path = socket_path()
+  if not os.path.exists(path):
+    return None
+  conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  conn.settimeout(timeout)
+  try:
+    conn.connect(path)
+    socket.send_fds(conn, [json.dumps(message).encode("utf-8") + b"\n"], list(fds))
+  except OSError:
+    # stale socket file (daemon was killed)
+    conn.close()
+    return None
+  return conn
+
+
+# ---------------------------------------
+# client
+
+
+def run_client(argv):
+  """
+  Run YODO inside the daemon, using the current terminal.
+
+  Returns:
+    int: exit code of the run
+    None: no daemon available (caller should continue in-process)
+  """
+  # commands that manage YODO/the daemon itself always run in-process
+  if os.getenv(CHILD_ENV) or any(arg in ("--daemon", "-U", "--update") for arg in argv[1:]):
+    return None
+
+  conn = _request(
+    {"cmd": "run", "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)},
+    fds=(sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno())
+  )
+  if conn is None:
+    return None
+
+  with conn:
+    messages = _recv_lines(conn)
+    try:
+      child_pid = next(messages)["pid"]
+    except (StopIteration, KeyError, ValueError, OSError):
+      # daemon didn't start the run, nothing has been printed yet
+      return None
+
+    # terminal signals are delivered to this process, forward them to the child
+    def forward(signum, frame):
+      try:
+        os.kill(child_pid, signum)
+      except ProcessLookupError:
+        pass
+
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT):
+      signal.signal(signum, forward)
+
+    try:
+      for message in messages:
+        if "exit" in message:
+          return message["exit"]
+    except (OSError, ValueError):
+      pass
+  # connection lost without exit code (child was killed)
+  return 1
+
+
+# ---------------------------------------
+# server
+
+
+def _warm_up():
+  """Import everything a YODO run needs, so forked children start warm."""
+  import importlib
+  from yodo.main import PRELOAD_MODULES
+
+  for module in PRELOAD_MODULES:
+    try:
+      importlib.import_module(module)
+    except Exception:
+      pass
+
+  # load the domain → extractor index once, children only import the module of their URL
+  try:
+    from yodo.utils.extractor_index import resolve_extractor_modules
+    resolve_extractor_modules("https://example.com/warm-up")
+  except Exception:
+    pass
+
+  # the first YoutubeDL of a process costs about twice as much as the next ones
+  try:
+    from yt_dlp import YoutubeDL
+    YoutubeDL({"quiet": True, "no_warnings": True}).close()
+  except Exception:
+    pass
+
+
+def _run_child(request, fds):
+  """Runs in the forked child: attach to the client's terminal and run YODO as __main__."""
+  import io
+  import runpy
+
+  signal.signal(signal.SIGCHLD, signal.SIG_DFL) # subprocesses (ffmpeg) must be waitable again
+  signal.signal(signal.SIGTERM, signal.SIG_DFL)
+  signal.signal(signal.SIGINT, signal.default_int_handler)
+
+  for target, fd in enumerate(fds[:3]):
+    os.dup2(fd, target)
+  for fd in fds:
+    if fd > 2:
+      os.close(fd)
+
+  # re-create the standard streams on top of the client's terminal
+  sys.stdin = sys.__stdin__ = io.TextIOWrapper(io.FileIO(0, "rb", closefd=False))
+  sys.stdout = sys.__stdout__ = io.TextIOWrapper(io.FileIO(1, "wb", closefd=False), line_buffering=True)
+  sys.stderr = sys.__stderr__ = io.TextIOWrapper(io.FileIO(2, "wb", closefd=False), line_buffering=True)
+
+  os.environ.clear()
+  os.environ.update(request.get("env") or {})
+  os.environ[CHILD_ENV] = "1"
+  os.chdir(request.get("cwd") or os.getcwd())
+  sys.argv = list(request.get("argv") or ["yodo"])
+
+  # yodo.main was imported for warm-up, run a fresh copy as __main__
+  sys.modules.pop("yodo.main", None)
+
+  code = 0
+  try:
+    runpy.run_module("yodo.main", run_name="__main__", alter_sys=True)
+  except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+  except KeyboardInterrupt:
+    print(f"\n{CLR_RESET}Exiting...")
+    code = 130
+  except BaseException:
+    import traceback
+    traceback.print_exc()
+    code = 1
+  finally:
+    # like a normal exit, finish the non-daemon threads (e.g. archive hashing) before the child's os._exit()
+    for thread in threading.enumerate():
+      if thread is not threading.current_thread() and not thread.daemon:
+        thread.join()
+    for stream in (sys.stdout, sys.stderr):
+      try:
+        stream.flush()
+      except Exception:
+        pass
+  return code
+
+
+def _peer_is_owner(conn):
+  """Only accept connections from the user running the daemon (Linux/Android)."""
+  if not hasattr(socket, "SO_PEERCRED"):
+    return True
+  import struct
+  creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+  _pid, uid, _gid = struct.unpack("3i", creds)
+  return uid == os.getuid()
+
+
+def _handle(conn, daemon_pid, started):
+  """
+  Runs in a child forked for every connection: read the request and serve it.
+
+  Returns:
+    int: exit code of the child (of the YODO run for 'run')
+  """
+  fds = []
+  try:
+    data, fds, _flags, _addr = socket.recv_fds(conn, MAX_MESSAGE_BYTES, 3)
+    request = json.loads(data.split(b"\n", 1)[0] or b"{}")
+    # the request is in, a run keeps the connection for its exit code
+    conn.settimeout(None)
+    cmd = request.get("cmd")
+
+    if cmd == "status":
+      _send(conn, {"pid": daemon_pid, "uptime": time.time() - started})
+    elif cmd == "stop":
+      _send(conn, {"stopped": True})
+      os.kill(daemon_pid, signal.SIGTERM)
+    elif cmd == "run" and len(fds) == 3:
+      _send(conn, {"pid": os.getpid()})
+      # _run_child() takes over the passed descriptors
+      fds, run_fds = [], fds
+      code = _run_child(request, run_fds)
+      _send(conn, {"exit": code})
+      return code
+  except (OSError, ValueError):
+    pass
+  finally:
+    for fd in fds:
+      os.close(fd)
+  return 0
+
+
+def serve():
+  """Warm up and serve requests until stopped."""
+  path = socket_path()
+  os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+  _warm_up()
+
+  if os.path.exists(path):
+    os.remove(path)
+  server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  old_umask = os.umask(0o177)
+  try:
+    server.bind(path)
+  finally:
+    os.umask(old_umask)
+  server.listen(8)
+
+  daemon_pid = os.getpid()
+  started = time.time()
+  signal.signal(signal.SIGCHLD, signal.SIG_IGN) # finished children are reaped automatically
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0)) # also sent by the child serving 'stop'
+
+  try:
+    while True:
+      try:
+        conn, _ = server.accept()
+      except InterruptedError:
+        continue
+
+      try:
+        if not _peer_is_owner(conn):
+          continue
+        # the request is read in its own child, a slow or stuck client never blocks the next one
+        conn.settimeout(REQUEST_TIMEOUT)
+        if os.fork() == 0:
+          server.close()
+          code = 1
+          try:
+            code = _handle(conn, daemon_pid, started)
+          finally:
+            os._exit(code)
+      except OSError:
+        pass
+      finally:
+        conn.close()
+  finally:
+    server.close()
+    try:
+      os.remove(path)
+    except OSError:
+      pass
+
+
+# ---------------------------------------
+# management commands (yodo --daemon start|stop|status)
+
+
+def status():
+  """Return daemon status dict, or None if no daemon is running."""
+  conn = _request({"cmd": "status"}, timeout=5)
+  if conn is None:
+    return None
+  with conn:
+    try:
+      return next(_recv_lines(conn))
+    except (StopIteration, OSError, ValueError):
+      return None
+
+
+def start():
+  """Start the daemon in the background. Returns its pid (or None if it failed to come up)."""
+  running = status()
+  if running:
+    return running["pid"]
+
+  import subprocess
+  project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  subprocess.Popen(
+    [sys.executable, "-m", "yodo.daemon"],
+    cwd=project_root,
+    stdin=subprocess.DEVNULL,
+    stdout=subprocess.DEVNULL,
+    stderr=subprocess.DEVNULL,
+    start_new_session=True # detach from the terminal
+  )
+
+  # wait for warm-up to finish
+  deadline = time.time() + 60
+  while time.time() < deadline:
+    running = status()
+    if running:
+      return running["pid"]
+    time.sleep(0.2)
+  return None
+
+
+def stop():
+  """Stop the running daemon. Returns True if a daemon was stopped."""
+  conn = _request({"cmd": "stop"}, timeout=5)
+  if conn is None:
+    return False
+  with conn:
+    try:
+      return bool(next(_recv_lines(conn)).get("stopped"))
+    except (StopIteration, OSError, ValueError):
+      return False
+
+
+def handle_command(command):
+  """CLI handler for '--daemon <command>'. Always exits."""
+  if command == "start":
+    print(f"{CLR_BRIGHT_BLUE}Starting YODO daemon...{CLR_RESET}")
+    pid = start()
+    if pid:
+      print(f"{CLR_BRIGHT_GREEN}YODO daemon running (pid {pid}){CLR_RESET}")
+      print(f"Socket: {socket_path()}")
+    else:
+      print(f"{CLR_ERROR}Failed to start YODO daemon.{CLR_RESET}")
+      sys.exit(1)
+  elif command == "stop":
+    if stop():
+      print(f"{CLR_BRIGHT_GREEN}YODO daemon stopped.{CLR_RESET}")
+    else:
+      print(f"{CLR_WARNING}YODO daemon is not running.{CLR_RESET}")
+  else:
+    running = status()
+    if running:
+      print(f"{CLR_BRIGHT_GREEN}YODO daemon running (pid {running['pid']}, uptime {running['uptime'] / 60:.1f} m){CLR_RESET}")
+      print(f"Socket: {socket_path()}")
+    else:
+      print(f"{CLR_WARNING}YODO daemon is not running.{CLR_RESET}")
+  sys.exit()
+
+
+if __name__ == "__main__":
+  serve()
@@ -11,6 +11,8 @@ _perf_startup_time_start = time.perf_counter()
 
 # YODO built-in modules/functions
 from yodo.utils.colors import * # import required on top level
+# '--profile' spans (no-ops unless profiling)
+from yodo.utils.profiler import begin as begin_span, end as end_span, span, traced
 
 # set environment variables
 os.environ["YTDLP_REMOTE_COMPONENTS"] = "ejs:github"
@@ -24,19 +26,85 @@ move_up_1_line = "\x1b[1A"
 DEBUG = False
 VERBOSE = False
 DOWNLOAD_DIR = None
+NO_CACHE = False
+CACHE_DIR = None
+SPECULATE = None # None (disabled), 'auto' or a choice
+BATCH = None # None (interactive), URL list file or '-' (stdin)
+BATCH_CHOICE = "high" # choice + arguments used for every batch item
+JOBS = 1 # parallel batch items
+PER_SITE = None # '--per-site' values
+PIPELINE_DEPTH = (1, 1) # queued batch items in front of the download and postprocess stage, 0: sequential
+NO_ARCHIVE = False
+ARCHIVE_PATH = None # None: default location (see yodo.utils.archive)
+ARCHIVE_IMPORT = None # '--archive-import' directory ('' = download directory)
+RESUME = False # '--resume': continue the unfinished jobs of the journal
+FRAGMENTS = (1, 8) # bounds of HLS/DASH fragments in flight (adapted during the download)
+STAGING_DIR = None # '--staging-dir' (or $STAGING_DIR), None: default (see yodo.utils.staging)
+EVENTS = None # '--events' JSON lines file of the progress events (see yodo.utils.events)
 VERSION = "1.2.4"
 
+# modules preloaded in the background by init() (and kept warm by the YODO daemon)
+PRELOAD_MODULES = (
+  "re",
+  "shlex",
+  "unicodedata",
+  "urllib.parse",
+  "yt_dlp",
+  "yt_dlp.utils",
+  "yt_dlp.extractor.common",
+  # site extractors are not preloaded here, url_input_handler() imports only the one matching the URL
+  #"yodo.updater.update_handler",
+  "yodo.utils.yodo_documentation",
+  "yodo.utils.prompt_validator",
+  "yodo.utils.terminal_utils",
+  "yodo.utils.info_cache",
+  "yodo.utils.format_index",
+  "yodo.utils.size_probe",
+  "yodo.utils.playlist",
+  "yodo.utils.archive",
+  "yodo.utils.journal"
+)
+
 # track playlist
 IS_PLAYLIST = False
 
-# var for tracking loader
-is_info_loaded = False
+# choice and arguments confirmed at the last prompt (reused for the remaining playlist entries)
+LAST_PRESET = None
+
+# set when the media information is loaded (stops the loader)
+is_info_loaded = None
 
 # Global var for final filename
 FINAL_FILENAME = None
 FINAL_TITLE = None # filename without ext
 FINAL_EXT = None
 
+# format index of the fetched media (prices presets and custom qualities)
+FORMAT_INDEX = None
+
+# '--request-rate' values (per host token buckets, see yodo.utils.ratelimit)
+REQUEST_RATE = None
+
+# '--limit-rate' total bandwidth cap in bytes per second, None: unlimited (see yodo.utils.bandwidth)
+LIMIT_RATE = None
+
+# set once install_request_hooks() ran
+REQUEST_HOOKS_INSTALLED = False
+
+
+class ItemFailed(BaseException):
+  """
+  Raised instead of sys.exit() when a batch item or playlist entry fails, so only that item is skipped.
+  Like SystemExit it is not an Exception, the existing 'except Exception' handlers let it through.
+  """
+
+def exit_or_fail(reason, code=1):
+  """Exit the program (interactive mode) or fail the current item only (batch mode, playlist entries, resumed jobs)."""
+  if BATCH is not None or IS_PLAYLIST or RESUME:
+    raise ItemFailed(reason)
+  print("Exiting...")
+  sys.exit(code)
+
 
 # function to print program banner/logo
 def PRINT_LOGO():
@@ -82,8 +150,15 @@ def log_timing(message, duration_seconds):
 
   print(f"{CLR_DIM}[perf] {message}: {formatted_duration}{CLR_RESET}")
 
+def write_profile():
+  """Write the '--profile' files (at exit)."""
+  from yodo.utils.profiler import stop
+  paths = stop()
+  if paths:
+    print(f"{CLR_DIM}[profile] {os.path.dirname(paths[0])}/: {', '.join(os.path.basename(p) for p in paths)}{CLR_RESET}")
+
 # function for convert bytes to human-readable MB/GB string.
-def get_size_str(size_bytes):
+def get_size_str(size_bytes, color=True):
   """Convert bytes to human-readable MB/GB string."""
   if not size_bytes:
     return "Unknown"
@@ -92,24 +167,144 @@ def get_size_str(size_bytes):
     size = f"{size_mb:.2f} MB"
   else:
     size = f"{size_mb/1024:.2f} GB"
-  return f"{CLR_LIME}{size}{CLR_RESET}"
+  return f"{CLR_LIME}{size}{CLR_RESET}" if color else size
 
 # function to convert acodec to ext
 def codec_to_ext(acodec):
-  """Map yt-dlp audio codecs to common file extensions"""
-  mapping = {
-    "opus": "opus", # WebM/Opus extracted → .opus
-    "vorbis": "ogg", # Legacy format → .ogg
-    "mp4a.40.2": "m4a", # AAC inside MP4 → .m4a
-    "aac": "m4a", # raw AAC format inside m4a container
-    "mp3": "mp3", # Direct MP3
-    "flac": "flac", # FLAC
-    "alac": "m4a", # ALAC usually in M4A container
-    "ac3": "ac3",
-    "eac3": "eac3",
-    "wav": "wav", # PCM/WAVE
-  }
-  return mapping.get(acodec, "m4a")  # default safe fallback
+  """Map yt-dlp audio codecs to common file extensions (the container of a stream copy, see yodo.utils.audio)"""
+  from yodo.utils.audio import codec_ext
+  return codec_ext(acodec)  # m4a for unknown codecs
+
+# yt-dlp selectors of the choices (priced by fetch_details(), used unless a custom quality is given)
+CHOICE_FORMATS = {
+  # try 360p, else 480p (muxed). then fallback to < 480p merged video+audio
+  "low": "(bestvideo[height<=360]/bestvideo[height<=480])+(worstaudio[abr<=64]+worstaudio)",
+  # try 720p, else 1080p. merged video+audio
+  "medium": "(bestvideo[height<=720]/bestvideo[height<=1080])+(bestaudio[abr<=128]+bestaudio)",
+  # high = best available
+  "high": "bestvideo+bestaudio/best",
+  # audio only
+  "audio": "bestaudio"
+}
+
+# yt-dlp selectors the custom 'quality=' attribute falls back to, per choice
+QUALITY_FORMAT = {
+  "low": 
+    {
+      "video": "(bestvideo[height<=360]/bestvideo[height<=480])+(worstaudio[abr<=64]/worstaudio)",
+      "audio": "(worstaudio[abr<=64]/worstaudio)"
+    },
+  "medium": 
+    {
+      "video": "(bestvideo[height<=720]/bestvideo[height<=1080])+(bestaudio[abr<=128]/bestaudio)",
+      "audio": "(bestaudio[abr<=128]/bestaudio)"
+    },
+  "high": 
+    {
+      "video": "bestvideo+bestaudio/best",
+      "audio": "bestaudio"
+    }
+}
+
+# custom video quality labels → (format field, max value), ordered by resolution
+VIDEO_QUALITY_LIMITS = {
+  "144p": ("height", 144),
+  "240p": ("height", 240),
+  "360p": ("height", 360),
+  "480p": ("height", 480),
+  "720p": ("height", 720),
+  "1080p": ("height", 1080),
+  "2k": ("width", 1920),
+  "1440p": ("height", 1440),
+  "4k": ("width", 3840),
+  "2160p": ("height", 2160),
+  "8k": ("width", 7680)
+}
+
+# custom audio quality labels → yt-dlp selector
+AUDIO_QUALITY_SELECTORS = {
+  "high": "bestaudio",
+  "medium": "bestaudio[abr<=128]/bestaudio",
+  "low": "worstaudio[abr<=64]/worstaudio"
+}
+
+def video_quality_selector(label, choice):
+  """Return the yt-dlp selector for a custom video quality label (e.g. '720p', '4k') of a choice."""
+  field, limit = VIDEO_QUALITY_LIMITS[label]
+  return f"bestvideo[{field}<={limit}]+{QUALITY_FORMAT[choice]['audio']}/{QUALITY_FORMAT[choice]['video']}"
+
+# function to build prompt completions from the fetched media
+def build_completion_hints(info, options):
+  """
+  Build media specific prompt completions from the format index and subtitle tracks.
+  
+  Each completion carries a display meta with the real resolution/bitrate and the estimated size.
+  Values the media doesn't offer are left out: unavailable choices, quality labels that don't
+  select a stream of their own (e.g. 4K for a 1080p video) and missing subtitle languages.
+  
+  Args:
+    info (dict): fetched media info dict
+    options (dict): yt-dlp format selectors of each choice (low, medium, high, audio)
+  
+  Returns:
+    dict: hints for prompt_screen() (see prompt_validator.build_indexes())
+    None: no format index available
+  """
+  if FORMAT_INDEX is None:
+    return None
+  
+  def describe(chosen, size):
+    f = chosen[0]
+    if f.get("vcodec") != "none" and f.get("height"):
+      resolution = f"{f['width']}x{f['height']}" if f.get("width") else f"{f['height']}p"
+    elif f.get("abr"):
+      resolution = f"{f['abr']:.0f} kbps"
+    else:
+      resolution = None
+    size_str = f"~{get_size_str(size, color=False)}" if size else None
+    return ", ".join(filter(None, (resolution, size_str))) or None
+  
+  def price(selector):
+    try:
+      return FORMAT_INDEX.price(selector)
+    except Exception:
+      return [], 0
+  
+  hints = {"options": {}, "quality": {}, "subtitles": {}}
+  
+  # choices
+  for choice, selector in options.items():
+    chosen, size = price(selector)
+    if chosen:
+      hints["options"][choice] = describe(chosen, size)
+  
+  # video quality labels, each must pick a video stream not picked by a lower label
+  for choice in ("low", "medium", "high"):
+    seen = set()
+    hints["quality"][choice] = []
+    for label, (field, limit) in VIDEO_QUALITY_LIMITS.items():
+      video = FORMAT_INDEX.select(f"bestvideo[{field}<={limit}]")
+      if not video or video[0].get("format_id") in seen:
+        continue
+      seen.add(video[0].get("format_id"))
+      chosen, size = price(video_quality_selector(label, choice))
+      if chosen:
+        hints["quality"][choice].append((f"quality={label.upper() if label.endswith('k') else label}", describe(chosen, size)))
+  
+  # audio quality labels (all share 'bestaudio' if there is a single audio stream)
+  hints["quality"]["audio"] = []
+  for label, selector in AUDIO_QUALITY_SELECTORS.items():
+    chosen, size = price(selector)
+    if chosen:
+      hints["quality"]["audio"].append((f"quality={label}", describe(chosen, size)))
+  
+  # subtitle tracks (automatic captions are not downloaded)
+  for lang, tracks in (info.get("subtitles") or {}).items():
+    if lang == "live_chat" or not tracks:
+      continue
+    hints["subtitles"][lang] = tracks[0].get("name") or ", ".join(sorted({t.get("ext") for t in tracks if t.get("ext")})) or None
+  
+  return hints
 
 # function for displaying loader for fetch media information
 def display_fetch_loader():
@@ -117,12 +312,13 @@ def display_fetch_loader():
   
   print(f"{CLR_BRIGHT_BLUE}{CLR_ITALIC}Fetching media information", end='', flush=True)
   dots = 0
-  while not is_info_loaded:
-    time.sleep(.5)
+  # wakes up as soon as the information is loaded
+  while not is_info_loaded.wait(.5):
     print(".", end='', flush=True)
     dots += 1
     if dots >= 3:
-      time.sleep(.5)
+      if is_info_loaded.wait(.5):
+        break
       print(f"\b\b\b   \b\b\b", end='', flush=True)
       dots = 0
   print(f"{'\b'*dots + ' '*dots + '\b'*dots}{CLR_RESET}", end='\t', flush=True)
@@ -302,11 +498,13 @@ def init():
   Returns:
       threading.Thread: The background module preloading thread.
   """
-  # start = time.perf_counter()
+  init_start = time.perf_counter()
   
   # optimization: parse arguments only if user has given atleast one argument
   if len(sys.argv) > 1:
-    global DEBUG, VERBOSE, DOWNLOAD_DIR
+    global DEBUG, VERBOSE, DOWNLOAD_DIR, NO_CACHE, CACHE_DIR, SPECULATE, BATCH, BATCH_CHOICE, JOBS, PER_SITE
+    global NO_ARCHIVE, ARCHIVE_PATH, ARCHIVE_IMPORT, RESUME, FRAGMENTS, REQUEST_RATE, LIMIT_RATE, PIPELINE_DEPTH
+    global STAGING_DIR, EVENTS
     
     # Parse command line arguments
     from yodo.cli import parse_cli_args
@@ -320,7 +518,39 @@ def init():
     DEBUG = args.debug
     VERBOSE = args.verbose
     DOWNLOAD_DIR = args.download_dir
+    STAGING_DIR = args.staging_dir
+    if args.profile is not None:
+      # spans of everything up to here, then profile the rest of the run
+      import atexit
+      from yodo.utils import profiler
+      profiler.start(args.profile, origin=_perf_startup_time_start)
+      profiler.record("import", _perf_startup_time_start, init_start)
+      profiler.record("parse arguments", init_start, time.perf_counter())
+      atexit.register(write_profile)
+    EVENTS = args.events
+    NO_CACHE = args.no_cache
+    CACHE_DIR = args.cache_dir
+    SPECULATE = args.speculate
+    BATCH = args.batch
+    BATCH_CHOICE = args.choice or BATCH_CHOICE
+    JOBS = args.jobs
+    PER_SITE = args.per_site
+    NO_ARCHIVE = args.no_archive
+    ARCHIVE_PATH = args.archive
+    ARCHIVE_IMPORT = args.archive_import
+    RESUME = args.resume
+    REQUEST_RATE = args.request_rate
+    if args.limit_rate:
+      from yodo.utils.bandwidth import parse_rate
+      LIMIT_RATE = parse_rate(args.limit_rate)
+    if args.pipeline_depth:
+      from yodo.utils.pipeline import parse_depths
+      PIPELINE_DEPTH = parse_depths(args.pipeline_depth)
+    if args.fragments:
+      from yodo.utils.fragments import parse_bounds
+      FRAGMENTS = parse_bounds(args.fragments)
     TO_UPDATE = args.update
+    DAEMON_COMMAND = args.daemon
     
     # Rule: debug implies verbose
     if DEBUG and not VERBOSE:
@@ -333,34 +563,28 @@ def init():
     if TO_UPDATE:
       from yodo.updater.update_handler import update
       update() # update both yodo and yt-dlp to the latest stable version
+    
+    # start/stop/status of the warm background daemon
+    if DAEMON_COMMAND:
+      from yodo.daemon import handle_command
+      handle_command(DAEMON_COMMAND)
       
   global Thread
   import importlib
   from threading import Thread
   
   # lazy preloading (background module preloading) logic
-  modules_to_preload = (
-    "re",
-    "shlex",
-    "unicodedata",
-    "urllib.parse",
-    "yt_dlp",
-    "yt_dlp.utils",
-    "yt_dlp.extractor",
-    "yt_dlp.extractor.common",
-    "yt_dlp.extractor.youtube",
-    #"yodo.updater.update_handler",
-    "yodo.utils.yodo_documentation",
-    "yodo.utils.prompt_validator",
-    "yodo.utils.terminal_utils"
-  )
-  
   def preload_modules():
-    for module in modules_to_preload:
-      try:
-        importlib.import_module(module)
-      except Exception as e:
-        print(f"{CLR_WARNING}Failed to preload '{module}': {CLR_ERROR}{e}{CLR_RESET}")
+    with span("preload"):
+      for module in PRELOAD_MODULES:
+        # batch mode and resumed jobs never prompt, skip prompt_toolkit
+        if (BATCH is not None or RESUME) and module == "yodo.utils.prompt_validator":
+          continue
+        try:
+          with span(f"import {module}"):
+            importlib.import_module(module)
+        except Exception as e:
+          print(f"{CLR_WARNING}Failed to preload '{module}': {CLR_ERROR}{e}{CLR_RESET}")
     
   # start background preload
   preload_modules_thread = Thread(target=preload_modules, daemon=True)
@@ -370,6 +594,34 @@ def init():
       
   return preload_modules_thread
 
+def validate_url(url):
+  """Function to check the url is acceptable input for yt-dlp.
+
+    Rules:
+      • scheme is http or https
+      • domain exists (netloc)
+      • URL point to a resource (path/query)
+    Returns:
+      • None if valid
+      • error message if invalid
+  """
+  from urllib.parse import urlparse
+  
+  parsed = urlparse(url)
+
+  if parsed.scheme not in ("http", "https"):
+    return "URL must start with http or https"
+
+  if not parsed.netloc:
+    return "URL must contain a valid domain"
+
+  if not parsed.path.strip("/") and not parsed.query:
+    return "URL must point to a specific resource"
+
+  # Return None if all checks passed
+  return None
+
+@traced("url input")
 def url_input_handler():
   """
   Prompt the user to enter a media URL and validate before returning
@@ -386,32 +638,6 @@ def url_input_handler():
       If the user chooses to exit the program.
   """
   
-  def validate_url(url):
-    """Function to check the url is acceptable input for yt-dlp.
-    
-      Rules:
-        • scheme is http or https
-        • domain exists (netloc)
-        • URL point to a resource (path/query)
-      Returns:
-        • None if valid
-        • error message if invalid
-    """
-    
-    parsed = urlparse(url)
-  
-    if parsed.scheme not in ("http", "https"):
-      return "URL must start with http or https"
-  
-    if not parsed.netloc:
-      return "URL must contain a valid domain"
-  
-    if not parsed.path.strip("/") and not parsed.query:
-      return "URL must point to a specific resource"
-    
-    # Return None if all checks passed
-    return None
-    
   # Intro message
   print(f"{CLR_BRIGHT_GREEN}YODO — Universal Media Downloader{CLR_RESET}")
   print(f"{CLR_BRIGHT_GREEN}Github: https://github.com/somostro/yodo{CLR_RESET}\n")
@@ -457,20 +683,40 @@ def url_input_handler():
     if "www.instagram.com/reels/audio" in user_input:
       print(f"{CLR_ERROR}Instagram audio files cannot be downloaded.{CLR_RESET}\n")
       continue
-    if "/playlist" in user_input:
-      print(f"{CLR_ERROR}Downloading playlists is not currently supported, this feature will be added soon.{CLR_RESET}\n")
-      continue
     
     # validate URL
     error = validate_url(user_input)
     if error:
       print(f"{CLR_ERROR}Invalid URL, {error}{CLR_RESET}\nPlease enter a valid video/audio link from supported sites ({CLR_GREEN}'YouTube', 'Instagram', 'Reels', 'TikTok', 'SoundCloud' etc{CLR_RESET}).\nType '{CLR_CYAN}cancel{CLR_RESET}' to exit\n")
     else:
+      # start importing the matching site extractor while the remaining modules load
+      from yodo.utils.extractor_index import preload_extractor
+      preload_extractor(user_input)
       break
       
   return user_input
   
-def fetch_details(url, options):
+# YDL options for fetching metadata
+def info_ydl_opts():
+  return {
+    "verbose": VERBOSE,
+    "quiet": not VERBOSE,
+    "skip_download": True,
+    "no_warnings": not DEBUG,
+    # a video URL with a playlist parameter (watch?v=..&list=..) is the video only
+    "noplaylist": True,
+    "remote_components": {"ejs:github"},
+    "js_runtimes": {
+      "deno": {
+        "exec": "deno",
+        "args": ["run", "--quiet", "--allow-net", "--allow-read"],
+      }
+    },
+    "js_runtime": "deno"
+  }
+
+@traced("extract")
+def fetch_details(url, options, info=None, key=None):
   """
   Fetch media information for a given URL and estimate file sizes.
 
@@ -479,12 +725,16 @@ def fetch_details(url, options):
   Args:
     url (str): Media URL to extract information from.
     options (dict): yt-dlp format selectors for each quality option.
+    info (dict, optional): Already extracted info dict (e.g. a prefetched playlist entry), skips extraction.
+    key (str, optional): Cache key of the URL (info_cache.media_key()), computed here if not given.
 
   Returns:
     tuple:
       (options_file_size, options_details, info) where:
         - options_file_size maps each option to its estimated size
         - options_details contains audio/video format attributes
+        - info is the extracted yt-dlp info dict, reused by the download step
+      (None, None, info) for playlist/channel URLs, info is the unprocessed playlist with lazy 'entries'
 
   Exits:
       Terminates the program on unsupported URLs or extraction errors.
@@ -494,41 +744,52 @@ def fetch_details(url, options):
   options_details = {'low': {'video': None, 'audio': None}, 'medium': {'video': None, 'audio': None}, 'high': {'video': None, 'audio': None}, 'audio': {'video': None, 'audio': None}}
   
   global is_info_loaded
+  from threading import Event
+  is_info_loaded = Event()
+  
+  # the loader animation is for terminals, batch mode only logs the result
+  show_loader = not VERBOSE and BATCH is None
+  
+  # on-disk metadata cache, skips extraction for recently fetched URLs
+  info_cache = None if NO_CACHE else InfoCache(CACHE_DIR)
   
   # Display media fetch loader
-  if not VERBOSE:
+  if show_loader:
     loader_thread = Thread(target=display_fetch_loader, daemon=True)
     loader_thread.start() # start the loader
   # if VERBOSE enabled, display media fetch details (in verbose mode)
-  else:
+  elif VERBOSE:
     print(center_title(f"{CLR_BRIGHT_BLUE}Fetch Media Information{CLR_RESET}"))
   
   try:
-    # YDL options for fetching metadata
-    INFO_YDL_OPTS = {
-      "verbose": VERBOSE,
-      "quiet": not VERBOSE,
-      "skip_download": True,
-      "no_warnings": not DEBUG,
-      "remote_components": {"ejs:github"},
-      "js_runtimes": {
-        "deno": {
-          "exec": "deno",
-          "args": ["run", "--quiet", "--allow-net", "--allow-read"],
-        }
-      },
-      "js_runtime": "deno"
-    }
-    
-    with YoutubeDL(INFO_YDL_OPTS) as ydl:
+    with YoutubeDL(info_ydl_opts()) as ydl:
       # track loading time of fetching info
       if DEBUG:
         info_load_time = time.perf_counter()
       
-      info = ydl.extract_info(url, download=False)
+      from_cache = False
+      if info is None and info_cache:
+        info = info_cache.load(url, key)
+        from_cache = info is not None
       
-      if not VERBOSE:
-        is_info_loaded = True
+      if from_cache:
+        if DEBUG:
+          log_debug("Media information loaded from cache:", info_cache.cache_dir)
+      elif info is None:
+        # unprocessed first, so playlist entries stay lazy
+        info = ydl.extract_info(url, download=False, process=False)
+        if not is_playlist(info):
+          info = ydl.process_ie_result(info, download=False)
+      
+      if is_playlist(info):
+        if show_loader:
+          is_info_loaded.set()
+          loader_thread.join()
+          print(f"{CLR_RESET}{CLR_BRIGHT_BLUE}✓done.{CLR_RESET}")
+        return None, None, info
+      
+      if show_loader:
+        is_info_loaded.set()
         loader_thread.join() # Wait for loader to finish cleanly
         print(f"{CLR_RESET}{CLR_BRIGHT_BLUE}✓done.{CLR_RESET}") # loading finished
       
@@ -552,8 +813,8 @@ def fetch_details(url, options):
       
       # check if the input video url is Invalid(Instagram post) or not
       if duration_str == "00:00:00":
-        print(f"{CLR_ERROR}There is no video in this URL, Posts or Images cannot be downloaded.{CLR_RESET}\nExiting...")
-        sys.exit(1)
+        print(f"{CLR_ERROR}There is no video in this URL, Posts or Images cannot be downloaded.{CLR_RESET}")
+        exit_or_fail("no video in this URL")
   
       # set the base name of the file
       global FINAL_FILENAME
@@ -565,13 +826,31 @@ def fetch_details(url, options):
       # debugging for loop timing
       if DEBUG:
         for_start = time.perf_counter()
+      format_span = begin_span("format selection")
+      
+      # one index over all formats answers every option (and custom qualities later on)
+      global FORMAT_INDEX
+      FORMAT_INDEX = FormatIndex(info, ydl)
       
+      # ask the server for sizes the extractor didn't report (written back into info)
+      missing_sizes = formats_to_probe(FORMAT_INDEX, options.values())
+      if missing_sizes:
+        if DEBUG:
+          probe_start = time.perf_counter()
+        with span("size probing"):
+          probed = probe_sizes(missing_sizes, ydl)
+        if DEBUG:
+          log_debug("Probed sizes:", probed or "none")
+          log_timing("Size probing", (time.perf_counter() - probe_start))
+      
+      # cached after probing, so the learned sizes are cached too
+      if info_cache and not from_cache:
+        info_cache.store(url, info, key)
       
       for label, fmt in options.items():
         try:
           # Resolve which format yt-dlp would pick
-          selector = ydl.build_format_selector(fmt)
-          chosen = list(selector(info))
+          chosen = FORMAT_INDEX.select(fmt)
           
           if DEBUG:
             _chosen_formats = [f.get("format_id") for f in chosen]
@@ -637,6 +916,7 @@ def fetch_details(url, options):
             log_debug(f"Skipping incomplete formats for '{label}'")
           options_file_size[label] = f"{CLR_ERROR}Not Available{CLR_RESET}"
       
+      end_span(format_span)
       # debugging
       if DEBUG:
         log_timing("Format selection loop", (time.perf_counter()-for_start))
@@ -658,12 +938,12 @@ def fetch_details(url, options):
       print(f"{CLR_ERROR}An unexpected error occurred while fetching media information:\n{e}{CLR_RESET}")
     
     print(print_crossline())
-    print("Exiting...")
-    sys.exit(1)
+    exit_or_fail(f"failed to fetch media information: {e}")
     
-  return options_file_size, options_details
+  return options_file_size, options_details, info
 
-def choice_input_handler(options_file_size, options_details):
+@traced("prompt")
+def choice_input_handler(options_file_size, options_details, completion_hints=None, preset=None):
   """
   Display available audio/video download options, accept user choice,
     validate optional attributes, and return the selected option with
@@ -672,6 +952,8 @@ def choice_input_handler(options_file_size, options_details):
     Args:
       options_file_size (dict): Estimated file sizes for each choice (low, medium, high, audio).
       options_details (dict): Format and codec details for available options.
+      completion_hints (dict, optional): Media specific prompt completions (see build_completion_hints()).
+      preset (str, optional): Choice and arguments as typed at the prompt (batch mode), skips the prompt.
 
     Returns:
       dict:
@@ -679,6 +961,7 @@ def choice_input_handler(options_file_size, options_details):
 
     Raises:
       SystemExit: If the user cancels the operation.
+      ItemFailed: If the preset is not available or invalid for this media (batch mode).
   """
   
     # *here arguments are referred as attributes.
@@ -800,7 +1083,9 @@ def choice_input_handler(options_file_size, options_details):
         {details_formated[choice]['audio']}{CLR_RESET}""" if details_formated[choice]['video'] else ''}
       {move_up_1_line}"""
   
-  print(f"""{CLR_BRIGHT_GREEN}{CLR_BOLD}choose an option from the list:{CLR_RESET}
+  # the options list and the guide are only needed at the prompt
+  if preset is None:
+    print(f"""{CLR_BRIGHT_GREEN}{CLR_BOLD}choose an option from the list:{CLR_RESET}
   {choice_description['low']}
   {choice_description['medium']}
   {choice_description['high']}
@@ -815,16 +1100,17 @@ def choice_input_handler(options_file_size, options_details):
       _available_choices.append(_choice)
 
   # Guide user to select a available choice and optional arguments/attributes
-  print(f"""{CLR_BRIGHT_GREEN}How to choose:{CLR_RESET}
+  if preset is None:
+    print(f"""{CLR_BRIGHT_GREEN}How to choose:{CLR_RESET}
   • Type one option: {CLR_CYAN}{', '.join(_available_choices)}{CLR_RESET}
   • Optionally add arguments using {CLR_CYAN}<key>=<value>{CLR_RESET}
   • Examples:{CLR_CYAN}
       high
       audio quality=low format=mp3
   {CLR_RESET}""")
-  
-  print(f"Type '{CLR_CYAN}<choice> help{CLR_RESET}' to see available arguments.")
-  print(f"Type '{CLR_CYAN}cancel{CLR_RESET}' to cancel.\n")
+    
+    print(f"Type '{CLR_CYAN}<choice> help{CLR_RESET}' to see available arguments.")
+    print(f"Type '{CLR_CYAN}cancel{CLR_RESET}' to cancel.\n")
 
   
   # function to handle and validate user input and its attribute values
@@ -843,19 +1129,13 @@ def choice_input_handler(options_file_size, options_details):
     def validate_audio_quality(value):
       value = value.strip().lower()
       
-      QUALITY_LABELS_MAP = {
-        "high": "bestaudio",
-        "medium": "bestaudio[abr<=128]/bestaudio",
-        "low": "worstaudio[abr<=64]/worstaudio"
-      }
-      
-      if value in QUALITY_LABELS_MAP:
+      if value in AUDIO_QUALITY_SELECTORS:
         # auto decide audio format based on the choice user selected
         if options_details[value]['audio']:
           options_attributes["audio"]["format"] = codec_to_ext(options_details[value]['audio']['Audio codec'])
         else:
           options_attributes["audio"]["format"] = codec_to_ext(None) # use default
-        return QUALITY_LABELS_MAP[value]
+        return AUDIO_QUALITY_SELECTORS[value]
       elif value.isdigit():
         return f"bestaudio[abr<={int(value)}]/bestaudio"
       elif value == 'help':
@@ -865,41 +1145,10 @@ def choice_input_handler(options_file_size, options_details):
     def validate_video_quality(value, choice):
       value = value.strip().lower()
       
-      QUALITY_FORMAT = {
-        "low": 
-          {
-            "video": "(bestvideo[height<=360]/bestvideo[height<=480])+(worstaudio[abr<=64]/worstaudio)",
-            "audio": "(worstaudio[abr<=64]/worstaudio)"
-          },
-        "medium": 
-          {
-            "video": "(bestvideo[height<=720]/bestvideo[height<=1080])+(bestaudio[abr<=128]/bestaudio)",
-            "audio": "(bestaudio[abr<=128]/bestaudio)"
-          },
-        "high": 
-          {
-            "video": "bestvideo+bestaudio/best",
-            "audio": "bestaudio"
-          }
-      }
-      
-      ALLOWED_VPIXEL_QUALITY = {"144", "240", "360", "480", "720", "1080", "1440", "2160"}
-      ALLOWED_HPIXEL_QUALITY = {
-        "2": "1920",
-        "4": "3840",
-        "8": "7680"
-      }
-      
       if value == 'help':
         raise ValueError(VIDEO_QUALITY_DESCRIPTION)
-      elif value.endswith('p'):
-        value = value[:-1]
-        if value in ALLOWED_VPIXEL_QUALITY:
-          return f"bestvideo[height<={value}]+{QUALITY_FORMAT[choice]["audio"]}/{QUALITY_FORMAT[choice]["video"]}"
-      elif value.endswith('k'):
-        value = value[:-1]
-        if value in ALLOWED_HPIXEL_QUALITY:
-          return f"bestvideo[width<={ALLOWED_HPIXEL_QUALITY[value]}]+{QUALITY_FORMAT[choice]["audio"]}/{QUALITY_FORMAT[choice]["video"]}"
+      elif value in VIDEO_QUALITY_LIMITS:
+        return video_quality_selector(value, choice)
       
       raise ValueError(f"Invalid value (quality: '{value}').\n{VIDEO_QUALITY_DESCRIPTION}")
     
@@ -993,6 +1242,10 @@ def choice_input_handler(options_file_size, options_details):
       # logic if the value is an Extension
       ALLOWED_LANGS = {"all", "en", "hi", "ta", "te", "ml", "es", "fr", "de", "ja", "ko", "ar", "ru", "pt", "zh-Hans", "zh-Hant"}
       lang = value
+      # languages of the media keep their original case (e.g. 'zh-Hans', 'en-US')
+      media_langs = {l.lower(): l for l in (completion_hints or {}).get("subtitles", {})}
+      if lang in media_langs:
+        return True, media_langs[lang]
       if lang in ALLOWED_LANGS:
         return True, lang
       elif value == 'help':
@@ -1142,7 +1395,8 @@ def choice_input_handler(options_file_size, options_details):
 
   
   while True:
-    user_input = prompt_screen()
+    # batch mode: the preset is the only input, a rejected preset fails the item instead of prompting again
+    user_input = prompt_screen(completion_hints) if preset is None else " ".join(preset.split()).lower()
     
     if not user_input:
       print(f"""{CLR_WARNING}
@@ -1170,6 +1424,8 @@ def choice_input_handler(options_file_size, options_details):
       # print error message
       if not ok:
         print(f"\n{CLR_ERROR}{error_msg}{CLR_RESET}\n")
+        if preset is not None:
+          raise ItemFailed(f"invalid arguments for this media: '{preset}'")
         continue
       
       # stop prompting and continue further actions
@@ -1183,6 +1439,8 @@ def choice_input_handler(options_file_size, options_details):
         f"{CLR_RESET}",
         sep='\n'
       )
+      if preset is not None:
+        raise ItemFailed(f"choice '{choice}' is not available for this media")
       continue
     
     print(f"""{CLR_ERROR}
@@ -1204,6 +1462,16 @@ def choice_input_handler(options_file_size, options_details):
     # format attr info
     print(f"{p_s(2)}{CLR_ORANGE}Format: {CLR_RESET}{options_attributes[opt]['format']}")
     
+    # estimated size of the final selection (custom quality included)
+    if options_attributes[opt]['quality']:
+      try:
+        _, estimated_size = FORMAT_INDEX.price(options_attributes[opt]['quality'])
+      except Exception:
+        estimated_size = 0
+      print(f"{p_s(2)}{CLR_ORANGE}Estimated size: {CLR_RESET}{get_size_str(estimated_size)}")
+    else:
+      print(f"{p_s(2)}{CLR_ORANGE}Estimated size: {CLR_RESET}{options_file_size[choice]}")
+    
     # thumbnail attr info
     print(f"{p_s(2)}{CLR_ORANGE}Thumbnail: {CLR_RESET}{'Enabled' if options_attributes[opt]['thumbnail']['enabled'] else 'Disabled'}{(', '+CLR_ORANGE+'Extension: '+CLR_RESET+options_attributes[opt]['thumbnail']['ext']) if options_attributes[opt]['thumbnail']['enabled'] else ''}")
     
@@ -1222,10 +1490,48 @@ def choice_input_handler(options_file_size, options_details):
     # subtitles attr info
     print(f"{p_s(2)}{CLR_ORANGE}Subtitles: {CLR_RESET}{'Enabled' if options_attributes['video']['subtitles']['enabled'] else 'Disabled'}{(', '+CLR_ORANGE+'Subtitles format: '+CLR_RESET+options_attributes['video']['subtitles']['subtitlesformat']) if options_attributes['video']['subtitles']['enabled'] else ''}")
   
-  return {"choice": choice, "options_attributes": options_attributes}
+  return {"choice": choice, "options_attributes": options_attributes, "preset": user_input}
+
+def unselect_formats(info):
+  """
+  Return the info dict without the result of an earlier format selection.
+
+  process_ie_result() copies the selected format onto the info dict (url, protocol, requested_formats, ...).
+  Processing it again with another selector keeps those fields, e.g. an HLS audio-only download inherits the
+  requested_formats of the video+audio selection of fetch_details() and fetches the wrong playlist.
+  """
+  if not info.get("format_id"):
+    return info
+  selected = info.get("requested_formats") or [
+    f for f in info.get("formats") or [] if f.get("format_id") == info["format_id"]
+  ]
+  stale = {"requested_formats", "format", "format_id", "format_note", "resolution", "dynamic_range", "aspect_ratio"}
+  for f in selected:
+    stale.update(f)
+  stale.difference_update(("formats", "duration"))
+  return {key: value for key, value in info.items() if key not in stale}
+
+def media_url_expired(error):
+  """
+  Return True if a download from a reused info dict failed because its media URLs are no longer valid:
+  ReExtractInfo, or HTTP 403/410 (expired signed URL) as the cause of a DownloadError.
+  Other failures (postprocessing, network, disk, unavailable format) would fail the same way after a new extraction.
+  """
+  cause, seen = error, set()
+  while cause is not None and id(cause) not in seen:
+    seen.add(id(cause))
+    if isinstance(cause, ReExtractInfo):
+      return True
+    if isinstance(cause, DownloadError):
+      cause = (cause.exc_info or (None, None))[1]
+      continue
+    if getattr(cause, "status", getattr(cause, "code", None)) in (403, 410):
+      return True
+    cause = cause.__cause__ or cause.__context__
+  return False
 
 # main function
-def download_media(url):
+def download_media(url, preset=None, info=None, job=None):
   """
   Download media (video or audio) from a given URL using yt-dlp.
 
@@ -1242,30 +1548,113 @@ def download_media(url):
 
   Args:
     url (str): Media URL to download from.
+    preset (str, optional): Choice and arguments used instead of the choice prompt (batch mode).
+    info (dict, optional): Already extracted info dict (prefetched playlist entry).
+    job (dict, optional): Unfinished journal job to resume (same choice, format IDs and output template).
+  Returns:
+    str: Path of the downloaded file (playlists and media already in the download archive: a short result summary).
   Exits:
     Terminates the program if the user cancels the operation or if a critical download or postprocessing error occurs.
+    In batch mode ItemFailed is raised instead.
+  """
+  prepared = prepare_media(url, preset, info, job)
+  # skipped (already in the library)
+  if isinstance(prepared, str):
+    return prepared
+  # playlist/channel URL, entries are downloaded one by one
+  if "playlist" in prepared:
+    return download_playlist(url, prepared["playlist"], preset)
+  return finish_media(prepared, fetch_media(prepared))
+
+# download stages (run one after another by download_media(), overlapped by the batch pipeline)
+
+def install_request_hooks():
   """
+  Hook request pacing and the bandwidth cap into every yt-dlp request (see yodo.utils.request_hooks).
+
+  Installed once per run, the limiters keep their state (back-offs, the bandwidth quantum of this process)
+  across all downloads of the run.
+  """
+  global REQUEST_HOOKS_INSTALLED
+  if REQUEST_HOOKS_INSTALLED:
+    return
   
-  download_dir = resolve_download_dir(DOWNLOAD_DIR)
+  # pace the requests of rate limited sites (token buckets shared with parallel jobs and other runs)
+  from yodo.utils import ratelimit
+  ratelimit.install(ratelimit.RateLimiter(*ratelimit.parse_rate_limits(REQUEST_RATE)))
   
-  # Categories
-  OPTIONS = {
-    # try 360p, else 480p (muxed). then fallback to < 480p merged video+audio
-    "low": "(bestvideo[height<=360]/bestvideo[height<=480])+(worstaudio[abr<=64]+worstaudio)",
-    # try 720p, else 1080p. merged video+audio
-    "medium": "(bestvideo[height<=720]/bestvideo[height<=1080])+(bestaudio[abr<=128]+bestaudio)",
-    # high = best available
-    "high": "bestvideo+bestaudio/best",
-    # audio only
-    "audio": "bestaudio"
-  }
+  # one bandwidth cap for all downloads and fragments
+  if LIMIT_RATE:
+    from yodo.utils import bandwidth
+    bandwidth.install(bandwidth.BandwidthLimiter(LIMIT_RATE))
   
-  options_file_size, options_details = fetch_details(url, OPTIONS)
+  REQUEST_HOOKS_INSTALLED = True
+
+@traced("prepare")
+def prepare_media(url, preset=None, info=None, job=None):
+  """
+  Extract stage: fetch the media details, resolve the choice and build the yt-dlp options of a download.
+
+  Everything later stages need is returned in one dict (nothing is read from the per download globals
+  afterwards), so the next download can be prepared while this one is still running.
+
+  Returns:
+    dict: the prepared download, {'playlist': info} for playlists
+    str: result summary if the download is skipped (already in the library)
+    """
+  
+  download_dir = resolve_download_dir(DOWNLOAD_DIR)
   
-  result = choice_input_handler(options_file_size, options_details)
+  # request pacing and bandwidth cap (once per run)
+  install_request_hooks()
+  
+  # cache and archive key of the URL, matched against the extractors once per URL
+  from yodo.utils.info_cache import media_key
+  key = media_key(url)
+  
+  # media already in the library (no network access)
+  archived = None if job else check_archive(url, preset, info, key)
+  if archived:
+    return f"already in library: {archived}"
+  
+  # Categories (custom qualities replace the selector of the choice below)
+  OPTIONS = dict(CHOICE_FORMATS)
+  
+  # info dict is kept so the download step doesn't run the extractor again
+  options_file_size, options_details, media_info = fetch_details(url, OPTIONS, info, key)
+  
+  # playlist/channel URL
+  if options_file_size is None:
+    return {"playlist": media_info}
+  
+  # start fetching the most likely stream while the user is choosing
+  speculative = None
+  if SPECULATE and preset is None:
+    from yodo.utils.speculative import start_speculative_download, record_choice
+    # without the selection of fetch_details(), its requested_formats/url would be downloaded instead
+    speculative = start_speculative_download(unselect_formats(media_info), OPTIONS, SPECULATE)
+    if DEBUG and speculative:
+      log_debug("Speculative download started, format:", speculative.format_id)
+  
+  global FINAL_FILENAME, FINAL_TITLE, FINAL_EXT
+  if job:
+    # resumed job: the journaled choice, not a new prompt
+    result = {"choice": job["choice"], "options_attributes": job["options_attributes"], "preset": job["preset"]}
+    FINAL_FILENAME = job.get("filename") or FINAL_FILENAME
+    FINAL_TITLE, _, FINAL_EXT = FINAL_FILENAME.rpartition(".")
+  elif preset is None:
+    result = choice_input_handler(options_file_size, options_details, build_completion_hints(media_info, OPTIONS))
+  else:
+    result = choice_input_handler(options_file_size, options_details, preset=preset)
   choice = result["choice"]
   options_attributes = result["options_attributes"]
   
+  global LAST_PRESET
+  LAST_PRESET = result["preset"]
+  
+  if SPECULATE and preset is None:
+    record_choice(choice)
+  
   # yt-dlp options (simple, universal)
   audio_opts = {}
   video_opts = {}
@@ -1277,50 +1666,30 @@ def download_media(url):
     # set audio_quality to global options dict
     OPTIONS["audio"] = audio_quality
     
-    # FFmpegExtractAudio key
-    key_extract_audio = [{
-      "key": "FFmpegExtractAudio",
-      "preferredcodec": options_attributes["audio"]["format"],
-      "preferredquality": "0"
-    }]
-    # thumbnail converter key
-    key_thumbnail_converter = []
-    # thumbnail embedding key
-    key_thumbnail = []
-    # metadata key
-    key_metadata = []
-    
+    # audio conversion key: keeps or stream-copies the audio unless another codec was asked for
+    # (see yodo.utils.audio)
+    from yodo.utils.audio import plan as plan_audio
+    key_extract_audio = plan_audio(options_attributes["audio"])
     # download thumbnail
     write_thumbnail = {}
     # download metadata 
     add_metadata = {}
     
     if options_attributes["audio"]["thumbnail"]["enabled"]:
-      key_thumbnail_converter = [{
-        "key": "FFmpegThumbnailsConvertor",
-        "format": options_attributes["audio"]["thumbnail"]["ext"]
-      }]
-      key_thumbnail = [{
-        "key": "EmbedThumbnail"
-      }]
       write_thumbnail = {
         "writethumbnail": True # actually download the thumbnail
       }
     
     if options_attributes["audio"]["metadata"]:
-      key_metadata = [{
-        "key": "FFmpegMetadata"
-      }]
       add_metadata = {
         "addmetadata": True # enable metadata extraction
       }
     
-    # audio postprocessors(converter) and downloader options 
+    # tags and cover are written in place with mutagen (see yodo.utils.tagging)
+    from yodo.utils.tagging import plan as plan_tagging
     audio_postprocessors_opts = [
         *key_extract_audio,
-        *key_thumbnail_converter,
-        *key_metadata, # Force embedding metadata first
-        *key_thumbnail
+        *plan_tagging(options_attributes["audio"])
       ]
     
     # audio downloader(write thumbnail, add metadata) options
@@ -1347,18 +1716,6 @@ def download_media(url):
       if DEBUG:
         log_debug(f"Quality format: { options_attributes["video"]["quality"]}")
     
-    # FFmpegVideoRemuxer key
-    key_remux_video = [{
-      "key": "FFmpegVideoRemuxer",
-      "preferedformat": options_attributes["video"]["format"]
-    }]
-    # thumbnail converter key
-    key_thumbnail_converter = []
-    # thumbnail embedding key
-    key_thumbnail = []
-    # metadata key
-    key_metadata = []
-
     # download thumbnail
     write_thumbnail = {}
     # download metadata 
@@ -1367,21 +1724,11 @@ def download_media(url):
     subtitles_opts = {}
   
     if options_attributes["video"]["thumbnail"]["enabled"]:
-      key_thumbnail_converter = [{
-        "key": "FFmpegThumbnailsConvertor",
-        "format": options_attributes["video"]["thumbnail"]["ext"]
-      }]
-      key_thumbnail = [{
-        "key": "EmbedThumbnail"
-      }]
       write_thumbnail = {
         "writethumbnail": True # actually download the thumbnail
       }
     
     if options_attributes["video"]["metadata"]:
-      key_metadata = [{
-        "key": "FFmpegMetadata"
-      }]
       add_metadata = {
         "addmetadata": True # enable metadata extraction
       }
@@ -1390,30 +1737,21 @@ def download_media(url):
       subtitles_opts = {
         "writesubtitles": True,
         "subtitleslangs": [options_attributes["video"]["subtitles"]["lang"]],   # or ["all"]
-        "subtitlesformat": options_attributes["video"]["subtitles"]["subtitlesformat"],
-        "embedsubtitles": True
+        "subtitlesformat": options_attributes["video"]["subtitles"]["subtitlesformat"]
       }
-  
-    # audio postprocessors(converter) and downloader options 
-    video_postprocessors_opts = [
-        *key_remux_video,
-        *key_thumbnail_converter,
-        *key_thumbnail,
-        *key_metadata
-      ]
     
-    # audio downloader(write thumbnail, add metadata) options
+    # video downloader(write thumbnail, add metadata, subtitles) options
     video_downloader_opts = {
       **write_thumbnail,
       **add_metadata,
       **subtitles_opts
     }
     
-    # general video options
+    # remux, metadata, chapters, subtitles and thumbnail are written in a single ffmpeg pass
+    # (see yodo.utils.postprocess)
+    from yodo.utils.postprocess import plan
     video_opts = {
-      "postprocessors": [
-        *video_postprocessors_opts
-      ],
+      **plan(options_attributes["video"]),
       **video_downloader_opts
     }
 
@@ -1426,17 +1764,14 @@ def download_media(url):
     ensure_dir_exists(download_dir)
   
   # general yt-dlp opts
-  global FINAL_TITLE
   
   YDL_OPTS = {
     "format": OPTIONS[choice],
     "outtmpl": os.path.join(download_dir, f"{FINAL_TITLE}.%(ext)s"),  # Download path
     "noplaylist": True,  # Download only single item, not whole playlist
     "overwrites": False,
-    "concurrent_fragment_downloads": 3, # number of fragments of a video that are downloaded simultaneously
+    "concurrent_fragment_downloads": FRAGMENTS[1], # max fragments of a video downloaded simultaneously (adapted below)
     "update_time": False, # video download date = file creation date
-    "sleep_interval": 1,
-    "max_sleep_interval": 5,
     "remote_components": {"ejs:github"},
     "js_runtimes": {
         "deno": {
@@ -1454,7 +1789,92 @@ def download_media(url):
     **audio_opts,
     **video_opts
   }
+  
+  # write-ahead journal: the job stays journaled until the download finished ('yodo --resume')
+  from yodo.utils.journal import Journal, job_id
+  journal = Journal()
+  
+  # download and postprocess on fast storage, the finished files are moved to download_dir once
+  from yodo.utils.staging import claim, install, resolve_staging_dir
+  if job:
+    staging = job.get("staging")
+  else:
+    staging_dir = resolve_staging_dir(STAGING_DIR or os.getenv("STAGING_DIR"), download_dir)
+    staging = os.path.join(staging_dir, job_id(url, LAST_PRESET)) if staging_dir else None
+  if staging:
+    staging = claim(staging)
+    install()
+    YDL_OPTS["outtmpl"] = f"{FINAL_TITLE}.%(ext)s"
+    YDL_OPTS["paths"] = {"home": download_dir, "temp": staging}
+    if DEBUG:
+      log_debug("Staging directory:", staging)
+  
+  if job:
+    # same streams and file names as before, so yt-dlp continues the partial files
+    YDL_OPTS["format"] = f"{job['format_id']}/{job['format']}" if job.get("format_id") else job["format"]
+    YDL_OPTS["outtmpl"] = job["outtmpl"]
+  try:
+    format_id = FORMAT_INDEX.select(YDL_OPTS["format"])[0]["format_id"] if not job else job.get("format_id")
+  except Exception:
+    format_id = None
+  try:
+    job = journal.begin(
+      url, LAST_PRESET,
+      choice=choice,
+      options_attributes=options_attributes,
+      format_id=format_id,
+      format=job["format"] if job else YDL_OPTS["format"],
+      outtmpl=YDL_OPTS["outtmpl"],
+      staging=staging,
+      filename=FINAL_FILENAME,
+      title=media_info.get("title")
+    )
+  except OSError as e:
+    job = None
+    if DEBUG:
+      log_debug("Failed to write the job journal:", e)
+  
+  # progress events of the download (progress view, '--events')
+  from yodo.utils.events import postprocessor_hooks, progress_hooks, publish
+  event_job = job["id"] if job else job_id(url, LAST_PRESET)
+  YDL_OPTS["progress_hooks"] = progress_hooks(event_job, url)
+  YDL_OPTS["postprocessor_hooks"] = postprocessor_hooks(event_job, url)
+  publish("job", event_job, url, status="started", choice=LAST_PRESET, title=media_info.get("title"))
+  
+  return {
+    "url": url,
+    "key": key,
+    "media_info": media_info,
+    "choice": choice,
+    "preset": LAST_PRESET,
+    "ydl_opts": YDL_OPTS,
+    "download_dir": download_dir,
+    "staging": staging,
+    "filename": FINAL_FILENAME,
+    "speculative": speculative,
+    "journal": journal,
+    "job": job,
+    "event_job": event_job,
+  }
 
+@traced("download")
+def fetch_media(prepared, postprocess=True):
+  """
+  Download stage: fetch the media of a prepared download.
+  
+  Args:
+    prepared (dict): see prepare_media()
+    postprocess (bool): run the postprocessors right away (False: postprocess_media() runs them later)
+  
+  Returns:
+    dict or False: yt-dlp info dict of the download, False if the download failed with a reported, non fatal error
+  """
+  url, media_info, choice = prepared["url"], prepared["media_info"], prepared["choice"]
+  speculative = prepared["speculative"]
+  YDL_OPTS = prepared["ydl_opts"]
+  if not postprocess:
+    YDL_OPTS = {**YDL_OPTS, "postprocessors": []}
+  
   try:
     _download_media_start = time.perf_counter() # to measure total download time (duration)
     # Download media
@@ -1462,27 +1882,63 @@ def download_media(url):
     with YoutubeDL(YDL_OPTS) as ydl:
       # download and get info
       info = False
+      
+      if prepared["staging"] and not postprocess:
+        # the download stays in the staging directory until postprocess_media() moves it
+        from yodo.utils.staging import keep_staged_pp
+        ydl.add_post_processor(keep_staged_pp(ydl), when="post_process")
+      
+      # raise/lower the fragments in flight by measured throughput and errors
+      if FRAGMENTS[0] < FRAGMENTS[1]:
+        from yodo.utils.fragments import FragmentController, attach
+        attach(ydl, FragmentController(
+          *FRAGMENTS,
+          log=(lambda message: ydl.to_screen(f"{CLR_DIM}[fragments] {message}{CLR_RESET}")) if VERBOSE else None
+        ))
+      
+      # hand over already fetched bytes of the speculative download (wrong guesses are discarded)
+      if speculative:
+        reused = speculative.adopt(ydl, media_info, YDL_OPTS["format"])
+        if DEBUG:
+          log_debug("Speculative download", "reused" if reused else "discarded")
+      
       try:
-        info = ydl.extract_info(url, download = True)
+        # reuse the already extracted info dict, only the media itself is fetched from here
+        # (same as yt-dlp's --load-info-json, format selection runs again with YDL_OPTS["format"])
+        try:
+          info = ydl.process_ie_result(unselect_formats(media_info), download = True)
+        except (ReExtractInfo, DownloadError) as e:
+          # extracted info is no longer usable (signed URLs expired and answer with 403/410), extract again
+          # from the webpage URL like yt-dlp's --load-info-json does, a real failure is raised again from there
+          if not media_url_expired(e):
+            raise
+          if DEBUG:
+            log_debug("Stale media info, re-extracting:", url, f"({e})")
+          if not NO_CACHE:
+            InfoCache(CACHE_DIR).invalidate(url, prepared["key"])
+          info = ydl.extract_info(media_info.get("webpage_url") or url, download = True)
       except Exception as e:
         error = str(e).lower()
         if "error 403: forbidden" in error:
+          # cached media URLs may have been rejected, don't reuse them next time
+          if not NO_CACHE:
+            InfoCache(CACHE_DIR).invalidate(url, prepared["key"])
           print(f"{CLR_ERROR}Download blocked by YouTube (Error 403: Forbidden){CLR_RESET}")
           print(f"{CLR_WARNING}This is a known issue caused by YouTube's recent security changes (SABR streaming.{CLR_RESET}")
           print(f"{CLR_GREEN}Possible temporary fixes:{CLR_RESET}")
           print(f"  • Try switching to a different network — Switch Wi-Fi to Mobile Data.")
           print(f"  • Use a trusted VPN connection to bypass region-specific restrictions.")
           print(f"  • Update yt-dlp to the latest version when an official fix is released.\n")
-          print("Exiting...")
-          sys.exit(1)
+          discard_staging(prepared)
+          exit_or_fail("download blocked (HTTP 403)")
         elif "requested format is not available" in error:
           if choice == 'audio':
             video_format_msg = "Audio-only format"
           else:
             video_format_msg = f"The video format '{choice}'"
           print(f"\n{CLR_ERROR}{video_format_msg} not available for this video.{CLR_RESET}")
-          print("Exiting...")
-          sys.exit(1)
+          discard_staging(prepared)
+          exit_or_fail("requested format is not available")
         elif "unable to download" in error:
           print(f"{CLR_ERROR}Unable to download the file. Please check your internet connection and try again.{CLR_RESET}")
         elif "connection broken" in error:
@@ -1501,58 +1957,530 @@ def download_media(url):
         else:
           print(f"{CLR_ERROR}Error while downloading the file:\n {e}{CLR_RESET}")
       
-      print(print_crossline())
-      
-      # get the final filename(after extraction/conversion)
-      if info:
-        final_filename = info["requested_downloads"][0]["filepath"]
-      else:
-        # fallback to dynamically set final_filename if info not available
-        global FINAL_FILENAME
-        final_filename = f"{download_dir}/{FINAL_FILENAME}"
-      
-      # Display downloaded file information
-      def get_file_location(filename):
-        "Extracts and returns the file location from a full file path."
-        return filename.rsplit("/",1)[0] + "/"
-      
-      def format_filename(filename):
-        """Extracts and returns the file name from a full file path."""
-        return filename.rsplit('/', 1)[1]
-      
-      def get_file_size(filename):
-        "Calculate and returns the file size of the downloaded file."
-        file_size = os.path.getsize(filename)
-        return f"{file_size / (1024*1024):.2f} MB"
-        
-      if VERBOSE:
-        print(f"{CLR_DIM}[info] Full path: {final_filename}{CLR_RESET}")
-      
       if DEBUG:
         log_timing("Time taken to download", time.perf_counter()-_download_media_start)
-        
-      print(
-        f"{CLR_BRIGHT_GREEN}Downloaded successfully{CLR_RESET}\n"
-        # Location
-        f"  {CLR_GREEN}Location: {CLR_LIME}{get_file_location(final_filename)}\n"
-        # Filename
-        f"  {CLR_GREEN}File: {CLR_LIME}{format_filename(final_filename)}\n"
-        # File size
-        f"  {CLR_GREEN}Size: {CLR_LIME}{get_file_size(final_filename)}{CLR_RESET}"
-      )
+      return info
   except Exception as e:
-    print(center_title(f"{CLR_ERROR}Exception{CLR_RESET}"))
-    error = str(e).lower()
-    if "no such file" in error:
-      print(f"{CLR_ERROR}Failed to download the file or couldn't find the downloaded file in the system storage.\nFinal file is expected at location: '{final_filename}'{CLR_RESET}")
-    elif "key" in error:
-      print(f"{CLR_ERROR}An internal error occurred in yt-dlp. Failed to clean up or finalize yt-dlp processes.\nThis is likely due to a failure during file conversion or metadata/thumbnail extraction, which prevented yt-dlp from completing its final steps.{CLR_RESET}")
+    discard_staging(prepared)
+    download_failed(e, os.path.join(prepared["download_dir"], prepared["filename"]))
+
+@traced("postprocess")
+def postprocess_media(prepared, info):
+  """
+  Postprocess stage: run the postprocessors (remux, thumbnail, metadata, audio extraction) of a download
+  fetched with fetch_media(prepared, postprocess=False).
+  
+  A failing postprocessor is reported, the download is kept as it is.
+  
+  Returns:
+    dict or False: the updated info dict
+  """
+  if not info or not prepared["ydl_opts"].get("postprocessors"):
+    return info
+  download = info["requested_downloads"][0]
+  if prepared["staging"]:
+    # fetched without the move out of the staging directory, it follows the postprocessors
+    download["__finaldir"] = prepared["download_dir"]
+    download["__files_to_move"] = dict.fromkeys(download.get("__files_to_move") or {})
+  try:
+    with YoutubeDL(prepared["ydl_opts"]) as ydl:
+      info["requested_downloads"][0] = ydl.post_process(download["filepath"], download)
+  except Exception as e:
+    print(f"{CLR_ERROR}Postprocessing Error: A problem occurred during final postprocessing stage.{CLR_RESET}")
+    if VERBOSE:
+      print(f"{CLR_DIM}{e}{CLR_RESET}")
+    if prepared["choice"] == "audio":
+      print(f"{CLR_WARNING}Warning: Failed to embed thumbnail or metadata to the audio file. Continuing with plain file.{CLR_RESET}")
     else:
+      print(f"{CLR_WARNING}Warning: Video re-muxing or metadata processing failed. Continuing with original file{CLR_RESET}")
+  return info
+
+@traced("finish")
+def finish_media(prepared, info):
+  """
+  Last step of a download: show the downloaded file, add it to the download archive and close its journal job.
+  
+  Returns:
+    str: path of the downloaded file
+  """
+  # get the final filename(after extraction/conversion)
+  if info:
+    final_filename = info["requested_downloads"][0]["filepath"]
+  else:
+    # fallback to the estimated final filename if info not available
+    final_filename = os.path.join(prepared["download_dir"], prepared["filename"])
+  
+  # files left in the staging directory (postprocessing failed) are moved as they are, partial data is removed
+  if prepared["staging"]:
+    from yodo.utils.staging import release
+    try:
+      final_filename = release(prepared["staging"], prepared["download_dir"]).get(final_filename, final_filename)
+    except OSError as e:
+      print(f"{CLR_WARNING}Warning: Couldn't move the files out of the staging directory '{prepared['staging']}': {e}{CLR_RESET}")
+  
+  try:
+    print(print_crossline())
+    
+    # Display downloaded file information
+    def get_file_location(filename):
+      "Extracts and returns the file location from a full file path."
+      return filename.rsplit("/",1)[0] + "/"
+    
+    def format_filename(filename):
+      """Extracts and returns the file name from a full file path."""
+      return filename.rsplit('/', 1)[1]
+    
+    def get_file_size(filename):
+      "Calculate and returns the file size of the downloaded file."
+      file_size = os.path.getsize(filename)
+      return f"{file_size / (1024*1024):.2f} MB"
+      
+    if VERBOSE:
+      print(f"{CLR_DIM}[info] Full path: {final_filename}{CLR_RESET}")
+    
+    print(
+      f"{CLR_BRIGHT_GREEN}Downloaded successfully{CLR_RESET}\n"
+      # Location
+      f"  {CLR_GREEN}Location: {CLR_LIME}{get_file_location(final_filename)}\n"
+      # Filename
+      f"  {CLR_GREEN}File: {CLR_LIME}{format_filename(final_filename)}\n"
+      # File size
+      f"  {CLR_GREEN}Size: {CLR_LIME}{get_file_size(final_filename)}{CLR_RESET}"
+    )
+    record_archive(prepared["url"], prepared["media_info"], prepared["preset"], final_filename, prepared["key"])
+    if prepared["job"]:
+      prepared["journal"].finish(prepared["job"])
+    from yodo.utils.events import publish
+    publish("job", prepared["event_job"], prepared["url"], status="finished", filename=final_filename)
+    return final_filename
+  except Exception as e:
+    download_failed(e, final_filename)
+
+def discard_staging(prepared):
+  """Remove the staging directory of a failed download (interrupted ones are kept for '--resume')."""
+  if prepared.get("staging"):
+    from yodo.utils.staging import release
+    release(prepared["staging"], prepared["download_dir"], keep=False)
+
+def download_failed(e, final_filename):
+  """Report an unexpected download error and exit (batch mode: fail the item)."""
+  print(center_title(f"{CLR_ERROR}Exception{CLR_RESET}"))
+  error = str(e).lower()
+  if "no such file" in error:
+    print(f"{CLR_ERROR}Failed to download the file or couldn't find the downloaded file in the system storage.\nFinal file is expected at location: '{final_filename}'{CLR_RESET}")
+  elif "key" in error:
+    print(f"{CLR_ERROR}An internal error occurred in yt-dlp. Failed to clean up or finalize yt-dlp processes.\nThis is likely due to a failure during file conversion or metadata/thumbnail extraction, which prevented yt-dlp from completing its final steps.{CLR_RESET}")
+  else:
+    print(f"{CLR_ERROR}Error: {e}{CLR_RESET}")
+  exit_or_fail(f"download failed: {e}")
+
+# download archive
+
+def check_archive(url, preset=None, info=None, key=None):
+  """
+  Look the media up in the download archive, before anything is fetched.
+
+  With a preset (batch mode, later playlist entries) an archived file of the same variant is skipped silently,
+  in interactive mode the user is asked whether to download it anyway.
+
+  Returns:
+    str: path of the archived file if the download is skipped, else None.
+  """
+  if NO_ARCHIVE:
+    return None
+  from yodo.utils.archive import DownloadArchive, key_of_url, key_of_info, variant_of
+  
+  try:
+    key = (info and key_of_info(info)) or key_of_url(url, key)
+    with DownloadArchive(ARCHIVE_PATH) as archive:
+      rows = archive.lookup(key, variant_of(preset) if preset else None)
+  except Exception as e:
+    # the archive is only a shortcut, never a reason to fail
+    if DEBUG:
+      log_debug("Download archive not available:", e)
+    return None
+  if not rows:
+    return None
+  
+  path = rows[0]["path"]
+  print(f"{CLR_BRIGHT_GREEN}Already in your library: {CLR_LIME}{path}{CLR_RESET} {CLR_DIM}({rows[0]['variant']}){CLR_RESET}")
+  if preset is not None:
+    return path
+  
+  try:
+    answer = input(f"{CLR_BRIGHT_BLUE}Download anyway? [y/N]: {CLR_RESET}").strip().lower()
+  except (EOFError, KeyboardInterrupt):
+    answer = ""
+  return None if answer in ("y", "yes") else path
+
+def record_archive(url, info, preset, filename, key=None):
+  """Add a downloaded file to the download archive (under the URL key and the extracted key)."""
+  if NO_ARCHIVE or not preset or not os.path.isfile(filename):
+    return
+  from yodo.utils.archive import DownloadArchive, key_of_url, key_of_info, variant_of, store_sha256_later
+  
+  try:
+    keys = {key_of_url(url, key), key_of_info(info)} - {None}
+    with DownloadArchive(ARCHIVE_PATH) as archive:
+      for key in keys:
+        archive.record(key, variant_of(preset), filename, title=info.get("title"), url=info.get("webpage_url") or url)
+    # the SHA-256 is added while the next download runs
+    store_sha256_later(ARCHIVE_PATH, filename)
+  except Exception as e:
+    if DEBUG:
+      log_debug("Failed to update the download archive:", e)
+
+# function to download a playlist/channel
+def download_playlist(url, playlist_info, preset=None):
+  """
+  Download every entry of a playlist or channel, one after another.
+
+  Entries are read lazily from the flat playlist, and the full extraction of the next entry runs while the
+  current one downloads (see yodo.utils.playlist). In interactive mode the choice is prompted for the first
+  entry and reused for the remaining ones. A failing entry is reported and skipped.
+
+  Args:
+    url (str): Playlist URL.
+    playlist_info (dict): Unprocessed playlist info dict from fetch_details().
+    preset (str, optional): Choice and arguments for every entry (batch mode).
+
+  Returns:
+    str: Short result summary.
+
+  Raises:
+    ItemFailed: If any entry failed (batch mode).
+  """
+  from yodo.utils.playlist import pipelined, entry_ydl_opts, entry_url
+  
+  global IS_PLAYLIST
+  IS_PLAYLIST = True
+  
+  title = playlist_info.get("title") or url
+  count = playlist_info.get("playlist_count")
+  print(f"\n{p_s(2)}{CLR_BRIGHT_GREEN}Playlist: {CLR_LIME}{title}{CLR_RESET}")
+  if count:
+    print(f"{p_s(2)}{CLR_BRIGHT_GREEN}Entries: {CLR_LIME}{count}{CLR_RESET}")
+  print()
+  
+  downloaded = failed = seen = 0
+  
+  with YoutubeDL(entry_ydl_opts(info_ydl_opts())) as entry_ydl:
+    def extract(entry):
+      # url entries are resolved, inline entries only processed (nested playlists stay flat and lazy)
+      return entry_ydl.process_ie_result(entry, download=False)
+    
+    def download_entries(entries):
+      nonlocal preset, downloaded, failed, seen
+      for entry, future in pipelined(entries, extract):
+        try:
+          info = future.result()
+        except Exception as e:
+          seen += 1
+          failed += 1
+          print(f"{CLR_ERROR}Skipping entry {seen}: {e}{CLR_RESET}\n")
+          continue
+        
+        # e.g. the tabs of a channel
+        if is_playlist(info):
+          download_entries(info.get("entries") or [])
+          continue
+        
+        seen += 1
+        print(center_title(f"{CLR_BRIGHT_BLUE}[{seen}/{count or '?'}] {info.get('title') or entry_url(info)}{CLR_RESET}"))
+        try:
+          download_media(entry_url(info), preset, info)
+          downloaded += 1
+          # the choice confirmed for the first entry is used for all others
+          preset = preset or LAST_PRESET
+        except ItemFailed as e:
+          failed += 1
+          print(f"{CLR_WARNING}Skipping entry {seen}: {e}{CLR_RESET}\n")
+    
+    try:
+      download_entries(playlist_info.get("entries") or [])
+    finally:
+      IS_PLAYLIST = False
+  
+  summary = f"{downloaded}/{seen} playlist entries downloaded"
+  print(f"\n{CLR_BRIGHT_GREEN}Playlist finished: {CLR_LIME}{summary}{CLR_RESET}")
+  if failed and BATCH is not None:
+    raise ItemFailed(f"{summary}, {failed} failed")
+  return summary
+
+# batch mode
+
+# per item logs of parallel batch runs
+BATCH_LOG_DIR = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "logs", time.strftime("batch-%Y%m%d-%H%M%S")
+)
+
+def read_batch_urls(source):
+  """
+  Read URLs from a file or stdin ('-'), one per line. Blank lines and '#' comments are skipped.
+  
+  Returns:
+    list: URLs in file order
+  """
+  if source == "-":
+    lines = sys.stdin.read().splitlines()
+  else:
+    try:
+      with open(os.path.expanduser(source), "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    except OSError as e:
+      print(f"{CLR_ERROR}Cannot read the URL list '{source}': {e.strerror}{CLR_RESET}")
+      sys.exit(1)
+  
+  # only whole line comments, URLs may contain '#'
+  return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+def _batch_worker(index, url, preset, events):
+  """
+  Runs in a scheduler worker process: download one batch item and report progress and the result.
+  The output of the item goes to its own log file, the shared progress view owns the terminal.
+  """
+  from yodo.utils import profiler
+  from yodo.utils.scheduler import forward_events
+  
+  os.makedirs(BATCH_LOG_DIR, exist_ok=True)
+  log_path = os.path.join(BATCH_LOG_DIR, f"{index + 1:04d}.log")
+  log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+  os.dup2(log_fd, 1)
+  os.dup2(log_fd, 2)
+  os.close(log_fd)
+  sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+  sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+  sys.stdin = open(os.devnull, "r")
+  
+  print(f"[{index + 1}] {url}")
+  forward_events(index, events)
+  profiler.restart(f"item-{index + 1:04d}")
+  
+  try:
+    events.put(("done", index, True, download_media(url, preset)))
+  except ItemFailed as e:
+    events.put(("done", index, False, f"{e} (log: {log_path})"))
+  except Exception as e:
+    print(f"Error: {e}")
+    events.put(("done", index, False, f"{e} (log: {log_path})"))
+  finally:
+    profiler.stop()
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+def batch_download(urls, preset):
+  """
+  Download every URL with the same preset choice, without any prompt.
+  
+  A failing item is reported and skipped, the remaining items are still downloaded.
+  
+  Args:
+    urls (list): media URLs
+    preset (str): choice and arguments, as typed at the prompt (e.g. 'high quality=720p format=mkv')
+  
+  Returns:
+    int: exit code, 0 if every item was downloaded, else 1
+  """
+  total = len(urls)
+  
+  # several items at once, each in its own worker process
+  if JOBS > 1 and total > 1:
+    from yodo.utils.scheduler import JobScheduler, parse_site_limits
+
+    # invalid URLs fail right away, like in the other batch paths, only the valid ones are scheduled
+    errors = [validate_url(url) for url in urls]
+    for url, error in zip(urls, errors):
+      if error:
+        print(f"{CLR_ERROR}Invalid URL ({url}), {error}{CLR_RESET}")
+    valid_urls = [url for url, error in zip(urls, errors) if not error]
+
+    default_per_site, site_limits = parse_site_limits(PER_SITE)
+    scheduler = JobScheduler(
+      lambda index, url, events: _batch_worker(index, url, preset, events),
+      jobs=JOBS,
+      default_per_site=default_per_site,
+      site_limits=site_limits
+    )
+    scheduled = iter(())
+    if valid_urls:
+      print(f"{CLR_BRIGHT_BLUE}Downloading {len(valid_urls)} items, {JOBS} at a time. Logs: {CLR_RESET}{BATCH_LOG_DIR}")
+      scheduled = iter(scheduler.run(valid_urls))
+    return print_batch_summary([
+      (url, False, f"invalid URL, {error}") if error else next(scheduled)
+      for url, error in zip(urls, errors)
+    ])
+  
+  # one item at a time per stage, the stages of consecutive items overlap
+  if PIPELINE_DEPTH[0] > 0 and total > 1:
+    return pipeline_download(urls, preset)
+  
+  results = []
+  for index, url in enumerate(urls, 1):
+    print(center_title(f"{CLR_BRIGHT_BLUE}[{index}/{total}] {url}{CLR_RESET}"))
+    
+    error = validate_url(url)
+    if error:
+      print(f"{CLR_ERROR}Invalid URL, {error}{CLR_RESET}")
+      results.append((url, False, f"invalid URL, {error}"))
+      continue
+    
+    try:
+      results.append((url, True, download_media(url, preset)))
+    except ItemFailed as e:
+      results.append((url, False, str(e)))
+    except Exception as e:
       print(f"{CLR_ERROR}Error: {e}{CLR_RESET}")
-    print("Exiting...")
-    sys.exit(1)
+      results.append((url, False, str(e)))
+  
+  return print_batch_summary(results)
+
+def pipeline_download(urls, preset):
+  """
+  Download the batch items through the extract → download → postprocess pipeline (see yodo.utils.pipeline):
+  while one item is downloaded the next one is extracted and the previous one postprocessed.
+  
+  A postprocess depth of 0 postprocesses every item right after its download (extract and download still overlap).
+  Audio transcodes of several items run side by side (one per core), stream copies one at a time.
+  
+  Returns:
+    int: exit code, 0 if every item was downloaded, else 1
+  """
+  from threading import Lock
+  from yodo.utils.audio import TRANSCODE_WORKERS, needs_transcode
+  from yodo.utils.pipeline import Pipeline, Stage
+  
+  total = len(urls)
+  download_depth, postprocess_depth = PIPELINE_DEPTH
+  # extraction writes the per download globals (and playlists download their entries while extracting them)
+  prepare_lock = Lock()
+  # postprocessing that only copies data is disk bound, more than one at a time doesn't help
+  copy_lock = Lock()
+  # archive and journal
+  finish_lock = Lock()
+  
+  def extract(item):
+    index, url = item
+    print(center_title(f"{CLR_BRIGHT_BLUE}[{index}/{total}] {url}{CLR_RESET}"))
+    error = validate_url(url)
+    if error:
+      print(f"{CLR_ERROR}Invalid URL, {error}{CLR_RESET}")
+      raise ItemFailed(f"invalid URL, {error}")
+    with prepare_lock:
+      return prepare_media(url, preset)
+  
+  def download(prepared):
+    # skipped (already in the library)
+    if isinstance(prepared, str):
+      return prepared, None
+    if "playlist" in prepared:
+      with prepare_lock:
+        return download_playlist(prepared["url"], prepared["playlist"], preset), None
+    return prepared, fetch_media(prepared, postprocess=postprocess_depth == 0)
+  
+  def postprocess(fetched):
+    prepared, info = fetched
+    if info is None:
+      return prepared
+    if postprocess_depth:
+      if info and needs_transcode(info["requested_downloads"][0], prepared["ydl_opts"]):
+        # CPU bound, bounded by the transcode slots of yodo.utils.audio
+        info = postprocess_media(prepared, info)
+      else:
+        with copy_lock:
+          info = postprocess_media(prepared, info)
+    with finish_lock:
+      return finish_media(prepared, info)
+  
+  stages = [
+    Stage("extract", extract, buffered=True),
+    Stage("download", download, depth=download_depth),
+    Stage("postprocess", postprocess, depth=postprocess_depth, buffered=True, workers=TRANSCODE_WORKERS),
+  ]
+  pipeline = Pipeline(stages)
+  results = [
+    (url, ok, value if ok else str(value))
+    for url, (ok, value) in zip(urls, pipeline.run(enumerate(urls, 1)))
+  ]
+  code = print_batch_summary(results)
+  print_pipeline_report(pipeline)
+  return code
+
+def print_pipeline_report(pipeline):
+  """Print the busy and wait times of every pipeline stage."""
+  print(f"\n{CLR_GREEN}Pipeline stages {CLR_DIM}(total {pipeline.elapsed:.1f}s){CLR_RESET}")
+  for name, jobs, failed, busy, idle, blocked, wait in pipeline.report():
+    print(
+      f"  {CLR_GREEN}{name:<12}{CLR_RESET}"
+      f"busy {CLR_LIME}{busy:6.1f}s{CLR_RESET}  "
+      f"queue wait {CLR_LIME}{wait:6.1f}s{CLR_RESET}  "
+      f"idle {idle:6.1f}s  blocked {blocked:6.1f}s  "
+      f"{CLR_DIM}{jobs} items" + (f", {failed} failed" if failed else "") + CLR_RESET
+    )
+
+def print_batch_summary(results):
+  """Print one line per batch item, returns the exit code (0 if every item was downloaded, else 1)."""
+  total = len(results)
+  failed = sum(1 for _, ok, _ in results if not ok)
+  print(center_title(f"{CLR_BRIGHT_GREEN}Batch Summary{CLR_RESET}"))
+  for url, ok, detail in results:
+    if ok:
+      print(f"{CLR_BRIGHT_GREEN}✓ {CLR_RESET}{url}\n    {CLR_LIME}{detail}{CLR_RESET}")
+    else:
+      print(f"{CLR_ERROR}✗ {CLR_RESET}{url}\n    {CLR_ERROR}{detail}{CLR_RESET}")
+  print(f"\n{CLR_GREEN}Downloaded: {CLR_LIME}{total - failed}/{total}{CLR_RESET}" + (f"  {CLR_ERROR}Failed: {failed}{CLR_RESET}" if failed else ""))
+  
+  return 1 if failed else 0
+
+# resume
+
+def resume_jobs():
+  """
+  Continue every unfinished job of the journal ('--resume'), one after another and without prompts.
+  
+  A job that fails MAX_ATTEMPTS times is dropped from the journal, its partial files are kept.
+  
+  Returns:
+    int: exit code, 0 if every job finished, else 1
+  """
+  from yodo.utils.journal import Journal, MAX_ATTEMPTS, partial_bytes
+  
+  journal = Journal()
+  jobs = journal.unfinished()
+  if not jobs:
+    print(f"{CLR_BRIGHT_GREEN}No unfinished downloads.{CLR_RESET}")
+    return 0
+  
+  print(f"{CLR_BRIGHT_BLUE}Resuming {len(jobs)} unfinished download(s){CLR_RESET}")
+  results = []
+  for index, job in enumerate(jobs, 1):
+    print(center_title(f"{CLR_BRIGHT_BLUE}[{index}/{len(jobs)}] {job.get('title') or job['url']}{CLR_RESET}"))
+    print(f"{p_s(2)}{CLR_GREEN}Choice: {CLR_LIME}{job.get('preset')}{CLR_RESET}")
+    if job.get("error"):
+      print(f"{p_s(2)}{CLR_GREEN}Stopped by: {CLR_DIM}{job['error']}{CLR_RESET}")
+    print(f"{p_s(2)}{CLR_GREEN}Already downloaded: {get_size_str(partial_bytes(job))}")
+    
+    try:
+      results.append((job["url"], True, download_media(job["url"], job.get("preset"), job=job)))
+    except (ItemFailed, Exception) as e:
+      job = journal.load(job["id"]) or job
+      detail = str(e)
+      if job.get("attempts", 0) >= MAX_ATTEMPTS:
+        journal.finish(job)
+        detail = f"{detail} (dropped from the journal after {job['attempts']} attempts, partial files kept)"
+      else:
+        journal.fail(job, e)
+      print(f"{CLR_ERROR}{detail}{CLR_RESET}")
+      results.append((job["url"], False, detail))
+  
+  return print_batch_summary(results)
 
 if __name__ == "__main__":
+  # hand the run over to a warm YODO daemon if one is running ('yodo --daemon start')
+  from yodo.daemon import run_client
+  daemon_exit_code = run_client(sys.argv)
+  if daemon_exit_code is not None:
+    sys.exit(daemon_exit_code)
+  
   # initialisation function call
   preload_modules_thread = init()
   
@@ -1561,11 +2489,22 @@ if __name__ == "__main__":
   # measure startup time
   log_timing("Startup time", (time.perf_counter()-_perf_startup_time_start))
   
-  # user input handler
-  url = url_input_handler()
+  # index an existing library into the download archive ('--archive-import [DIR]')
+  if ARCHIVE_IMPORT is not None:
+    preload_modules_thread.join()
+    from yodo.utils.terminal_utils import print_crossline, center_title
+    from yodo.utils.archive import import_command
+    sys.exit(import_command(resolve_download_dir(ARCHIVE_IMPORT or DOWNLOAD_DIR), ARCHIVE_PATH))
+  
+  # user input handler (batch mode reads all URLs up front instead, resumed jobs know theirs)
+  if BATCH is not None:
+    batch_urls = read_batch_urls(BATCH)
+  elif not RESUME:
+    url = url_input_handler()
   
   # wait for preload_modules_thread to finish
-  preload_modules_thread.join()
+  with span("preload wait"):
+    preload_modules_thread.join()
   
   # general modules
   import re
@@ -1576,11 +2515,36 @@ if __name__ == "__main__":
   # ytd-dlp imports
   from yt_dlp import YoutubeDL
   from yt_dlp.utils import sanitize_filename as _ytdlp_sanitize
+  from yt_dlp.utils import ReExtractInfo, DownloadError
   
   # YODO built-in modules/functions
   from yodo.utils.yodo_documentation import *
-  from yodo.utils.prompt_validator import prompt_screen
+  if BATCH is None and not RESUME:
+    from yodo.utils.prompt_validator import prompt_screen
   from yodo.utils.terminal_utils import print_crossline, center_title
+  from yodo.utils.info_cache import InfoCache
+  from yodo.utils.format_index import FormatIndex
+  from yodo.utils.size_probe import formats_to_probe, probe_sizes
+  from yodo.utils.playlist import is_playlist
+  from yodo.utils.profiler import trace_postprocessors
+  trace_postprocessors()
+  
+  # progress events as JSON lines ('--events PATH')
+  if EVENTS:
+    from yodo.utils.events import JsonLinesWriter, subscribe
+    try:
+      subscribe(JsonLinesWriter(EVENTS))
+    except OSError as e:
+      print(f"{CLR_ERROR}Cannot write the events file '{EVENTS}': {e.strerror}{CLR_RESET}")
+      sys.exit(1)
+  
+  # continue the unfinished downloads of earlier runs
+  if RESUME:
+    sys.exit(resume_jobs())
+  
+  # batch mode: same preset for every URL, one failing item never stops the batch
+  if BATCH is not None:
+    sys.exit(batch_download(batch_urls, BATCH_CHOICE))
   
   # calling main download function
   download_media(url)
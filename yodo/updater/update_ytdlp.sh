@@ -55,6 +55,13 @@ if eval "$INSTALL_CMD"; then
     NEW_VERSION="$(yt-dlp --version 2>/dev/null)"
     echo -e "\n${CLR_GREEN}yt-dlp updated successfully!${CLR_RESET}"
     echo -e "${CLR_GREEN}New version: ${NEW_VERSION}${CLR_RESET}"
+
+    # Regenerate the domain → extractor index for the new extractors
+    if $PY -m yodo.utils.extractor_index >/dev/null 2>&1; then
+        echo -e "${CLR_GREEN}Extractor index regenerated.${CLR_RESET}"
+    else
+        echo -e "${CLR_YELLOW}Failed to regenerate extractor index (continuing).${CLR_RESET}"
+    fi
 else
     echo -e "\n${CLR_RED}yt-dlp update failed.${CLR_RESET}"
     exit 1
@@ -0,0 +1,297 @@
+"""
+Download archive: a local SQLite index of the media already in the library.
+
+Rows are keyed by (extractor, video id, variant), so a changed title, a youtu.be link instead of a
+youtube.com link or a repeated batch run are recognized. The key of a URL is computed offline
+(see info_cache.media_key()), so the archive is consulted before any network request.
+
+The variant is the normalized choice string ('high format=mkv quality=720p'). Files indexed by the bulk
+import don't know their choice, they are stored with the variant 'video' or 'audio' and match any choice
+of the same kind.
+
+Bulk import of an existing library:
+  yodo --archive-import [DIR]
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from threading import Thread
+
+from yodo.utils.colors import *
+
+DEFAULT_ARCHIVE_PATH = os.path.join(
+  os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "yodo", "archive.sqlite3"
+)
+
+# extensions indexed by the bulk import
+AUDIO_EXTENSIONS = {"m4a", "mp3", "opus", "ogg", "oga", "flac", "wav", "aac", "ac3", "eac3"}
+VIDEO_EXTENSIONS = {"mp4", "mkv", "webm", "mov", "m4v", "3gp"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+  extractor TEXT NOT NULL,
+  video_id TEXT NOT NULL,
+  variant TEXT NOT NULL,
+  path TEXT NOT NULL,
+  size INTEGER,
+  sha256 TEXT,
+  title TEXT,
+  url TEXT,
+  added REAL,
+  PRIMARY KEY (extractor, video_id, variant)
+);
+CREATE INDEX IF NOT EXISTS media_path ON media (path);
+"""
+
+
+def variant_of(preset):
+  """Normalize a choice string: choice first, arguments sorted ('high quality=720p format=mkv' → 'high format=mkv quality=720p')."""
+  parts = (preset or "").lower().split()
+  if not parts:
+    return ""
+  return " ".join([parts[0], *sorted(parts[1:])])
+
+
+def kind_of(variant):
+  """Return the generic variant ('audio' or 'video') of a variant."""
+  return "audio" if variant.split(" ", 1)[0] == "audio" else "video"
+
+
+def key_of_url(url, key=None):
+  """Return (extractor, video id) of a URL without network access (key: its info_cache.media_key(), if known)."""
+  if key is None:
+    from yodo.utils.info_cache import media_key
+    key = media_key(url)
+  extractor, _, video_id = key.partition(":")
+  return extractor, video_id
+
+
+def key_of_info(info):
+  """Return (extractor, video id) of an extracted info dict, or None."""
+  extractor = info.get("extractor_key") or info.get("ie_key")
+  if extractor and info.get("id"):
+    return extractor, str(info["id"])
+  return None
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+class DownloadArchive:
+  """SQLite download archive (safe to use from parallel batch workers)."""
+
+  def __init__(self, path=None):
+    self.path = os.path.abspath(os.path.expanduser(path or DEFAULT_ARCHIVE_PATH))
+    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+    self.db = sqlite3.connect(self.path, timeout=30)
+    self.db.row_factory = sqlite3.Row
+    self.db.execute("PRAGMA journal_mode=WAL")
+    self.db.executescript(_SCHEMA)
+
+  def close(self):
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def lookup(self, key, variant=None):
+    """
+    Return the archived rows of a media whose file still exists (best match first).
+
+    Args:
+      key (tuple): (extractor, video id)
+      variant (str, optional): only rows of this variant (or its generic kind); None returns every variant
+
+    Rows whose file is gone or changed size are removed.
+    """
+    rows = self.db.execute(
+      "SELECT * FROM media WHERE extractor = ? AND video_id = ?", tuple(key)
+    ).fetchall()
+
+    found = []
+    for row in rows:
+      if variant is not None and row["variant"] not in (variant, kind_of(variant)):
+        continue
+      try:
+        size = os.path.getsize(row["path"])
+      except OSError:
+        size = None
+      if size is None or (row["size"] is not None and size != row["size"]):
+        self._delete(row)
+        continue
+      found.append(row)
+    # exact variant before generic (imported) rows
+    found.sort(key=lambda row: row["variant"] != variant)
+    return found
+
+  def record(self, key, variant, path, title=None, url=None, sha256=None):
+    """Add or replace the row of a downloaded file (without sha256, store_sha256() adds it later)."""
+    path = os.path.abspath(path)
+    size = os.path.getsize(path)
+    with self.db:
+      self.db.execute(
+        "INSERT OR REPLACE INTO media (extractor, video_id, variant, path, size, sha256, title, url, added) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (*key, variant, path, size, sha256, title, url, time.time())
+      )
+
+  def store_sha256(self, path):
+    """Hash a recorded file and store the SHA-256 in all its rows (unless the file changed meanwhile)."""
+    path = os.path.abspath(path)
+    size = os.path.getsize(path)
+    sha256 = file_sha256(path)
+    with self.db:
+      self.db.execute("UPDATE media SET sha256 = ? WHERE path = ? AND size = ?", (sha256, path, size))
+    return sha256
+
+  def _delete(self, row):
+    with self.db:
+      self.db.execute(
+        "DELETE FROM media WHERE extractor = ? AND video_id = ? AND variant = ?",
+        (row["extractor"], row["video_id"], row["variant"])
+      )
+
+  def known_paths(self):
+    return {row[0] for row in self.db.execute("SELECT path FROM media")}
+
+
+def store_sha256_later(archive_path, path):
+  """
+  Hash a just recorded file in a background thread, so the next download doesn't wait for it.
+  The thread is not a daemon thread, the process finishes it before exiting.
+  """
+  def run():
+    try:
+      with DownloadArchive(archive_path) as archive:
+        archive.store_sha256(path)
+    except (OSError, sqlite3.Error):
+      pass
+
+  thread = Thread(target=run, name="archive-sha256")
+  thread.start()
+  return thread
+
+
+# ---------------------------------------
+# bulk import
+
+
+def _tag_text(value):
+  """First text of a mutagen tag value (plain lists, ID3 frames with .text/.url, MP4 lists)."""
+  if isinstance(value, (list, tuple)):
+    value = value[0] if value else None
+  for attr in ("url", "text"):
+    if hasattr(value, attr):
+      value = getattr(value, attr)
+      if isinstance(value, list):
+        value = value[0] if value else None
+      break
+  if isinstance(value, bytes):
+    value = value.decode("utf-8", "replace")
+  return None if value is None else str(value)
+
+
+def source_url(path):
+  """
+  Return the source URL embedded in a file's metadata (yt-dlp writes it to 'purl'/'comment'), or None.
+  mutagen is used when installed, ffprobe for the containers mutagen can't read (mkv/webm).
+  """
+  tags = {}
+  try:
+    import mutagen
+    media = mutagen.File(path)
+    if media is not None and media.tags is not None:
+      tags = {str(k).lower(): _tag_text(v) for k, v in media.tags.items()}
+  except ImportError:
+    pass
+  except Exception:
+    tags = {}
+
+  if not tags:
+    import json
+    import subprocess
+    try:
+      result = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", path],
+        capture_output=True, text=True, timeout=30
+      )
+      tags = {k.lower(): v for k, v in (json.loads(result.stdout or "{}").get("format", {}).get("tags") or {}).items()}
+    except (OSError, ValueError, subprocess.SubprocessError):
+      return None
+
+  # mp4: '©cmt' / 'purl', id3: 'comm::…' / 'wxxx:…', vorbis & matroska: 'comment' / 'purl'
+  for name, value in tags.items():
+    if not value or not isinstance(value, str):
+      continue
+    if name in ("purl", "comment", "\xa9cmt", "description") or name.startswith(("comm", "wxxx", "----:com.apple.itunes:purl")):
+      value = value.strip()
+      if value.startswith(("http://", "https://")) and " " not in value:
+        return value
+  return None
+
+
+def import_library(archive, root, progress=None):
+  """
+  Index every media file below root (YODO's 'audio' and 'video' trees).
+
+  Files with an embedded source URL are keyed like downloads. Files without one could never match a URL,
+  they are only counted ('without_url'). Files already in the archive are skipped.
+
+  Returns:
+    dict: counters {'indexed', 'without_url', 'skipped'}
+  """
+  known = archive.known_paths()
+  stats = {"indexed": 0, "without_url": 0, "skipped": 0}
+
+  for dirpath, _dirnames, filenames in os.walk(root):
+    for name in filenames:
+      stem, _, ext = name.rpartition(".")
+      ext = ext.lower()
+      if not stem or ext not in AUDIO_EXTENSIONS | VIDEO_EXTENSIONS:
+        continue
+      path = os.path.abspath(os.path.join(dirpath, name))
+      if path in known:
+        stats["skipped"] += 1
+        continue
+
+      kind = "audio" if ext in AUDIO_EXTENSIONS else "video"
+      url = source_url(path)
+      if not url:
+        stats["without_url"] += 1
+        continue
+
+      try:
+        archive.record(key_of_url(url), kind, path, title=stem, url=url, sha256=file_sha256(path))
+      except OSError:
+        continue
+      stats["indexed"] += 1
+      if progress:
+        progress(path, url)
+  return stats
+
+
+def import_command(root, archive_path=None):
+  """CLI handler for '--archive-import [DIR]'. Returns the exit code."""
+  print(f"{CLR_BRIGHT_BLUE}Indexing {CLR_RESET}{root}")
+  with DownloadArchive(archive_path) as archive:
+    stats = import_library(
+      archive, root,
+      progress=lambda path, url: print(f"  {CLR_DIM}{os.path.relpath(path, root)}{CLR_RESET}")
+    )
+    print(
+      f"{CLR_BRIGHT_GREEN}Indexed: {CLR_LIME}{stats['indexed']}{CLR_RESET}  "
+      f"{CLR_GREEN}already known: {stats['skipped']}{CLR_RESET}\n"
+      f"{CLR_DIM}Archive: {archive.path}{CLR_RESET}"
+    )
+  if stats["without_url"]:
+    print(f"{CLR_WARNING}{stats['without_url']} files have no embedded source URL, they are not indexed.{CLR_RESET}")
+  return 0
@@ -0,0 +1,246 @@
+"""
+Codec aware conversion of audio downloads.
+
+FFmpegExtractAudio probes every file with ffprobe and runs ffmpeg unless the file already has the target
+extension. AudioPP decides from the codec of the downloaded format (yt-dlp's 'acodec', ffprobe only if it's
+unknown) what the requested format really needs:
+  keep       the codec and the container already match, ffmpeg isn't run
+  copy       the codec matches, the stream is copied into its own container (webm/opus → .opus)
+  transcode  another codec was asked for, the only case that encodes
+
+'best' never transcodes. Transcodes hold one of TRANSCODE_WORKERS slots (one per core), so batch items
+postprocessed side by side (see pipeline_download) keep every core busy without oversubscribing them. The slots are
+files locked with flock(), like the buckets of the request rate limiter, so the worker processes of a parallel batch
+(-j) and other YODO runs share them.
+"""
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+
+# key of AudioPP in yt-dlp's postprocessor registry ('postprocessors' option)
+KEY = "YodoAudio"
+
+# audio codec → extension of the container that holds it as is
+CODEC_EXTS = {
+  "opus": "opus", # WebM/Opus extracted → .opus
+  "vorbis": "ogg",
+  "aac": "m4a",
+  "alac": "m4a",
+  "mp3": "mp3",
+  "flac": "flac",
+  "ac3": "ac3",
+  "eac3": "eac3",
+  "pcm": "wav",
+}
+DEFAULT_EXT = "m4a"
+
+# codec → ffmpeg encoder of a transcode
+ENCODERS = {
+  "opus": "libopus",
+  "vorbis": "libvorbis",
+  "aac": "aac",
+  "alac": "alac",
+  "mp3": "libmp3lame",
+  "flac": "flac",
+  "ac3": "ac3",
+  "eac3": "eac3",
+  "pcm": "pcm_s16le",
+}
+
+# 'format=' values (and the extensions codec_to_ext() picks) → codec
+FORMAT_CODECS = {
+  "aac": "aac",
+  "m4a": "aac",
+  "mp3": "mp3",
+  "opus": "opus",
+  "vorbis": "vorbis",
+  "ogg": "vorbis",
+  "flac": "flac",
+  "alac": "alac",
+  "wav": "pcm",
+  "ac3": "ac3",
+  "eac3": "eac3",
+}
+
+# yt-dlp/ffprobe codec names that differ from the ones above
+CODEC_ALIASES = {
+  "mp4a": "aac",
+  "ac-3": "ac3",
+  "ec-3": "eac3",
+  "wav": "pcm",
+}
+
+# concurrent transcodes (ffmpeg processes) of all YODO processes
+TRANSCODE_WORKERS = os.cpu_count() or 1
+
+# lock files of the transcode slots
+SLOT_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "transcode")
+
+# seconds between attempts while every slot is taken
+SLOT_POLL = 0.2
+
+_registered = False
+
+
+@contextmanager
+def transcode_slot(slot_dir=None):
+  """
+  Hold one of the TRANSCODE_WORKERS slots for the time of a transcode, waiting while all are taken.
+  A slot is released when its holder exits, also if it is killed.
+  """
+  slot_dir = slot_dir or SLOT_DIR
+  os.makedirs(slot_dir, exist_ok=True)
+  while True:
+    for index in range(TRANSCODE_WORKERS):
+      f = open(os.path.join(slot_dir, f"slot-{index}"), "a")
+      try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+      except OSError:
+        f.close()
+        continue
+      try:
+        yield index
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+      return
+    time.sleep(SLOT_POLL)
+
+
+def normalize_codec(acodec):
+  """yt-dlp/ffprobe audio codec ('mp4a.40.2', 'ec-3', 'pcm_s16le') → codec name of CODEC_EXTS, or None."""
+  if not acodec or acodec == "none":
+    return None
+  codec = acodec.lower().split(".", 1)[0]
+  if codec.startswith("pcm_"):
+    return "pcm"
+  return CODEC_ALIASES.get(codec, codec)
+
+
+def codec_ext(acodec):
+  """File extension of a stream copy of acodec (DEFAULT_EXT for unknown codecs)."""
+  return CODEC_EXTS.get(normalize_codec(acodec), DEFAULT_EXT)
+
+
+def decide(source_codec, source_ext, target):
+  """
+  Decide the conversion of a downloaded audio file.
+
+  Args:
+    source_codec (str): normalized codec of the file (None if unknown)
+    source_ext (str): extension of the file
+    target (str): requested format ('best', 'mp3', 'm4a', ...)
+
+  Returns:
+    tuple: (action, codec, extension), action is 'keep', 'copy' or 'transcode'
+  """
+  target_codec = source_codec if target in (None, "best") else FORMAT_CODECS.get(target, target)
+  if source_codec is not None and source_codec == target_codec and source_codec in CODEC_EXTS:
+    ext = CODEC_EXTS[source_codec]
+    return ("keep" if ext == source_ext else "copy"), source_codec, ext
+  if target_codec not in CODEC_EXTS:
+    # 'best' of a codec without a container of its own (yt-dlp falls back to mp3 as well)
+    target_codec = "mp3"
+  return "transcode", target_codec, CODEC_EXTS[target_codec]
+
+
+def needs_transcode(info, ydl_opts):
+  """True if the postprocessors of ydl_opts encode the downloaded audio (from yt-dlp's 'acodec', no probing)."""
+  for pp in ydl_opts.get("postprocessors") or []:
+    if pp.get("key") == KEY:
+      action, _, _ = decide(normalize_codec(info.get("acodec")), (info.get("ext") or "").lower(), pp.get("preferredcodec"))
+      return action == "transcode"
+  return False
+
+
+def plan(attributes):
+  """
+  Plan the conversion of an audio download.
+
+  Args:
+    attributes (dict): audio options of the choice (options_attributes['audio']: format, ...)
+
+  Returns:
+    list: yt-dlp postprocessors
+  """
+  register()
+  return [{"key": KEY, "preferredcodec": attributes["format"], "preferredquality": "0"}]
+
+
+def register():
+  """Make AudioPP available to the 'postprocessors' option of every YoutubeDL instance."""
+  global _registered
+  if _registered:
+    return
+  from yt_dlp.globals import postprocessors
+
+  postprocessors.value[f"{KEY}PP"] = _audio_pp()
+  _registered = True
+
+
+def _audio_pp():
+  from yt_dlp.postprocessor.common import PostProcessor
+  from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP
+  from yt_dlp.utils import PostProcessingError, prepend_extension, replace_extension
+
+  class AudioPP(FFmpegExtractAudioPP):
+    """
+    FFmpegExtractAudio that only runs ffmpeg when the container or the codec has to change.
+
+    Args:
+      preferredcodec (str): requested format ('best', 'mp3', 'm4a', ...)
+      preferredquality (str): quality of a transcode (as FFmpegExtractAudio)
+    """
+
+    @classmethod
+    def pp_key(cls):
+      return KEY
+
+    def _source_codec(self, info, path):
+      codec = normalize_codec(info.get("acodec"))
+      if codec is None or codec not in CODEC_EXTS:
+        codec = normalize_codec(self.get_audio_codec(path))
+      return codec
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+      path, source_ext = info["filepath"], info["ext"].lower()
+      source_codec = self._source_codec(info, path)
+      if source_codec is None:
+        raise PostProcessingError("unable to obtain the audio codec of the file")
+      action, target_codec, ext = decide(source_codec, source_ext, self.mapping)
+
+      if action == "keep":
+        self.to_screen(f"Not converting audio {path}; file is already {source_codec} in .{ext}")
+        return [], info
+
+      new_path = temp_path = replace_extension(path, ext, info["ext"])
+      orig_path = path
+      if new_path == path:
+        orig_path = prepend_extension(path, "orig")
+        temp_path = prepend_extension(path, "temp")
+
+      if action == "copy":
+        # ADTS aac (HLS) needs its headers converted for mp4
+        opts = ["-bsf:a", "aac_adtstoasc"] if source_codec == "aac" else []
+        self.to_screen(f"Copying {source_codec} audio; Destination: {new_path}")
+        self.run_ffmpeg(path, temp_path, "copy", opts)
+      else:
+        encoder = ENCODERS[target_codec]
+        if encoder == "aac" and self._features.get("fdk"):
+          encoder = "libfdk_aac"
+        opts = self._quality_args(encoder)
+        with transcode_slot():
+          self.to_screen(f"Transcoding {source_codec} → {target_codec}; Destination: {new_path}")
+          self.run_ffmpeg(path, temp_path, encoder, opts)
+
+      os.replace(path, orig_path)
+      os.replace(temp_path, new_path)
+      info["filepath"] = new_path
+      info["ext"] = ext
+      if info.get("filetime") is not None:
+        self.try_utime(new_path, time.time(), info["filetime"], errnote="Cannot update utime of audio file")
+      return [orig_path], info
+
+  return AudioPP
@@ -0,0 +1,148 @@
+"""
+Global bandwidth cap ('--limit-rate'), shared by every download, fragment and YODO process.
+
+All response bodies yt-dlp reads pass through one byte bucket that refills at the cap. Every read reserves its bytes
+in the shared bucket and sleeps until its reservation is due, so readers are served in arrival order: with equal
+chunk sizes (reads are split into CHUNK_SIZE pieces) every active stream gets the same share, and the share of a
+finished stream goes to the remaining ones at once. No stream has a static rate of its own, so the cap holds for any
+number of parallel jobs and fragments.
+
+The bucket lives in the process. Other YODO processes (parallel runs) share the cap through a small file locked with
+flock(), like the request rate limiter: after every SYNC_SECONDS of the cap a process has used, it adds its usage to
+the shared bucket and continues with the tokens left for all processes. The file is touched a few times per second
+instead of once per read. Every cap has a state file of its own (bandwidth-<rate>): runs with the same '--limit-rate'
+share one bucket, a run with another cap never refills or drains it at its own rate.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_STATE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo")
+
+# max bytes read at once, keeps the shares of parallel streams even
+CHUNK_SIZE = 64 * 1024
+
+# seconds of the cap that may be used as a burst after an idle period
+BURST_SECONDS = 0.25
+
+# usage (in seconds of the cap) between two syncs with the shared state file
+SYNC_SECONDS = 0.25
+
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(value):
+  """
+  Parse a rate like '20M', '500K', '1.5MiB' (bytes per second, 1024 based).
+
+  Raises:
+    ValueError: on malformed or zero rates
+  """
+  match = _RATE_RE.match(value or "")
+  if not match or float(match.group(1)) <= 0:
+    raise ValueError(f"invalid rate '{value}' (e.g. 500K, 20M)")
+  return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+class BandwidthLimiter:
+  """
+  Byte bucket of this process, synced with the bucket shared with other processes.
+
+  Args:
+    rate (int): cap in bytes per second
+    state_file (str, optional): shared bucket state (default: bandwidth-<rate> in DEFAULT_STATE_DIR)
+  """
+
+  def __init__(self, rate, state_file=None):
+    self.rate = rate
+    self.burst = max(CHUNK_SIZE, int(rate * BURST_SECONDS))
+    self.quantum = max(CHUNK_SIZE, int(rate * SYNC_SECONDS))
+    self.state_file = os.path.abspath(os.path.expanduser(state_file or os.path.join(DEFAULT_STATE_DIR, f"bandwidth-{rate}")))
+    self._tokens = self.burst
+    self._time = time.time()
+    # bytes reserved since the last sync (None: never synced, the first reservation picks up the shared state)
+    self._unsynced = None
+    self._lock = threading.Lock()
+    self._state_dir_ready = False
+
+  def reserve(self, size):
+    """
+    Reserve size bytes of the cap.
+
+    Returns:
+      float: seconds to wait before the bytes may be used
+    """
+    with self._lock:
+      now = time.time()
+      # tokens may go negative: the debt is the queue of reservations not yet due
+      self._tokens = min(self.burst, self._tokens + (now - self._time) * self.rate) - size
+      self._time = now
+      if self._unsynced is None or self._unsynced + size >= self.quantum:
+        self._tokens = self._sync((self._unsynced or 0) + size, now)
+        self._unsynced = 0
+      else:
+        self._unsynced += size
+      return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+  def _sync(self, used, now):
+    """Add the bytes used since the last sync to the shared bucket, returns the tokens left for all processes."""
+    if not self._state_dir_ready:
+      os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+      self._state_dir_ready = True
+    with open(self.state_file, "a+", encoding="utf-8") as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      try:
+        f.seek(0)
+        try:
+          state = json.loads(f.read() or "{}")
+        except ValueError:
+          state = {}
+        tokens = min(self.burst, state.get("tokens", self.burst) + (now - state.get("time", now)) * self.rate)
+        tokens -= used
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps({"tokens": tokens, "time": now}))
+        f.flush()
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return tokens
+
+  def throttle(self, read):
+    """Wrap a response read function, every chunk read waits for its share of the cap."""
+    def throttled_read(amt=None):
+      if amt is None or amt < 0 or amt > CHUNK_SIZE:
+        if amt is None or amt < 0:
+          # read everything, in capped pieces
+          parts = []
+          while True:
+            part = throttled_read(CHUNK_SIZE)
+            if not part:
+              return b"".join(parts)
+            parts.append(part)
+        amt = CHUNK_SIZE
+      data = read(amt)
+      if data:
+        wait = self.reserve(len(data))
+        if wait > 0:
+          time.sleep(wait)
+      return data
+
+    return throttled_read
+
+
+def _throttled_urlopen(limiter, urlopen, ydl, req):
+  """Request hook (see yodo.utils.request_hooks): the body of the response is read at the limiter's pace."""
+  response = urlopen(ydl, req)
+  response.read = limiter.throttle(response.read)
+  return response
+
+
+def install(limiter):
+  """Throttle the response bodies of every yt-dlp request (all YoutubeDL instances) by the limiter (None: off)."""
+  import functools
+  from yodo.utils.request_hooks import set_hook
+  set_hook("bandwidth", None if limiter is None else functools.partial(_throttled_urlopen, limiter))
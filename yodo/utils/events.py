@@ -0,0 +1,157 @@
+"""
+Structured progress events of the downloads.
+
+yt-dlp reports progress through its 'progress_hooks' and 'postprocessor_hooks'. The hooks of a download
+(progress_hooks()/postprocessor_hooks(), added to its yt-dlp options) turn the status dicts into small events and
+publish them on one in-process bus; consumers subscribe to the bus instead of parsing the terminal output:
+  - the shared progress view of parallel batch runs (worker processes forward their events to it)
+  - a JSON lines file ('--events PATH', JsonLinesWriter), one event per line
+  - any code of the same process: subscribe(callback)
+
+Event types (every event has 'type', 'time' (unix time), 'job' (journal job ID) and 'url'):
+  job          status: started, finished (+ filename)
+  progress     status: downloading, finished, error; downloaded, total (bytes), speed (bytes/s), eta, elapsed (s),
+               fragment_index, fragment_count (fragmented formats), filename
+  postprocess  status: started, processing, finished; postprocessor (e.g. 'Merger'), filename
+
+'downloading' events of one download are published at most every PROGRESS_INTERVAL seconds, except the first one
+with data (time to first byte).
+"""
+import json
+import os
+import threading
+import time
+
+# min seconds between two 'downloading' progress events of one download
+PROGRESS_INTERVAL = 0.5
+
+
+class EventBus:
+  """
+  Synchronous publish/subscribe of event dicts. Callbacks run in the publishing thread, an exception of a
+  callback is swallowed (a consumer never breaks a download).
+  """
+
+  def __init__(self):
+    self._subscribers = ()
+    self._lock = threading.Lock()
+
+  @property
+  def active(self):
+    return bool(self._subscribers)
+
+  def subscribe(self, callback):
+    """Call callback(event) for every published event, returns callback (for unsubscribe())."""
+    with self._lock:
+      self._subscribers = (*self._subscribers, callback)
+    return callback
+
+  def unsubscribe(self, callback):
+    with self._lock:
+      self._subscribers = tuple(s for s in self._subscribers if s is not callback)
+
+  def clear(self):
+    """Drop every subscriber (a forked worker process doesn't write to the consumers of its parent)."""
+    with self._lock:
+      self._subscribers = ()
+
+  def publish(self, event):
+    # the tuple is replaced on (un)subscribe, publishing needs no lock
+    for callback in self._subscribers:
+      try:
+        callback(event)
+      except Exception:
+        pass
+
+
+# the bus of this process
+bus = EventBus()
+
+
+def subscribe(callback):
+  return bus.subscribe(callback)
+
+
+def unsubscribe(callback):
+  bus.unsubscribe(callback)
+
+
+def publish(kind, job=None, url=None, **fields):
+  """Publish an event of type kind (nothing is built if nobody listens)."""
+  if bus.active:
+    bus.publish({"type": kind, "time": time.time(), "job": job, "url": url, **fields})
+
+
+def progress_hooks(job, url):
+  """yt-dlp 'progress_hooks' of a download, publishing 'progress' events."""
+  last = [0.0]
+  started = [False]
+
+  def hook(status):
+    if not bus.active:
+      return
+    now = time.monotonic()
+    if status.get("status") == "downloading":
+      first_bytes = not started[0] and bool(status.get("downloaded_bytes"))
+      if now - last[0] < PROGRESS_INTERVAL and not first_bytes:
+        return
+      last[0] = now
+      started[0] = started[0] or first_bytes
+    publish(
+      "progress", job, url,
+      status=status.get("status"),
+      downloaded=status.get("downloaded_bytes") or 0,
+      total=status.get("total_bytes") or status.get("total_bytes_estimate") or 0,
+      speed=status.get("speed"),
+      eta=status.get("eta"),
+      elapsed=status.get("elapsed"),
+      fragment_index=status.get("fragment_index"),
+      fragment_count=status.get("fragment_count"),
+      filename=os.path.basename(status.get("filename") or ""),
+    )
+
+  return [hook]
+
+
+def postprocessor_hooks(job, url):
+  """yt-dlp 'postprocessor_hooks' of a download, publishing 'postprocess' events."""
+
+  def hook(status):
+    if not bus.active:
+      return
+    publish(
+      "postprocess", job, url,
+      status=status.get("status"),
+      postprocessor=status.get("postprocessor"),
+      filename=os.path.basename((status.get("info_dict") or {}).get("filepath") or ""),
+    )
+
+  return [hook]
+
+
+class JsonLinesWriter:
+  """
+  Bus consumer writing every event as one JSON line (appended, a line is flushed as a whole).
+
+  Args:
+    path (str): output file
+
+  Raises:
+    OSError: if the file can't be opened
+  """
+
+  def __init__(self, path):
+    self.path = os.path.abspath(os.path.expanduser(path))
+    self._lock = threading.Lock()
+    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+    self._file = open(self.path, "a", encoding="utf-8")
+
+  def __call__(self, event):
+    line = json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+    with self._lock:
+      self._file.write(line)
+      self._file.flush()
+
+  def close(self):
+    with self._lock:
+      self._file.close()
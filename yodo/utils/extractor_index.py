@@ -0,0 +1,143 @@
+"""
+Domain → yt-dlp extractor module index.
+
+yt-dlp ships lazy extractors, so only the extractor module matching a URL has to be imported.
+This index maps a host name (without 'www.') to the extractor modules that handle it, so YODO can
+start importing the right module as soon as the URL is known instead of preloading YouTube for every link.
+
+The index is built from the test URLs of every extractor. A copy is shipped with YODO (extractor_index.json)
+and the yt-dlp updater regenerates it into the user cache directory, which takes precedence:
+  python -m yodo.utils.extractor_index
+"""
+import json
+import os
+from urllib.parse import urlsplit
+
+# index shipped with YODO
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractor_index.json")
+
+# index regenerated after yt-dlp updates (kept out of the git tree so YODO updates stay clean)
+USER_INDEX_FILE = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "extractor_index.json"
+)
+
+# common module prefix, stripped in the index file to keep it small
+_MODULE_PREFIX = "yt_dlp.extractor."
+
+# max number of extractor modules stored per host
+MAX_MODULES_PER_HOST = 3
+
+_index = None
+
+
+def _load_index():
+  global _index
+  if _index is None:
+    _index = {}
+    for path in (USER_INDEX_FILE, INDEX_FILE):
+      try:
+        with open(path, "r", encoding="utf-8") as f:
+          _index = json.load(f).get("hosts", {})
+        break
+      except (OSError, ValueError):
+        continue
+  return _index
+
+
+def _normalize_host(host):
+  host = host.lower().split(":", 1)[0].strip(".")
+  return host[4:] if host.startswith("www.") else host
+
+
+def resolve_extractor_modules(url):
+  """
+  Return the yt-dlp extractor modules (full import names) likely to handle the URL.
+
+  The host is looked up first, then its parent domains (m.youtube.com → youtube.com).
+  Returns an empty tuple for unknown hosts (yt-dlp then loads the extractor itself during extraction).
+  """
+  try:
+    host = _normalize_host(urlsplit(url).netloc)
+  except ValueError:
+    return ()
+  index = _load_index()
+  labels = host.split(".")
+  for i in range(len(labels) - 1):
+    modules = index.get(".".join(labels[i:]))
+    if modules:
+      return tuple(_MODULE_PREFIX + module for module in modules)
+  return ()
+
+
+def preload_extractor(url):
+  """
+  Start importing the extractor module(s) for the URL in a background thread.
+
+  Returns:
+    threading.Thread or None: the import thread (None if no module matched)
+  """
+  modules = resolve_extractor_modules(url)
+  if not modules:
+    return None
+
+  import importlib
+  from threading import Thread
+
+  def import_modules():
+    for module in modules:
+      try:
+        importlib.import_module(module)
+      except Exception:
+        pass # only a hint, yt-dlp imports the right module itself during extraction
+
+  thread = Thread(target=import_modules, daemon=True)
+  thread.start()
+  return thread
+
+
+def build_index():
+  """Build the index from the test URLs of every (non generic) yt-dlp extractor."""
+  from collections import Counter, defaultdict
+  from yt_dlp.extractor import _extractors
+  from yt_dlp.version import __version__ as ytdlp_version
+
+  host_modules = defaultdict(Counter)
+  for name in dir(_extractors):
+    ie = getattr(_extractors, name)
+    if not name.endswith("IE") or name == "GenericIE":
+      continue
+    try:
+      testcases = list(ie.get_testcases(include_onlymatching=True))
+    except Exception:
+      continue
+    for test in testcases:
+      test_url = test.get("url")
+      if not test_url or not ie.suitable(test_url):
+        continue
+      host = _normalize_host(urlsplit(test_url).netloc)
+      if host and ie.__module__.startswith(_MODULE_PREFIX):
+        host_modules[host][ie.__module__[len(_MODULE_PREFIX):]] += 1
+
+  hosts = {
+    host: [module for module, _ in counter.most_common(MAX_MODULES_PER_HOST)]
+    for host, counter in sorted(host_modules.items())
+  }
+  return {"yt_dlp_version": ytdlp_version, "hosts": hosts}
+
+
+def write_index(path=USER_INDEX_FILE):
+  """Regenerate the index file, returns the number of indexed hosts."""
+  data = build_index()
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  tmp_path = f"{path}.tmp"
+  with open(tmp_path, "w", encoding="utf-8") as f:
+    json.dump(data, f, separators=(",", ":"), sort_keys=True)
+  os.replace(tmp_path, path)
+  return len(data["hosts"])
+
+
+if __name__ == "__main__":
+  import sys
+  # '--shipped' regenerates the copy shipped with YODO (for maintainers)
+  path = INDEX_FILE if "--shipped" in sys.argv[1:] else USER_INDEX_FILE
+  print(f"Indexed {write_index(path)} hosts: {path}")
@@ -0,0 +1,238 @@
+"""
+Precomputed format index for pricing format selectors.
+
+fetch_details() needs the formats chosen by every option (low, medium, high, audio), and custom qualities
+(quality=144p … 8K, audio bitrates) are priced the same way. Running yt-dlp's format selector for each of them
+re-parses the selector string and re-filters every format each time.
+
+FormatIndex splits the formats once (yt-dlp order, worst → best) into muxed, video-only and audio-only lists,
+and evaluates selectors from a small compiled tree. Compiled selectors are cached by selector string at module
+level, so batch jobs reuse them across media. Every atom (e.g. 'bestvideo[height<=720]') is evaluated at most
+once per media, so all presets and variants are answered from the same index.
+
+The supported grammar is the one YODO builds: best/worst[video|audio] with an optional [height|width|abr<=N]
+filter, '+' (merge), '/' (fallback) and parentheses. Anything else falls back to yt-dlp's own selector
+(compiled once per YoutubeDL instance and selector string).
+"""
+import re
+import weakref
+
+# atom: best, worst, bestvideo, worstaudio, ... with an optional <= filter
+_ATOM_RE = re.compile(r"(best|worst)(video|audio)?(?:\[(height|width|abr)<=(\d+(?:\.\d+)?)\])?$")
+_TOKEN_RE = re.compile(r"\s*(\(|\)|/|\+|[a-z]+(?:\[[^\]]*\])?)")
+
+# selector string → compiled tree (None if the grammar is not supported)
+_compiled = {}
+
+# YoutubeDL → {selector string: yt-dlp selector function}
+_ytdlp_compiled = weakref.WeakKeyDictionary()
+
+
+def _tokenize(selector):
+  tokens = []
+  pos = 0
+  selector = selector.strip()
+  while pos < len(selector):
+    match = _TOKEN_RE.match(selector, pos)
+    if not match:
+      raise ValueError(selector)
+    tokens.append(match.group(1))
+    pos = match.end()
+  return tokens
+
+
+def _parse(tokens):
+  """
+  Parse tokens into a tree: ('atom', bw, type, field, limit) | ('alt', [nodes]) | ('merge', node, node).
+  '+' binds tighter than '/', as in yt-dlp.
+  """
+  pos = 0
+
+  def parse_alt():
+    nonlocal pos
+    nodes = [parse_merge()]
+    while pos < len(tokens) and tokens[pos] == "/":
+      pos += 1
+      nodes.append(parse_merge())
+    return nodes[0] if len(nodes) == 1 else ("alt", nodes)
+
+  def parse_merge():
+    nonlocal pos
+    node = parse_primary()
+    while pos < len(tokens) and tokens[pos] == "+":
+      pos += 1
+      node = ("merge", node, parse_primary())
+    return node
+
+  def parse_primary():
+    nonlocal pos
+    if pos >= len(tokens):
+      raise ValueError("unexpected end")
+    token = tokens[pos]
+    pos += 1
+    if token == "(":
+      node = parse_alt()
+      if pos >= len(tokens) or tokens[pos] != ")":
+        raise ValueError("missing ')'")
+      pos += 1
+      return node
+    match = _ATOM_RE.match(token)
+    if not match:
+      raise ValueError(token)
+    bw, kind, field, limit = match.groups()
+    return ("atom", bw, kind, field, float(limit) if limit else None)
+
+  node = parse_alt()
+  if pos != len(tokens):
+    raise ValueError("trailing tokens")
+  return node
+
+
+def compile_selector(selector):
+  """Return the cached compiled tree for a selector string, or None if it needs yt-dlp's selector."""
+  if selector not in _compiled:
+    try:
+      _compiled[selector] = _parse(_tokenize(selector))
+    except ValueError:
+      _compiled[selector] = None
+  return _compiled[selector]
+
+
+def _has_video(f):
+  return f.get("vcodec") != "none"
+
+
+def _has_audio(f):
+  return f.get("acodec") != "none"
+
+
+def _size(f):
+  size = f.get("filesize")
+  return size if size is not None else f.get("filesize_approx")
+
+
+def merge_formats(formats):
+  """Merge formats into one dict like yt-dlp's format merger (single video and audio stream)."""
+  from yt_dlp.utils import get_compatible_ext
+
+  formats_info = []
+  got_video = got_audio = False
+  for f in formats:
+    f_video, f_audio = _has_video(f), _has_audio(f)
+    if not f_video and not f_audio:
+      continue
+    if (f_video and got_video) or (f_audio and got_audio):
+      continue # yt-dlp doesn't allow multiple video/audio streams by default
+    got_video = got_video or f_video
+    got_audio = got_audio or f_audio
+    formats_info.append(f)
+
+  if len(formats_info) == 1:
+    return formats_info[0]
+
+  video_fmts = [f for f in formats_info if _has_video(f)]
+  audio_fmts = [f for f in formats_info if _has_audio(f)]
+  merged = {
+    "requested_formats": formats_info,
+    "format_id": "+".join(f["format_id"] for f in formats_info if f.get("format_id")),
+    "ext": get_compatible_ext(
+      vcodecs=[f.get("vcodec") for f in video_fmts],
+      acodecs=[f.get("acodec") for f in audio_fmts],
+      vexts=[f["ext"] for f in video_fmts],
+      aexts=[f["ext"] for f in audio_fmts],
+    ),
+    "filesize_approx": sum(filter(None, map(_size, formats_info))) or None,
+    "tbr": sum(filter(None, (f.get("tbr") or f.get("vbr") or f.get("abr") for f in formats_info))),
+  }
+  if len(video_fmts) == 1:
+    v = video_fmts[0]
+    merged.update({key: v.get(key) for key in ("width", "height", "fps", "vcodec", "vbr", "dynamic_range")})
+  if len(audio_fmts) == 1:
+    a = audio_fmts[0]
+    merged.update({key: a.get(key) for key in ("acodec", "abr", "asr", "audio_channels")})
+  return merged
+
+
+class FormatIndex:
+  """
+  Format index of one info dict.
+
+  Args:
+    info (dict): processed yt-dlp info dict (formats sorted worst → best)
+    ydl (YoutubeDL, optional): used for selectors outside the supported grammar
+  """
+
+  def __init__(self, info, ydl=None):
+    self.ydl = ydl
+    formats = info.get("formats")
+    self.formats = list(formats) if formats is not None else [info]
+
+    # one pass: split by stream type
+    self.muxed, self.video, self.audio, self.any = [], [], [], []
+    for f in self.formats:
+      f_video, f_audio = _has_video(f), _has_audio(f)
+      if f_video and f_audio:
+        self.muxed.append(f)
+      elif f_video:
+        self.video.append(f)
+      elif f_audio:
+        self.audio.append(f)
+      if f_video or f_audio:
+        self.any.append(f)
+
+    self.has_merged_format = bool(self.muxed)
+    # no formats with video OR no formats with audio (e.g. SoundCloud)
+    self.incomplete_formats = not (self.muxed or self.video) or not (self.muxed or self.audio)
+    self._atoms = {}
+
+  def _ctx(self):
+    return {
+      "formats": self.formats,
+      "has_merged_format": self.has_merged_format,
+      "incomplete_formats": self.incomplete_formats,
+    }
+
+  def _atom(self, bw, kind, field, limit):
+    key = (bw, kind, field, limit)
+    if key not in self._atoms:
+      candidates = {"video": self.video, "audio": self.audio}.get(kind, self.muxed)
+      if field:
+        # formats without the field never match a comparison (same as yt-dlp)
+        candidates = [f for f in candidates if f.get(field) is not None and f[field] <= limit]
+      if not candidates and kind is None and self.incomplete_formats:
+        # best/worst fall back to video-only or audio-only formats
+        candidates = [f for f in self.any if not field or (f.get(field) is not None and f[field] <= limit)]
+      if candidates:
+        self._atoms[key] = [candidates[-1] if bw == "best" else candidates[0]]
+      else:
+        self._atoms[key] = []
+    return self._atoms[key]
+
+  def _evaluate(self, node):
+    if node[0] == "atom":
+      return self._atom(*node[1:])
+    if node[0] == "alt":
+      for child in node[1]:
+        picked = self._evaluate(child)
+        if picked:
+          return picked
+      return []
+    # merge
+    return [merge_formats((a, b)) for a in self._evaluate(node[1]) for b in self._evaluate(node[2])]
+
+  def select(self, selector):
+    """Return the format dicts yt-dlp would choose for the selector string."""
+    tree = compile_selector(selector)
+    if tree is not None:
+      return self._evaluate(tree)
+    if self.ydl is None:
+      raise ValueError(f"Unsupported format selector: {selector}")
+    cache = _ytdlp_compiled.setdefault(self.ydl, {})
+    if selector not in cache:
+      cache[selector] = self.ydl.build_format_selector(selector)
+    return list(cache[selector](self._ctx()))
+
+  def price(self, selector):
+    """Return (chosen formats, estimated total size in bytes) for the selector string."""
+    chosen = self.select(selector)
+    return chosen, sum(_size(f) or 0 for f in chosen)
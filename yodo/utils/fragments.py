@@ -0,0 +1,192 @@
+"""
+Adaptive fragment concurrency for HLS/DASH downloads.
+
+yt-dlp downloads the fragments of a format on a thread pool of a fixed size (concurrent_fragment_downloads).
+Here the pool is sized to the upper bound and every fragment download first takes a slot from an adjustable
+limit, so the number of fragments in flight can change while the download runs.
+
+After every window of finished fragments the controller looks at the aggregate throughput and the error rate:
+  - errors (HTTP 403/429, broken reads) above ERROR_RATE halve the limit (back off fast)
+  - otherwise one more fragment is tried (additive increase), as long as the throughput keeps growing
+  - an increase that didn't pay off is taken back and the limit is held for a few windows
+
+Progressive (single file) downloads are not affected.
+"""
+import os
+import threading
+import time
+import weakref
+
+# default bounds of fragments in flight, and the start value (yt-dlp's former fixed setting)
+DEFAULT_MIN_FRAGMENTS = 1
+DEFAULT_MAX_FRAGMENTS = 8
+START_FRAGMENTS = 3
+
+# share of failed fragment attempts in a window that makes the controller back off
+ERROR_RATE = 0.2
+
+# min relative throughput gain that justifies the last increase
+MIN_GAIN = 0.05
+
+# windows without increases after an increase didn't pay off
+HOLD_WINDOWS = 3
+
+# min seconds per window (at least 2 fragments per slot are collected as well)
+MIN_WINDOW = 2.0
+
+# YoutubeDL → FragmentController
+_controllers = weakref.WeakKeyDictionary()
+_installed = False
+
+
+def parse_bounds(value):
+  """
+  Parse '--fragments' ('N' or 'MIN-MAX').
+
+  Returns:
+    tuple: (min, max)
+
+  Raises:
+    ValueError: on malformed values
+  """
+  low, sep, high = value.partition("-")
+  if not sep:
+    high = low
+  if not low.strip().isdigit() or not high.strip().isdigit():
+    raise ValueError(f"invalid fragment bounds '{value}' (expected N or MIN-MAX)")
+  low, high = int(low), int(high)
+  if low < 1 or high < low:
+    raise ValueError(f"invalid fragment bounds '{value}' (1 <= MIN <= MAX)")
+  return low, high
+
+
+class FragmentController:
+  """
+  Adjustable limit of fragments in flight, driven by measured throughput and errors.
+
+  Args:
+    min_fragments (int): lower bound
+    max_fragments (int): upper bound (size of yt-dlp's fragment thread pool)
+    log (callable, optional): called with a message for every decision
+  """
+
+  def __init__(self, min_fragments=DEFAULT_MIN_FRAGMENTS, max_fragments=DEFAULT_MAX_FRAGMENTS, log=None):
+    self.min = min_fragments
+    self.max = max_fragments
+    self.limit = min(max(START_FRAGMENTS, self.min), self.max)
+    self.log = log
+    self.in_flight = 0
+    self._cond = threading.Condition()
+
+    # current window
+    self._window_start = None
+    self._bytes = 0
+    self._done = 0
+    self._errors = 0
+
+    self._last_throughput = None
+    self._increased = False
+    self._hold = 0
+
+  def acquire(self):
+    with self._cond:
+      while self.in_flight >= self.limit:
+        self._cond.wait()
+      self.in_flight += 1
+      if self._window_start is None:
+        self._window_start = time.monotonic()
+
+  def release(self, size=0, error=False):
+    """Return the slot of a finished fragment attempt and account for it."""
+    with self._cond:
+      self.in_flight -= 1
+      if error:
+        self._errors += 1
+      else:
+        self._done += 1
+        self._bytes += size
+      self._maybe_adjust()
+      self._cond.notify_all()
+
+  def _maybe_adjust(self):
+    attempts = self._done + self._errors
+    elapsed = time.monotonic() - self._window_start
+    if attempts < 2 * self.limit or elapsed < MIN_WINDOW:
+      return
+
+    throughput = self._bytes / elapsed
+    error_rate = self._errors / attempts
+    old = self.limit
+
+    if error_rate >= ERROR_RATE:
+      self.limit = max(self.min, self.limit // 2)
+      reason = f"{self._errors}/{attempts} attempts failed"
+      self._increased = False
+      self._hold = HOLD_WINDOWS
+    elif self._increased and self._last_throughput and throughput < self._last_throughput * (1 + MIN_GAIN):
+      # the extra fragment didn't help, take it back and stay there for a while
+      self.limit = max(self.min, self.limit - 1)
+      reason = "no throughput gain"
+      self._increased = False
+      self._hold = HOLD_WINDOWS
+      throughput = self._last_throughput
+    elif self._hold:
+      self._hold -= 1
+      reason = None
+      self._increased = False
+    elif self.limit < self.max:
+      self.limit += 1
+      reason = "probing"
+      self._increased = True
+    else:
+      reason = None
+      self._increased = False
+
+    if self.log and reason and self.limit != old:
+      self.log(
+        f"in flight {old} → {self.limit} ({reason}, "
+        f"{throughput / (1024 * 1024):.2f} MiB/s, errors {self._errors}/{attempts})"
+      )
+
+    self._last_throughput = throughput
+    self._window_start = time.monotonic()
+    self._bytes = self._done = self._errors = 0
+
+
+def _install():
+  """Wrap yt-dlp's fragment download once, fragments of YoutubeDL instances with a controller take a slot first."""
+  global _installed
+  if _installed:
+    return
+  from yt_dlp.downloader.fragment import FragmentFD
+
+  original = FragmentFD._download_fragment
+
+  def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_data=None):
+    controller = _controllers.get(self.ydl)
+    if controller is None:
+      return original(self, ctx, frag_url, info_dict, headers, request_data)
+
+    controller.acquire()
+    try:
+      success = original(self, ctx, frag_url, info_dict, headers, request_data)
+    except BaseException:
+      controller.release(error=True)
+      raise
+    size = 0
+    if success:
+      try:
+        size = os.path.getsize(ctx["fragment_filename_sanitized"])
+      except (KeyError, OSError):
+        pass
+    controller.release(size, error=not success)
+    return success
+
+  FragmentFD._download_fragment = _download_fragment
+  _installed = True
+
+
+def attach(ydl, controller):
+  """Let the controller drive the fragment downloads of the YoutubeDL instance."""
+  _install()
+  _controllers[ydl] = controller
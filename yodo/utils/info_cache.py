@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# default cache location (app-private on Termux, ~/.cache on Linux)
+DEFAULT_CACHE_DIR = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "info"
+)
+
+# total size of the cache directory before least recently used entries are evicted
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# TTL used when no format URL carries an 'expire=' timestamp
+DEFAULT_TTL = 30 * 60
+
+# entries expiring within this window are treated as already expired,
+# so the download never starts with a URL that is about to go stale
+EXPIRY_MARGIN = 5 * 60
+
+# matches 'expire=1700000000' (query) and '/expire/1700000000/' (YouTube manifest paths)
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d{9,})")
+
+# query parameters that never change the media a URL points to
+_TRACKING_PARAMS = {"si", "feature", "pp", "igsh", "igshid", "utm_source", "utm_medium", "utm_campaign", "utm_content", "utm_term"}
+
+
+def canonical_url(url):
+  """Normalise a URL for use as a cache key (lowercase host, no fragment, no tracking params, sorted query)."""
+  parts = urlsplit(url.strip())
+  query = sorted(
+    (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    if k.lower() not in _TRACKING_PARAMS
+  )
+  netloc = parts.netloc.lower()
+  if netloc.startswith("www."):
+    netloc = netloc[4:]
+  path = parts.path.rstrip("/") or "/"
+  return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ""))
+
+
+def media_key(url):
+  """
+  Return the cache key for a URL without any network access.
+
+  If a (non generic) yt-dlp extractor matches the URL the key is '<extractor>:<video id>',
+  so 'youtu.be/ID' and 'youtube.com/watch?v=ID' share one entry. Otherwise the canonical URL is used.
+  Only the extractors of the modules the domain index names for the host are tried (see extractor_index),
+  matching the URL against every extractor of yt-dlp costs more than a cache hit saves.
+  """
+  ie = _matching_extractor(url)
+  if ie is not None:
+    video_id = ie.get_temp_id(url)
+    if video_id:
+      return f"{ie.ie_key()}:{video_id}"
+  return f"url:{canonical_url(url)}"
+
+
+def _matching_extractor(url):
+  """Return the first extractor class of the indexed modules that is suitable for the URL, or None."""
+  import importlib
+  from yodo.utils.extractor_index import resolve_extractor_modules
+
+  for module_name in resolve_extractor_modules(url):
+    try:
+      module = importlib.import_module(module_name)
+    except Exception:
+      continue
+    for name, ie in vars(module).items():
+      # base classes (no URL pattern of their own) and extractors imported from other modules are skipped
+      if not name.endswith("IE") or not isinstance(ie, type) or ie.__module__ != module_name:
+        continue
+      if getattr(ie, "_VALID_URL", None) is None:
+        continue
+      try:
+        if ie.suitable(url):
+          return ie
+      except Exception:
+        continue
+  return None
+
+
+def info_expiry(info, now=None):
+  """
+  Return the unix time at which the info dict stops being usable.
+
+  Signed media URLs (YouTube, Google video etc) carry an 'expire=' parameter, the earliest one wins.
+  Info dicts without any 'expire=' fall back to DEFAULT_TTL.
+  """
+  now = time.time() if now is None else now
+  expires = []
+  for f in info.get("formats") or [info]:
+    for field in ("url", "manifest_url", "fragment_base_url"):
+      value = f.get(field)
+      if not isinstance(value, str):
+        continue
+      match = _EXPIRE_RE.search(value)
+      if match:
+        expires.append(int(match.group(1)))
+  return min(expires) if expires else now + DEFAULT_TTL
+
+
+class InfoCache:
+  """
+  On-disk cache of sanitized yt-dlp info dicts.
+
+  Each entry is one gzip compressed JSON file named after the hash of its key.
+  The file mtime is used as the last access time for LRU eviction.
+  """
+
+  def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR))
+    self.max_bytes = max_bytes
+
+  def _path(self, key):
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(self.cache_dir, f"{digest}.json.gz")
+
+  def load(self, url, key=None):
+    """Return the cached info dict for the URL, or None if missing, unreadable or (about to be) expired."""
+    key = key or media_key(url)
+    path = self._path(key)
+    try:
+      with gzip.open(path, "rt", encoding="utf-8") as f:
+        entry = json.load(f)
+    except (OSError, ValueError):
+      return None
+
+    if entry.get("key") != key or entry.get("expires", 0) - EXPIRY_MARGIN <= time.time():
+      # expired entries are dropped so the next extraction refreshes them
+      self._remove(path)
+      return None
+
+    # mark as recently used
+    try:
+      os.utime(path)
+    except OSError:
+      pass
+    return entry.get("info")
+
+  def store(self, url, info, key=None):
+    """Sanitize and store the info dict. Failures are ignored, the cache is only an optimisation."""
+    from yt_dlp import YoutubeDL
+
+    key = key or media_key(url)
+    path = self._path(key)
+    entry = {
+      "key": key,
+      "url": url,
+      "expires": info_expiry(info),
+      "info": YoutubeDL.sanitize_info(info, remove_private_keys=True),
+    }
+    try:
+      os.makedirs(self.cache_dir, exist_ok=True)
+      tmp_path = f"{path}.{os.getpid()}.tmp"
+      with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(entry, f, separators=(",", ":"))
+      os.replace(tmp_path, path)
+    except OSError:
+      self._remove(f"{path}.{os.getpid()}.tmp")
+      return
+    self._evict()
+
+  def invalidate(self, url, key=None):
+    """Remove the entry for the URL (e.g. after the cached media URLs were rejected)."""
+    self._remove(self._path(key or media_key(url)))
+
+  def _remove(self, path):
+    try:
+      os.remove(path)
+    except OSError:
+      pass
+
+  def _evict(self):
+    """Delete least recently used entries until the cache fits into max_bytes."""
+    try:
+      entries = []
+      with os.scandir(self.cache_dir) as it:
+        for e in it:
+          if e.name.endswith(".json.gz"):
+            st = e.stat()
+            entries.append((st.st_mtime, st.st_size, e.path))
+    except OSError:
+      return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+      if total <= self.max_bytes:
+        break
+      self._remove(path)
+      total -= size
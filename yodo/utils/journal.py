@@ -0,0 +1,148 @@
+"""
+Crash-safe job journal.
+
+Before a download starts, its job (URL, choice, options attributes, resolved format IDs and output template) is
+written to its own journal file. The file is removed only after the download finished, so a job whose process was
+killed (Termux closed, network lost, Ctrl+C) stays in the journal together with its '.part' files.
+
+'yodo --resume' runs every unfinished job again with the same format IDs and output template, so yt-dlp finds the
+existing partial file (or fragments) and continues from there instead of starting over.
+
+Journal files are written atomically (temp file, fsync, rename), a crash never leaves a half written job behind.
+"""
+import glob
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_JOURNAL_DIR = os.path.join(
+  os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "yodo", "jobs"
+)
+
+# resume attempts before a job is dropped from the journal (its partial files are kept)
+MAX_ATTEMPTS = 3
+
+
+def job_id(url, preset):
+  """The same URL and choice always map to the same job, a repeated run replaces its journal entry."""
+  return hashlib.sha256(f"{url}\n{preset or ''}".encode("utf-8")).hexdigest()[:16]
+
+
+def _pid_alive(pid):
+  if not pid or pid == os.getpid():
+    return False
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except OSError:
+    return True # exists, owned by someone else
+  # killed but not reaped yet
+  try:
+    with open(f"/proc/{pid}/stat", "r") as f:
+      return f.read().rsplit(")", 1)[-1].split()[0] != "Z"
+  except (OSError, IndexError):
+    return True
+
+
+class Journal:
+  """Directory of journal files, one JSON file per unfinished job."""
+
+  def __init__(self, journal_dir=None):
+    self.journal_dir = os.path.abspath(os.path.expanduser(journal_dir or DEFAULT_JOURNAL_DIR))
+
+  def _path(self, job_id):
+    return os.path.join(self.journal_dir, f"{job_id}.json")
+
+  def _write(self, job):
+    os.makedirs(self.journal_dir, exist_ok=True)
+    path = self._path(job["id"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+      json.dump(job, f, indent=2)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+  def load(self, job_id):
+    try:
+      with open(self._path(job_id), "r", encoding="utf-8") as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return None
+
+  def begin(self, url, preset, **fields):
+    """
+    Write the job before its download starts.
+
+    Args:
+      url (str): media URL
+      preset (str): choice and arguments
+      **fields: choice, options_attributes, format_id, format, outtmpl, title ...
+
+    Returns:
+      dict: the journaled job
+    """
+    jid = job_id(url, preset)
+    previous = self.load(jid) or {}
+    job = {
+      "id": jid,
+      "url": url,
+      "preset": preset,
+      **fields,
+      "created": previous.get("created") or time.time(),
+      "updated": time.time(),
+      "attempts": previous.get("attempts", 0) + 1,
+      "pid": os.getpid(),
+      "error": None,
+    }
+    self._write(job)
+    return job
+
+  def fail(self, job, error):
+    """Keep the job for '--resume', with the reason it stopped."""
+    job = {**job, "error": str(error), "updated": time.time(), "pid": None}
+    try:
+      self._write(job)
+    except OSError:
+      pass
+    return job
+
+  def finish(self, job):
+    """Remove a finished (or abandoned) job."""
+    try:
+      os.remove(self._path(job["id"]))
+    except OSError:
+      pass
+
+  def unfinished(self):
+    """Return the unfinished jobs (oldest first). Jobs of other running YODO processes are left alone."""
+    jobs = []
+    for path in glob.glob(os.path.join(self.journal_dir, "*.json")):
+      try:
+        with open(path, "r", encoding="utf-8") as f:
+          job = json.load(f)
+      except (OSError, ValueError):
+        continue
+      if isinstance(job, dict) and job.get("url") and not _pid_alive(job.get("pid")):
+        jobs.append(job)
+    return sorted(jobs, key=lambda job: job.get("created") or 0)
+
+
+def partial_bytes(job):
+  """Return the bytes already on disk for the job ('.part' files and fragments next to its output template)."""
+  outtmpl = job.get("outtmpl")
+  if not outtmpl:
+    return 0
+  if job.get("staging"):
+    # relative to the staging directory of the download (see yodo.utils.staging)
+    outtmpl = os.path.join(job["staging"], outtmpl)
+  prefix = glob.escape(outtmpl.split("%(", 1)[0])
+  total = 0
+  for path in glob.glob(f"{prefix}*.part") + glob.glob(f"{prefix}*.part-Frag*"):
+    try:
+      total += os.path.getsize(path)
+    except OSError:
+      pass
+  return total
@@ -0,0 +1,231 @@
+"""
+Staged pipeline for queued downloads (batch mode).
+
+A download passes through a chain of stages: extract → download → postprocess. Every stage has its own worker
+thread and a bounded queue in front of it, so while job N is downloaded job N+1 is already extracted and job N-1
+is postprocessed (ffmpeg). The depth of a queue bounds how far the stage before it may run ahead; a stage whose
+queue is full waits (back-pressure). A stage may have several workers (CPU bound postprocessing), the results
+keep the input order.
+
+A job that fails in one stage skips the remaining stages, the other jobs go on.
+
+The output of the stages that run ahead or behind is buffered per job and printed as one block when the job
+reaches the next stage (or leaves the pipeline), so the live download output isn't torn apart.
+
+Per stage the pipeline records:
+  busy     time the stage worked on jobs
+  idle     time the stage waited for a job from the stage before it
+  blocked  time the stage waited for room in the queue of the next stage
+  wait     time jobs sat in the queue in front of the stage
+The times of a stage with several workers are summed over its workers.
+"""
+import queue
+import sys
+import threading
+import time
+
+# queued jobs in front of the download and the postprocess stage
+DEFAULT_DEPTH = 1
+
+_END = object()
+
+
+def parse_depths(value, stages=2):
+  """
+  Parse '--pipeline-depth' ('N' or 'DOWNLOAD,POSTPROCESS').
+
+  Returns:
+    tuple: queue depth in front of each stage after the first
+
+  Raises:
+    ValueError: on malformed values
+  """
+  parts = value.split(",")
+  if len(parts) == 1:
+    parts = parts * stages
+  if len(parts) != stages or not all(part.strip().isdigit() for part in parts):
+    raise ValueError(f"invalid pipeline depth '{value}' (expected N or DOWNLOAD,POSTPROCESS)")
+  return tuple(int(part) for part in parts)
+
+
+class Stage:
+  """
+  One stage of a pipeline.
+
+  Args:
+    name (str): shown in the report
+    func (callable): called with the job value, returns the value passed to the next stage
+    depth (int): queue depth in front of the stage (ignored for the first stage)
+    buffered (bool): buffer the output of a job until it reaches the next stage
+    workers (int): worker threads of the stage (func must be thread safe if > 1)
+  """
+
+  def __init__(self, name, func, depth=DEFAULT_DEPTH, buffered=False, workers=1):
+    self.name = name
+    self.func = func
+    self.depth = max(1, depth)
+    self.buffered = buffered
+    self.workers = max(1, workers)
+    self._running = 0
+    self.jobs = 0
+    self.failed = 0
+    self.busy = 0.0
+    self.idle = 0.0
+    self.blocked = 0.0
+    self.wait = 0.0
+
+
+class _Job:
+  __slots__ = ("index", "value", "error", "output", "queued")
+
+  def __init__(self, index, value):
+    self.index = index
+    self.value = value
+    self.error = None
+    self.output = []
+    self.queued = None
+
+
+class _OutputRouter:
+  """sys.stdout/sys.stderr replacement: writes of threads with an output buffer go to the buffer."""
+
+  def __init__(self, stream, local):
+    self._stream = stream
+    self._local = local
+
+  def write(self, text):
+    buffer = getattr(self._local, "buffer", None)
+    if buffer is None:
+      return self._stream.write(text)
+    buffer.append(text)
+    return len(text)
+
+  def flush(self):
+    if getattr(self._local, "buffer", None) is None:
+      self._stream.flush()
+
+  def __getattr__(self, name):
+    return getattr(self._stream, name)
+
+
+class Pipeline:
+  """
+  Run jobs through a chain of stages, one worker thread per stage.
+
+  Args:
+    stages (list): Stage objects, in order
+  """
+
+  def __init__(self, stages):
+    self.stages = stages
+    self.elapsed = 0.0
+    self._local = threading.local()
+    self._print_lock = threading.Lock()
+    self._stats_lock = threading.Lock()
+
+  def _flush_output(self, job):
+    if job.output:
+      with self._print_lock:
+        self._stdout.write("".join(job.output))
+        self._stdout.flush()
+      job.output = []
+
+  def _worker(self, stage, inbox, outbox):
+    while True:
+      started = time.perf_counter()
+      job = inbox.get()
+      got = time.perf_counter()
+      if job is _END:
+        with self._stats_lock:
+          stage.idle += got - started
+          stage._running -= 1
+          last = stage._running == 0
+        if not last:
+          # for the other workers of the stage
+          inbox.put(_END)
+        elif outbox is not None:
+          outbox.put(_END)
+        return
+      with self._stats_lock:
+        stage.idle += got - started
+        if job.queued is not None:
+          stage.wait += got - job.queued
+
+      self._flush_output(job)
+      if job.error is None:
+        self._local.buffer = job.output if stage.buffered else None
+        try:
+          job.value = stage.func(job.value)
+        except BaseException as e:
+          # anything (also SystemExit and the like) only fails the job, a dead worker would stall the pipeline
+          job.error = e
+          with self._stats_lock:
+            stage.failed += 1
+        finally:
+          self._local.buffer = None
+          with self._stats_lock:
+            stage.jobs += 1
+            stage.busy += time.perf_counter() - got
+
+      if outbox is None:
+        self._flush_output(job)
+        self._results[job.index] = job
+        continue
+      started = time.perf_counter()
+      job.queued = started
+      outbox.put(job)
+      with self._stats_lock:
+        stage.blocked += time.perf_counter() - started
+
+  def run(self, values):
+    """
+    Run every value through all stages.
+
+    Returns:
+      list: (True, result) or (False, exception) per value, in input order
+    """
+    values = list(values)
+    self._results = [None] * len(values)
+    self._stdout = sys.stdout
+    saved = sys.stdout, sys.stderr
+    sys.stdout = _OutputRouter(sys.stdout, self._local)
+    sys.stderr = _OutputRouter(sys.stderr, self._local)
+
+    # unbounded input of the first stage, bounded queues between the stages
+    queues = [queue.Queue()] + [queue.Queue(maxsize=stage.depth) for stage in self.stages[1:]]
+    for stage in self.stages:
+      stage._running = stage.workers
+    workers = [
+      threading.Thread(
+        target=self._worker,
+        args=(stage, queues[i], queues[i + 1] if i + 1 < len(queues) else None),
+        name=f"pipeline-{stage.name}-{n}",
+        daemon=True
+      )
+      for i, stage in enumerate(self.stages)
+      for n in range(stage.workers)
+    ]
+
+    start = time.perf_counter()
+    try:
+      for index, value in enumerate(values):
+        queues[0].put(_Job(index, value))
+      queues[0].put(_END)
+      for worker in workers:
+        worker.start()
+      for worker in workers:
+        # polling join, so Ctrl+C reaches the main thread
+        while worker.is_alive():
+          worker.join(0.2)
+    finally:
+      sys.stdout, sys.stderr = saved
+      self.elapsed = time.perf_counter() - start
+
+    return [(True, job.value) if job.error is None else (False, job.error) for job in self._results]
+
+  def report(self):
+    """Return the per stage statistics as rows (name, jobs, failed, busy, idle, blocked, wait) in seconds."""
+    return [
+      (stage.name, stage.jobs, stage.failed, stage.busy, stage.idle, stage.blocked, stage.wait)
+      for stage in self.stages
+    ]
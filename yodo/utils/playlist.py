@@ -0,0 +1,47 @@
+"""
+Streaming playlist support.
+
+Playlist and channel URLs are extracted flat and unprocessed, so their entries stay a lazy generator
+(yt-dlp fetches further pages only while they are consumed). Each entry is fully extracted one step ahead:
+while entry N downloads, entry N+1 is extracted in a background thread. At most two entries are held at any
+time, so memory stays flat and the first download starts right after the first page of the playlist.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+# yt-dlp result types that hold entries instead of formats
+PLAYLIST_TYPES = ("playlist", "multi_video")
+
+
+def is_playlist(info):
+  return bool(info) and info.get("_type") in PLAYLIST_TYPES
+
+
+def entry_url(info):
+  """Return the URL a (resolved) entry is downloaded from."""
+  return info.get("webpage_url") or info.get("original_url") or info.get("url")
+
+
+def entry_ydl_opts(base_opts):
+  """yt-dlp options for resolving entries (nested playlists, e.g. channel tabs, stay flat and lazy)."""
+  return {**base_opts, "extract_flat": "in_playlist", "lazy_playlist": True}
+
+
+def pipelined(entries, extract):
+  """
+  Yield (entry, future) pairs, where the future resolves to extract(entry).
+
+  extract() of the next entry is submitted before the current pair is handed out,
+  so it runs in the background while the caller works on the current entry.
+  Entries are pulled from the (lazy) iterable one at a time, None entries are skipped.
+  """
+  entries = (entry for entry in entries if entry)
+  with ThreadPoolExecutor(max_workers=1, thread_name_prefix="playlist-extract") as executor:
+    current = next(entries, None)
+    if current is None:
+      return
+    future = executor.submit(extract, current)
+    for upcoming in entries:
+      upcoming_future = executor.submit(extract, upcoming)
+      yield current, future
+      current, future = upcoming, upcoming_future
+    yield current, future
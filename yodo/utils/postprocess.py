@@ -0,0 +1,277 @@
+"""
+Single pass postprocessing of video downloads.
+
+yt-dlp's postprocessors work one after another and each of them rewrites the whole media file: the merge of
+separate video and audio formats (FFmpegMerger), the remux (FFmpegVideoRemuxer), the metadata (FFmpegMetadata),
+the cover (EmbedThumbnail) and the subtitles (FFmpegEmbedSubtitle) copy a 2 GB download four or five times,
+on phone storage that takes minutes.
+
+plan() turns the chosen video options into the smallest set of steps:
+  - merge, container change, metadata, chapters, subtitles and the cover are written by ONE ffmpeg run
+    (SinglePassPP): yt-dlp's merge is deferred to it, the format files are its inputs
+  - the remux is skipped when the container already matches, nothing to embed skips ffmpeg altogether
+  - only the thumbnail conversion stays a step of its own, it reads and writes the small image only
+
+Formats downloaded without the single pass (the batch pipeline postprocesses in a later stage) are merged into
+mkv, which takes any codec and, unlike mp4, is written without a second 'faststart' pass.
+
+webm can't hold a cover, it is skipped with a warning.
+"""
+import os
+import weakref
+
+# key of SinglePassPP in yt-dlp's postprocessor registry ('postprocessors' option)
+KEY = "YodoSinglePass"
+
+# containers with an embedded cover: mkv/mka as attachment, mp4/mov as attached picture (written as 'covr')
+ATTACHMENT_EXTS = ("mkv", "mka")
+ATTACHED_PIC_EXTS = ("mp4", "m4v", "mov")
+
+# subtitle files ffmpeg can embed per container (mp4/mov: converted to mov_text)
+SUBTITLE_EXTS = {
+  "mp4": ("srt", "vtt", "ass"),
+  "m4v": ("srt", "vtt", "ass"),
+  "mov": ("srt", "vtt", "ass"),
+  "mkv": ("srt", "vtt", "ass", "ssa"),
+  "webm": ("vtt",),
+}
+
+# container of merged formats that are not merged by the single pass
+MERGE_EXT = "mkv"
+
+# YoutubeDL instances whose merges are done by their single pass
+_single_pass_ydls = weakref.WeakSet()
+_registered = False
+
+
+def plan(attributes):
+  """
+  Plan the postprocessing of a video download.
+
+  Args:
+    attributes (dict): video options of the choice (options_attributes['video']: format, thumbnail, metadata, subtitles)
+
+  Returns:
+    dict: yt-dlp options ('postprocessors' and 'merge_output_format')
+  """
+  register()
+  container = attributes["format"]
+  cover = attributes["thumbnail"]["enabled"] and container in ATTACHMENT_EXTS + ATTACHED_PIC_EXTS
+
+  postprocessors = []
+  if cover:
+    # image only, the media file isn't touched
+    postprocessors.append({"key": "FFmpegThumbnailsConvertor", "format": attributes["thumbnail"]["ext"]})
+  postprocessors.append({
+    "key": KEY,
+    "container": container,
+    "metadata": attributes["metadata"],
+    "cover": cover,
+    "subtitles": attributes["subtitles"]["enabled"],
+  })
+
+  return {"postprocessors": postprocessors, "merge_output_format": MERGE_EXT}
+
+
+def register():
+  """
+  Make SinglePassPP available to the 'postprocessors' option of every YoutubeDL instance, and let it take over
+  the merge of the instances it belongs to.
+  """
+  global _registered
+  if _registered:
+    return
+  from yt_dlp.globals import postprocessors
+  from yt_dlp.postprocessor.ffmpeg import FFmpegMergerPP
+
+  postprocessors.value[f"{KEY}PP"] = _single_pass_pp()
+
+  original = FFmpegMergerPP.run
+
+  def run(self, info):
+    # only if nothing else (fixups) has to run on the merged file before the single pass
+    if self._downloader in _single_pass_ydls and (info.get("__postprocessors") or [self])[-1] is self:
+      self.to_screen("Deferring the merge of the formats to the single pass")
+      info["__merge_deferred"] = True
+      return [], info
+    return original(self, info)
+
+  FFmpegMergerPP.run = run
+  _registered = True
+
+
+def _single_pass_pp():
+  from yt_dlp.postprocessor.common import PostProcessor
+  from yt_dlp.postprocessor.ffmpeg import (
+    FFmpegMetadataPP,
+    FFmpegPostProcessor,
+    FFmpegThumbnailsConvertorPP,
+  )
+  from yt_dlp.utils import ISO639Utils, prepend_extension, replace_extension
+
+  class SinglePassPP(FFmpegPostProcessor):
+    """
+    Merge, remux, metadata, chapters, subtitles and cover of a video in one ffmpeg run.
+
+    Args:
+      container (str): target container (file extension)
+      metadata (bool): write metadata and chapters
+      cover (bool): embed the last downloaded thumbnail
+      subtitles (bool): embed the downloaded subtitles
+    """
+
+    def __init__(self, downloader=None, container=None, metadata=True, cover=True, subtitles=False):
+      super().__init__(downloader)
+      self.container = container
+      self.metadata = metadata
+      self.cover = cover
+      self.subtitles = subtitles
+      if downloader is not None:
+        _single_pass_ydls.add(downloader)
+
+    @classmethod
+    def pp_key(cls):
+      return KEY
+
+    def _cover_file(self, info, target_ext):
+      """Path of the thumbnail to embed (converted to png where the container needs it), or None."""
+      thumbnails = info.get("thumbnails") or []
+      idx = next((-i for i, t in enumerate(thumbnails[::-1], 1) if t.get("filepath")), None)
+      if idx is None or not os.path.exists(thumbnails[idx]["filepath"]):
+        self.report_warning("Skipping the cover, the thumbnail file is missing")
+        return None
+      convertor = FFmpegThumbnailsConvertorPP(self._downloader)
+      convertor.fixup_webp(info, idx)
+      path = thumbnails[idx]["filepath"]
+      if target_ext in ATTACHED_PIC_EXTS and os.path.splitext(path)[1][1:].lower() not in ("jpg", "jpeg", "png"):
+        converted = convertor.convert_thumbnail(path, "png")
+        self._delete_downloaded_files(path, info=info)
+        thumbnails[idx]["filepath"] = path = converted
+      return path
+
+    def _video_streams(self, info, path):
+      """Number of video streams of the media (the cover becomes the next one)."""
+      if path and self.probe_available:
+        try:
+          streams = self.get_metadata_object(path)["streams"]
+          return sum(1 for s in streams if s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic"))
+        except Exception:
+          pass
+      return sum(1 for f in info.get("requested_formats") or [info] if f.get("vcodec") != "none") or 1
+
+    def _merge_opts(self, info):
+      """Map options of the separate format files (like FFmpegMergerPP)."""
+      opts, audio_streams = [], 0
+      for i, fmt in enumerate(info["requested_formats"]):
+        if fmt.get("acodec") != "none":
+          opts += ["-map", f"{i}:a:0"]
+          if (fmt.get("protocol") or "").startswith("m3u8") and self.get_audio_codec(fmt["filepath"]) == "aac":
+            opts += [f"-bsf:a:{audio_streams}", "aac_adtstoasc"]
+          audio_streams += 1
+        if fmt.get("vcodec") != "none":
+          opts += ["-map", f"{i}:v:0"]
+      return opts
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+      filename, source_ext = info["filepath"], info["ext"].lower()
+      target_ext = self.container or source_ext
+      outpath = replace_extension(filename, target_ext, source_ext)
+      steps, extra_files = [], []
+
+      parts = info["__files_to_merge"] if info.pop("__merge_deferred", False) else None
+      if parts:
+        # the merged file doesn't exist, the format files are the inputs
+        inputs = list(parts)
+        opts = [*self._merge_opts(info), "-dn", "-ignore_unknown", "-c", "copy"]
+        if target_ext in ATTACHED_PIC_EXTS:
+          opts += ["-c:s", "mov_text"]
+        steps.append(f"merge {len(parts)} formats")
+        media = next((p for p, f in zip(parts, info["requested_formats"]) if f.get("vcodec") != "none"), parts[0])
+      else:
+        inputs = [filename]
+        opts = list(self.stream_copy_opts(ext=target_ext))
+        if target_ext != source_ext:
+          steps.append(f"remux {source_ext} → {target_ext}")
+        media = filename
+
+      # cover
+      cover = None
+      if self.cover:
+        if target_ext in ATTACHMENT_EXTS + ATTACHED_PIC_EXTS:
+          cover = self._cover_file(info, target_ext)
+        else:
+          self.report_warning(f"A cover can't be embedded in {target_ext} files")
+      if cover and target_ext in ATTACHMENT_EXTS:
+        cover_ext = os.path.splitext(cover)[1][1:].lower()
+        opts += [
+          "-map", "-0:t?",
+          "-attach", self._ffmpeg_filename_argument(cover),
+          "-metadata:s:t", f"mimetype=image/{cover_ext.replace('jpg', 'jpeg')}",
+          "-metadata:s:t", f"filename=cover.{cover_ext}",
+        ]
+      elif cover:
+        video_streams = self._video_streams(info, None if parts else media)
+        opts += ["-map", f"{len(inputs)}:0", f"-disposition:v:{video_streams}", "attached_pic"]
+        inputs.append(cover)
+      if cover:
+        extra_files.append(cover)
+        steps.append("cover")
+
+      # subtitles
+      if self.subtitles:
+        embedded = 0
+        for lang, sub in (info.get("requested_subtitles") or {}).items():
+          path = sub.get("filepath")
+          if not path or not os.path.exists(path):
+            continue
+          if sub.get("ext") not in SUBTITLE_EXTS.get(target_ext, ()):
+            self.report_warning(f"{sub.get('ext')} subtitles can't be embedded in {target_ext} files, kept as {path}")
+            continue
+          if not embedded and not parts:
+            # don't copy subtitles of the download itself, they are replaced
+            opts += ["-map", "-0:s"]
+          opts += ["-map", f"{len(inputs)}:0", f"-metadata:s:s:{embedded}", f"language={ISO639Utils.short2long(lang) or lang}"]
+          if sub.get("name"):
+            opts += [f"-metadata:s:s:{embedded}", f"title={sub['name']}"]
+          inputs.append(path)
+          extra_files.append(path)
+          embedded += 1
+        if embedded:
+          steps.append(f"{embedded} subtitle(s)")
+
+      # metadata and chapters
+      if self.metadata:
+        metadata_pp = FFmpegMetadataPP(self._downloader)
+        last_chapter = (info.get("chapters") or [{}])[-1]
+        if last_chapter and not last_chapter.get("end_time"):
+          last_chapter["end_time"] = info.get("duration") or self._get_real_video_duration(media)
+        if info.get("chapters"):
+          metadata_filename = replace_extension(outpath, "meta")
+          # writes the FFMETADATA file (the map options it yields are for input 1)
+          list(metadata_pp._get_chapter_opts(info["chapters"], metadata_filename))
+          opts += ["-map_metadata", str(len(inputs)), "-map_chapters", str(len(inputs))]
+          inputs.append(metadata_filename)
+          extra_files.append(metadata_filename)
+          steps.append("chapters")
+        for opt in metadata_pp._get_metadata_opts(info):
+          opts += opt
+        steps.append("metadata")
+
+      if not steps:
+        self.to_screen(f'Nothing to do for "{filename}", already {target_ext}')
+        return [], info
+
+      temp_filename = prepend_extension(outpath, "temp")
+      self.to_screen(f'Writing "{outpath}" in one pass: {", ".join(steps)}')
+      self.run_ffmpeg_multiple_files(inputs, temp_filename, opts)
+      os.replace(temp_filename, outpath)
+      self._delete_downloaded_files(*extra_files, info=info)
+
+      info["filepath"] = outpath
+      info["ext"] = target_ext
+      if parts:
+        return list(parts), info
+      return ([filename] if outpath != filename else []), info
+
+  return SinglePassPP
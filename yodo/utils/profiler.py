@@ -0,0 +1,289 @@
+"""
+Phase level profiling ('--profile [DIR]').
+
+While profiling is on, YODO records a tree of spans: import, argument parsing, preload (per module), URL input,
+extract, format selection, prompt, every download phase (prepare, download, postprocess, finish) and every
+yt-dlp postprocessor. Spans nest per thread; spans of other threads (preload, batch pipeline stages) are
+children of the root, tagged with their thread name.
+
+At exit three files are written to the profile directory (default ~/.cache/yodo/profiles/<time>/):
+  <label>.spans.json  the span tree, times in seconds since the start of the process
+  <label>.prof        cProfile statistics of the main thread (pstats, snakeviz, flameprof)
+  <label>.folded      wall clock stack samples of all threads in collapsed stack format
+                      ('frame;frame;frame count', flamegraph.pl, speedscope, inferno)
+
+The label is 'main', parallel batch workers write one set per item ('item-0001', ...).
+
+Disabled, span()/traced() cost one flag check.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+
+DEFAULT_PROFILE_DIR = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "profiles"
+)
+
+# seconds between two stack samples
+SAMPLE_INTERVAL = 0.005
+
+_enabled = False
+_state = None
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class _Span:
+  __slots__ = ("name", "start", "end", "thread", "attrs", "children")
+
+  def __init__(self, name, start, thread=None, attrs=None):
+    self.name = name
+    self.start = start
+    self.end = None
+    self.thread = thread
+    self.attrs = attrs
+    self.children = []
+
+  def to_dict(self, origin, now):
+    node = {
+      "name": self.name,
+      "start": round(self.start - origin, 6),
+      "duration": round((self.end if self.end is not None else now) - self.start, 6),
+    }
+    if self.thread:
+      node["thread"] = self.thread
+    if self.attrs:
+      node["attrs"] = self.attrs
+    if self.end is None:
+      node["unfinished"] = True
+    if self.children:
+      node["children"] = [child.to_dict(origin, now) for child in self.children]
+    return node
+
+
+class _State:
+  def __init__(self, output_dir, label, origin):
+    self.output_dir = output_dir
+    self.label = label
+    self.pid = os.getpid()
+    self.root = _Span("yodo", origin, attrs={"argv": sys.argv[1:], "pid": self.pid})
+    self.samples = {}
+    self.profile = None
+    self.sampler = None
+    self.stop_sampling = threading.Event()
+
+
+def enabled():
+  return _enabled
+
+
+def _stack():
+  # per thread, reset in forked processes (see restart())
+  stack = getattr(_local, "stack", None)
+  if stack is None or getattr(_local, "pid", None) != _state.pid:
+    stack = _local.stack = []
+    _local.pid = _state.pid
+  return stack
+
+
+def begin(name, **attrs):
+  """Open a span in the current thread, returns it for end() (None if profiling is off)."""
+  if not _enabled:
+    return None
+  stack = _stack()
+  thread = threading.current_thread()
+  span = _Span(name, time.perf_counter(), None if stack or thread is threading.main_thread() else thread.name, attrs)
+  with _lock:
+    (stack[-1] if stack else _state.root).children.append(span)
+  stack.append(span)
+  return span
+
+
+def end(span):
+  """Close a span and the spans opened inside it that are still open (an exception skipped their end())."""
+  if span is None or not _enabled:
+    return
+  now = time.perf_counter()
+  stack = _stack()
+  if span not in stack:
+    span.end = now
+    return
+  while stack:
+    top = stack.pop()
+    top.end = now
+    if top is span:
+      break
+
+
+def record(name, start, end, **attrs):
+  """Add an already finished span (e.g. the imports before profiling was turned on)."""
+  if not _enabled:
+    return
+  span = begin(name, **attrs)
+  span.start = start
+  _stack().pop()
+  span.end = end
+
+
+class _SpanContext:
+  __slots__ = ("name", "attrs", "span")
+
+  def __init__(self, name, attrs):
+    self.name = name
+    self.attrs = attrs
+
+  def __enter__(self):
+    self.span = begin(self.name, **self.attrs)
+    return self.span
+
+  def __exit__(self, *exc):
+    end(self.span)
+    return False
+
+
+class _NullContext:
+  def __enter__(self):
+    return None
+
+  def __exit__(self, *exc):
+    return False
+
+
+_NULL = _NullContext()
+
+
+def span(name, **attrs):
+  """Context manager of a span."""
+  return _SpanContext(name, attrs) if _enabled else _NULL
+
+
+def traced(name):
+  """Decorator: every call of the function is a span."""
+
+  def decorate(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+      if not _enabled:
+        return func(*args, **kwargs)
+      span = begin(name)
+      try:
+        return func(*args, **kwargs)
+      finally:
+        end(span)
+
+    return wrapper
+
+  return decorate
+
+
+def _sample():
+  """Sampler thread: count the current stack of every other thread."""
+  state = _state
+  own = threading.get_ident()
+  code_names = {}
+  while not state.stop_sampling.wait(SAMPLE_INTERVAL):
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+      if ident == own:
+        continue
+      frames = []
+      while frame is not None:
+        code = frame.f_code
+        label = code_names.get(code)
+        if label is None:
+          label = code_names[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+        frames.append(label)
+        frame = frame.f_back
+      frames.append(names.get(ident, "thread").replace(";", ":").replace(" ", "_"))
+      key = ";".join(reversed(frames))
+      state.samples[key] = state.samples.get(key, 0) + 1
+
+
+def _start_collectors(state):
+  import cProfile
+
+  state.profile = cProfile.Profile()
+  state.profile.enable()
+  state.sampler = threading.Thread(target=_sample, name="yodo-profiler", daemon=True)
+  state.sampler.start()
+
+
+def trace_postprocessors():
+  """Make every yt-dlp postprocessor run (YoutubeDL.run_pp) a span (once yt-dlp is imported)."""
+  if not _enabled:
+    return
+  from yt_dlp import YoutubeDL
+
+  if getattr(YoutubeDL.run_pp, "_yodo_traced", False):
+    return
+  original = YoutubeDL.run_pp
+
+  def run_pp(self, pp, infodict):
+    with span(f"postprocessor {pp.pp_key()}"):
+      return original(self, pp, infodict)
+
+  run_pp._yodo_traced = True
+  YoutubeDL.run_pp = run_pp
+
+
+def start(output_dir=None, label="main", origin=None):
+  """
+  Turn profiling on.
+
+  Args:
+    output_dir (str): profile directory ('' or None: a new directory in DEFAULT_PROFILE_DIR)
+    label (str): file name prefix of the profile
+    origin (float): time.perf_counter() of the process start (default: now)
+  """
+  global _enabled, _state
+  if not output_dir:
+    output_dir = os.path.join(DEFAULT_PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+  output_dir = os.path.abspath(os.path.expanduser(output_dir))
+  os.makedirs(output_dir, exist_ok=True)
+  _state = _State(output_dir, label, time.perf_counter() if origin is None else origin)
+  _enabled = True
+  _start_collectors(_state)
+
+
+def restart(label):
+  """In a forked worker process: drop the profile of the parent and profile this process as label."""
+  if not _enabled:
+    return
+  # the sampler thread isn't forked, the cProfile hook of the forking thread is
+  _state.profile.disable()
+  start(_state.output_dir, label)
+
+
+def stop():
+  """
+  Turn profiling off and write the profile files.
+
+  Returns:
+    list: written files
+  """
+  global _enabled
+  if not _enabled:
+    return []
+  import json
+
+  state = _state
+  _enabled = False
+  now = time.perf_counter()
+  state.profile.disable()
+  state.stop_sampling.set()
+  state.sampler.join()
+  state.root.end = now
+
+  base = os.path.join(state.output_dir, state.label)
+  paths = [f"{base}.spans.json", f"{base}.prof", f"{base}.folded"]
+  with _lock:
+    tree = state.root.to_dict(state.root.start, now)
+  with open(paths[0], "w", encoding="utf-8") as f:
+    json.dump(tree, f, indent=1, ensure_ascii=False)
+  state.profile.dump_stats(paths[1])
+  with open(paths[2], "w", encoding="utf-8") as f:
+    for stack, count in sorted(state.samples.items()):
+      f.write(f"{stack} {count}\n")
+  return paths
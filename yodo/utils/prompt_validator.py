@@ -1,3 +1,5 @@
+from bisect import bisect_left
+
 # prompt_toolkit modules
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import Completer, Completion
@@ -41,33 +43,106 @@ placeholder_words = {
     ]
 }
 
+class PrefixIndex:
+  """
+  Sorted index of completion words (case-insensitive).
+  
+  A prefix lookup is two binary searches plus the matches (O(log n + k)), so typing stays
+  smooth on slow devices. Matches are yielded in the order the words were given.
+  """
+  def __init__(self, entries):
+    # entries: (word, display_meta) in display order
+    ranked = sorted((word.lower(), rank, word, meta) for rank, (word, meta) in enumerate(entries))
+    self._keys = [key for key, _, _, _ in ranked]
+    self._entries = [(rank, word, meta) for _, rank, word, meta in ranked]
+  
+  def lookup(self, prefix):
+    prefix = prefix.lower()
+    lo = bisect_left(self._keys, prefix)
+    hi = bisect_left(self._keys, prefix + "\U0010ffff")
+    for _, word, meta in sorted(self._entries[lo:hi]):
+      yield word, meta
+
+
+def build_indexes(hints=None):
+  """
+  Build the completion indexes for the choices and the attributes of each choice.
+  
+  Args:
+    hints (dict, optional): media specific completions (see main.build_completion_hints())
+      "options": {choice: meta} available choices,
+      "quality": {choice: [(attr, meta)]} quality values the media offers,
+      "subtitles": {lang: meta} subtitle tracks of the media
+  
+  Returns:
+    dict: {"options": PrefixIndex, "low"|"medium"|"high"|"audio": PrefixIndex}
+  """
+  if not hints:
+    return {
+      "options": PrefixIndex((w, None) for w in placeholder_words["options"]),
+      **{choice: PrefixIndex((w, None) for w in placeholder_words["video"]) for choice in ("low", "medium", "high")},
+      "audio": PrefixIndex((w, None) for w in placeholder_words["audio"])
+    }
+  
+  # unavailable choices are hidden
+  options = [(w, hints["options"][w]) for w in placeholder_words["options"] if w in hints["options"]]
+  options.append(("cancel", None))
+  
+  # subtitles: only the languages the media has
+  if hints["subtitles"]:
+    subtitles = [("subtitles=true", "all tracks"), ("subtitles=false", None), ("subtitles=all", "all tracks")]
+    subtitles += [(f"subtitles={lang}", meta) for lang, meta in hints["subtitles"].items()]
+  else:
+    subtitles = [("subtitles=false", None)]
+  subtitles.append(("subtitles=help", None))
+  
+  indexes = {"options": PrefixIndex(options)}
+  for choice in ("low", "medium", "high"):
+    indexes[choice] = PrefixIndex([
+      *hints["quality"].get(choice, []),
+      ("quality=help", None),
+      *((w, None) for w in (*_video_format_attrs, *_metadata_attrs, *_thumbnail_attrs)),
+      *subtitles,
+      (_help_attr, None)
+    ])
+  indexes["audio"] = PrefixIndex([
+    *hints["quality"].get("audio", []),
+    ("quality=help", None),
+    *((w, None) for w in (*_audio_format_attrs, *_metadata_attrs, *_thumbnail_attrs, _help_attr))
+  ])
+  return indexes
+
+
+# indexes for the static words (used when there are no media hints)
+_default_indexes = build_indexes()
+
+
 class CustomCompleter(Completer):
+  def __init__(self, hints=None):
+    self.indexes = build_indexes(hints) if hints else _default_indexes
+  
   def get_completions(self, document, complete_event):
     text = document.text_before_cursor.lstrip()
     parts = text.split()
 
     # Case 1: nothing typed yet
     if len(parts) == 0:
-      for w in placeholder_words["options"]:
-        yield Completion(w, start_position=0)
+      for w, meta in self.indexes["options"].lookup(""):
+        yield Completion(w, start_position=0, display_meta=meta)
 
     # Case 2: user is still typing the first word (the option)
     elif len(parts) == 1 and not text.endswith(" "):
-      for w in placeholder_words["options"]:
-        if w.startswith(parts[0].lower()):
-          yield Completion(w, start_position=-len(parts[0]))
+      for w, meta in self.indexes["options"].lookup(parts[0]):
+        yield Completion(w, start_position=-len(parts[0]), display_meta=meta)
 
     elif parts[0].lower().strip() in placeholder_words["options"]:
       option = parts[0].lower().strip()
-      option = "audio" if option == "audio" else "video"
-
   
       # Case 3: user typed an option + space + [starts typeing attributes] → start suggesting attributes
-      if len(parts) >= 2 and not text.endswith(" "):
-        current_attr = parts[-1].lower()
-        for a in placeholder_words[option]:
-          if a.startswith(current_attr):
-            yield Completion(a, start_position=-len(current_attr))
+      if len(parts) >= 2 and not text.endswith(" ") and option in self.indexes:
+        current_attr = parts[-1]
+        for a, meta in self.indexes[option].lookup(current_attr):
+          yield Completion(a, start_position=-len(current_attr), display_meta=meta)
 
   
 # coustom styles
@@ -97,10 +172,10 @@ class OptionsValidator(Validator):
       self.invalidChoiceError(text)
       
 # prompt method
-def prompt_screen():
+def prompt_screen(hints=None):
   return prompt(
     [("class:prompt", "Enter your choice: ")],
-    completer = CustomCompleter(),
+    completer = CustomCompleter(hints),
     validator = OptionsValidator(),
     validate_while_typing = False,
     style = style
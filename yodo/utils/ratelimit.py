@@ -0,0 +1,244 @@
+"""
+Per host request rate limiting (token buckets), shared by every YODO process.
+
+Every request yt-dlp sends to a site with a limit (extraction pages and APIs) first takes a token from the bucket
+of its host. A bucket holds up to `burst` tokens and refills at `rate` tokens per second, so a single download runs
+without any delay while long batches settle at the site's rate. The limits are configured per site (the extractor
+module name, e.g. 'youtube', or the host name), the same keys as the per site job limits of batch mode.
+Hosts without a limit (media CDNs, fragments) are not paced unless a default rate is given.
+
+The bucket state of limited hosts lives in small files locked with flock(), so parallel batch workers and separate
+YODO runs share it. Unlimited hosts keep their (back-off only) state in memory, their requests never touch a file.
+
+HTTP 429 and 403 answers block the host for a while (Retry-After, else exponential back-off), further strikes within
+STRIKE_RESET seconds double the pause.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+DEFAULT_STATE_DIR = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "ratelimit"
+)
+
+# (requests per second, burst) of hosts without an own limit (media CDNs, fragments), None: not paced
+DEFAULT_RATE = None
+
+# built-in limits of sites that throttle or block bursts of requests
+RATE_LIMITS = {
+  "youtube": (2.0, 10),
+  "instagram": (0.5, 4),
+  "tiktok": (0.5, 4),
+  "facebook": (0.5, 4)
+}
+
+# back-off after 429/403: BACKOFF_BASE * 2^(strikes-1) seconds, at most BACKOFF_MAX of the status
+# (403 is often a denied URL rather than throttling, it backs off less)
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = {429: 120.0, 403: 16.0}
+
+# strikes older than this are forgotten
+STRIKE_RESET = 300.0
+
+
+def parse_rate_limits(values):
+  """
+  Parse '--request-rate' values: 'R[/B]' sets the default, 'site=R[/B]' the limit of one site
+  (R requests per second, B burst).
+
+  Returns:
+    tuple: ((rate, burst) or None default, {site: (rate, burst)})
+
+  Raises:
+    ValueError: on malformed values
+  """
+  default = DEFAULT_RATE
+  limits = dict(RATE_LIMITS)
+  for value in values or ():
+    site, sep, spec = value.partition("=")
+    if not sep:
+      site, spec = None, site
+    rate, _, burst = spec.partition("/")
+    try:
+      rate = float(rate)
+      burst = int(burst) if burst else max(1, int(rate * 4))
+    except ValueError:
+      raise ValueError(f"invalid request rate '{value}' (expected R, R/B, site=R or site=R/B)") from None
+    if rate <= 0 or burst < 1:
+      raise ValueError(f"invalid request rate '{value}' (rate > 0, burst >= 1)")
+    if site is None:
+      default = (rate, burst)
+    else:
+      limits[site.strip().lower()] = (rate, burst)
+  return default, limits
+
+
+def _host_of(request):
+  """Host of a str / urllib / yt-dlp request."""
+  url = getattr(request, "url", None)
+  if url is None:
+    url = request.get_full_url() if hasattr(request, "get_full_url") else str(request)
+  try:
+    return urlsplit(url).hostname or ""
+  except ValueError:
+    return ""
+
+
+class RateLimiter:
+  """
+  Token buckets per host, configured per site.
+
+  Args:
+    default (tuple): (rate, burst) of hosts without an own limit, None: only back off
+    limits (dict): {site: (rate, burst)}
+    state_dir (str, optional): directory of the shared bucket state
+  """
+
+  def __init__(self, default=DEFAULT_RATE, limits=None, state_dir=None):
+    self.default = default
+    self.limits = RATE_LIMITS if limits is None else limits
+    self.state_dir = os.path.abspath(os.path.expanduser(state_dir or DEFAULT_STATE_DIR))
+    self._sites = {}
+    self._memory = {}
+    self._state_dir_ready = False
+    self._lock = threading.Lock()
+
+  def limit_of(self, host):
+    """(rate, burst) of a host, looked up by its site key (cached per host), None if the host is not paced."""
+    with self._lock:
+      site = self._sites.get(host)
+    if site is None:
+      from yodo.utils.scheduler import site_key
+      site = site_key(f"https://{host}/")
+      with self._lock:
+        self._sites[host] = site
+    return self.limits.get(site, self.default)
+
+  @contextmanager
+  def _state(self, host, shared=True):
+    """Locked read-modify-write of the bucket state of a host (in memory of this process unless shared)."""
+    if not shared:
+      with self._lock:
+        yield self._memory.setdefault(host, {})
+      return
+    if not self._state_dir_ready:
+      os.makedirs(self.state_dir, exist_ok=True)
+      self._state_dir_ready = True
+    path = os.path.join(self.state_dir, host.replace(os.sep, "_") or "_")
+    with open(path, "a+", encoding="utf-8") as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      try:
+        f.seek(0)
+        try:
+          state = json.loads(f.read() or "{}")
+        except ValueError:
+          state = {}
+        yield state
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(state))
+        f.flush()
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+  def acquire(self, host):
+    """
+    Take a token of the host's bucket, waiting as long as needed.
+
+    Returns:
+      float: seconds waited
+    """
+    if not host:
+      return 0.0
+    limit = self.limit_of(host)
+    waited = 0.0
+    while True:
+      if limit is None:
+        # not paced, only a back-off of this process blocks the host
+        with self._state(host, shared=False) as state:
+          wait = state.get("blocked_until", 0) - time.time()
+        if wait <= 0:
+          return waited
+        time.sleep(wait)
+        waited += wait
+        continue
+      rate, burst = limit
+      with self._state(host) as state:
+        now = time.time()
+        tokens = min(burst, state.get("tokens", burst) + (now - state.get("time", now)) * rate)
+        blocked_until = state.get("blocked_until", 0)
+        state["time"] = now
+        if now >= blocked_until and tokens >= 1:
+          state["tokens"] = tokens - 1
+          return waited
+        state["tokens"] = tokens
+        wait = max(blocked_until - now, (1 - tokens) / rate)
+      time.sleep(wait)
+      waited += wait
+
+  def back_off(self, host, status, retry_after=None):
+    """
+    Block the host after a 429/403 answer.
+
+    Answers to requests sent before the block started (parallel fragments) don't add strikes.
+
+    Returns:
+      float: seconds the host is blocked
+    """
+    if not host:
+      return 0.0
+    limit = self.limit_of(host)
+    with self._state(host, shared=limit is not None) as state:
+      now = time.time()
+      if now < state.get("blocked_until", 0):
+        return state["blocked_until"] - now
+      strikes = state.get("strikes", 0) if now - state.get("last_strike", 0) < STRIKE_RESET else 0
+      strikes += 1
+      max_pause = BACKOFF_MAX[status]
+      pause = min(max_pause, BACKOFF_BASE * 2 ** (strikes - 1))
+      if retry_after:
+        pause = max(pause, min(max_pause, retry_after))
+      state.update({
+        "strikes": strikes,
+        "last_strike": now,
+        "blocked_until": max(state.get("blocked_until", 0), now + pause),
+      })
+      if limit is not None:
+        state.update({"tokens": 0, "time": now})
+    return pause
+
+
+def _retry_after(error):
+  try:
+    value = error.response.headers.get("Retry-After")
+    return float(value) if value else None
+  except (AttributeError, ValueError):
+    return None
+
+
+def _paced_urlopen(limiter, urlopen, ydl, req):
+  """Request hook (see yodo.utils.request_hooks): wait for a token of the host, back off after 429/403."""
+  from yt_dlp.networking.exceptions import HTTPError
+
+  host = _host_of(req)
+  waited = limiter.acquire(host)
+  if waited >= 1:
+    ydl.write_debug(f"[ratelimit] waited {waited:.1f}s for {host}")
+  try:
+    return urlopen(ydl, req)
+  except HTTPError as e:
+    if e.status in BACKOFF_MAX:
+      pause = limiter.back_off(host, e.status, _retry_after(e))
+      ydl.write_debug(f"[ratelimit] HTTP {e.status} from {host}, backing off {pause:.0f}s")
+    raise
+
+
+def install(limiter):
+  """Send every yt-dlp request (all YoutubeDL instances) through the limiter (None: off)."""
+  import functools
+  from yodo.utils.request_hooks import set_hook
+  set_hook("ratelimit", None if limiter is None else functools.partial(_paced_urlopen, limiter))
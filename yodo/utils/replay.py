@@ -0,0 +1,237 @@
+"""
+Record and replay the HTTP exchanges of an extraction (offline, deterministic fixtures).
+
+Every request yt-dlp sends goes through YoutubeDL.urlopen(): extractor pages and APIs, player scripts, manifests
+and YODO's size probes. While a Recorder is installed, each exchange is kept (method, URL, status, headers and the
+body bytes the caller actually read, so probing a media file doesn't fetch the file). A Replayer answers the same
+requests from those exchanges without any network access.
+
+Requests are matched in order of:
+  1. method, URL and a digest of the request body (e.g. one API endpoint queried for several clients)
+  2. method and URL
+  3. method and URL without the query (cache busters, per request tokens)
+Exchanges of the same key are served in the recorded order, the last one repeats once they are used up. A request
+without a recorded exchange fails with a TransportError and is listed in Replayer.misses.
+
+Cookies are neither recorded nor replayed, Set-Cookie headers are dropped from the recording.
+
+A fixture bundle is one gzip compressed JSON file: the URL, the exchanges, the final (sanitized) info dict and any
+extra fields of the caller (see benchmarks/extraction.py).
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+BUNDLE_VERSION = 1
+
+# response headers that don't describe the recorded (already decoded) body
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "set-cookie"}
+
+
+def _method(req):
+  return (req.method or ("POST" if req.data is not None else "GET")).upper()
+
+
+def _data_digest(req):
+  data = req.data
+  if data is None:
+    return None
+  if isinstance(data, str):
+    data = data.encode("utf-8")
+  elif not isinstance(data, (bytes, bytearray)):
+    # file-like or iterable bodies are not read (they can only be read once)
+    return None
+  return hashlib.sha1(data).hexdigest()
+
+
+def _strip_query(url):
+  parts = urlsplit(url)
+  return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def _encode_body(body):
+  try:
+    return {"body": body.decode("utf-8")}
+  except UnicodeDecodeError:
+    return {"body_base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(exchange):
+  if "body_base64" in exchange:
+    return base64.b64decode(exchange["body_base64"])
+  return (exchange.get("body") or "").encode("utf-8")
+
+
+class _Tee(io.RawIOBase):
+  """Reads a response and keeps a copy of every byte read."""
+
+  def __init__(self, response, sink):
+    self.response = response
+    self.sink = sink
+
+  def readable(self):
+    return True
+
+  def read(self, amt=None):
+    data = self.response.read(amt)
+    self.sink += data
+    return data
+
+  @property
+  def closed(self):
+    return self.response.closed
+
+  def close(self):
+    self.response.close()
+
+
+class Recorder:
+  """Transport that sends every request and records the exchange."""
+
+  def __init__(self):
+    self.exchanges = []
+    self._lock = threading.Lock()
+
+  def _add(self, request, **fields):
+    exchange = {**request, **fields}
+    with self._lock:
+      self.exchanges.append(exchange)
+    return exchange
+
+  def urlopen(self, original, ydl, req):
+    from yt_dlp.networking.common import Response
+    from yt_dlp.networking.exceptions import HTTPError, RequestError
+
+    # keyed as the Replayer sees the request (urlopen() rewrites the URL of req)
+    request = {"method": _method(req), "url": req.url, "data_sha1": _data_digest(req)}
+    try:
+      response = original(ydl, req)
+    except HTTPError as e:
+      body = e.response.read()
+      self._add(
+        request, status=e.status, response_url=e.response.url, headers=self._headers(e.response), _body=bytearray(body)
+      )
+      raise HTTPError(Response(io.BytesIO(body), e.response.url, e.response.headers, e.status, e.reason)) from e
+    except RequestError as e:
+      self._add(request, error=e.msg or str(e))
+      raise
+
+    exchange = self._add(
+      request, status=response.status, response_url=response.url, headers=self._headers(response), _body=bytearray()
+    )
+    return Response(
+      _Tee(response, exchange["_body"]), response.url, response.headers, response.status, response.reason,
+      response.extensions
+    )
+
+  @staticmethod
+  def _headers(response):
+    return [[name, value] for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS]
+
+  def recorded(self):
+    """The exchanges in request order, as stored in a bundle."""
+    with self._lock:
+      exchanges = list(self.exchanges)
+    result = []
+    for exchange in exchanges:
+      exchange = dict(exchange)
+      body = exchange.pop("_body", None)
+      if body is not None:
+        exchange.update(_encode_body(bytes(body)))
+      result.append(exchange)
+    return result
+
+
+class Replayer:
+  """Transport that answers every request from recorded exchanges."""
+
+  def __init__(self, exchanges):
+    self._queues = {}
+    for exchange in exchanges:
+      method, url = exchange["method"], exchange["url"]
+      for key in ((method, url, exchange.get("data_sha1")), (method, url), (method, _strip_query(url))):
+        self._queues.setdefault(key, []).append(exchange)
+    self._served = {}
+    self._lock = threading.Lock()
+    self.misses = []
+
+  def _next(self, req):
+    method = _method(req)
+    for key in ((method, req.url, _data_digest(req)), (method, req.url), (method, _strip_query(req.url))):
+      queue = self._queues.get(key)
+      if queue:
+        index = self._served.get(key, 0)
+        self._served[key] = index + 1
+        return queue[min(index, len(queue) - 1)]
+    self.misses.append(f"{method} {req.url}")
+    return None
+
+  def urlopen(self, original, ydl, req):
+    from yt_dlp.networking.common import Response
+    from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+    with self._lock:
+      exchange = self._next(req)
+    if exchange is None:
+      raise TransportError(f"no recorded response for {_method(req)} {req.url}")
+    if "error" in exchange:
+      raise TransportError(exchange["error"])
+    response = Response(io.BytesIO(_decode_body(exchange)), exchange.get("response_url") or req.url, {}, exchange["status"])
+    for name, value in exchange.get("headers") or ():
+      response.headers.add_header(name, value)
+    if response.status >= 400:
+      raise HTTPError(response)
+    return response
+
+
+def install(transport):
+  """Send every yt-dlp request (all YoutubeDL instances) through transport (a Recorder or Replayer, None: off)."""
+  from yodo.utils.request_hooks import set_hook
+  set_hook("replay", None if transport is None else transport.urlopen)
+
+
+def save_bundle(path, url, exchanges, info, **fields):
+  """Write a fixture bundle (see module docstring)."""
+  from yt_dlp import YoutubeDL
+  from yt_dlp.version import __version__ as yt_dlp_version
+
+  bundle = {
+    "version": BUNDLE_VERSION,
+    "url": url,
+    "recorded": int(time.time()),
+    "yt_dlp": yt_dlp_version,
+    **fields,
+    "info": YoutubeDL.sanitize_info(info, remove_private_keys=True),
+    "exchanges": exchanges,
+  }
+  write_bundle(path, bundle)
+
+
+def write_bundle(path, bundle):
+  """Write a bundle as returned by load_bundle() (e.g. with updated expected results)."""
+  os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+  tmp_path = f"{path}.{os.getpid()}.tmp"
+  with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+    json.dump(bundle, f, indent=1, ensure_ascii=False)
+  os.replace(tmp_path, path)
+
+
+def load_bundle(path):
+  """
+  Read a fixture bundle.
+
+  Raises:
+    OSError: if the file can't be read
+    ValueError: if it isn't a bundle of a supported version
+  """
+  with gzip.open(path, "rt", encoding="utf-8") as f:
+    bundle = json.load(f)
+  if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+    raise ValueError(f"not a fixture bundle (version {BUNDLE_VERSION}): {path}")
+  return bundle
@@ -0,0 +1,60 @@
+"""
+One wrapper around YoutubeDL.urlopen() for the request hooks of YODO.
+
+Recording/replaying (replay), request pacing (ratelimit) and the bandwidth cap (bandwidth) all act on every request
+yt-dlp sends. Instead of one monkey patch per module, stacked in whatever order the modules were installed,
+YoutubeDL.urlopen is wrapped once and the registered hooks run in HOOK_ORDER, outermost first: a replayed request
+never reaches the pacing or the cap, a recorded one is recorded as the caller read it.
+
+A hook is called as hook(call, ydl, req) and returns the response, call(ydl, req) runs the next hook
+(the last one runs yt-dlp's own urlopen).
+"""
+import functools
+import threading
+
+# hooks, outermost first
+HOOK_ORDER = ("replay", "ratelimit", "bandwidth")
+
+_hooks = {}
+_original = None
+_chain = None
+_lock = threading.Lock()
+
+
+def set_hook(name, hook):
+  """Register the hook of a module, replacing its previous one (None removes it)."""
+  global _chain
+  if name not in HOOK_ORDER:
+    raise ValueError(f"unknown request hook '{name}'")
+
+  with _lock:
+    if hook is None:
+      _hooks.pop(name, None)
+    else:
+      _hooks[name] = hook
+    if _original is None:
+      _install()
+    call = _original
+    for hook_name in reversed(HOOK_ORDER):
+      if hook_name in _hooks:
+        call = functools.partial(_hooks[hook_name], call)
+    _chain = call
+
+
+def _install():
+  """Wrap YoutubeDL.urlopen (all YoutubeDL instances), once per process."""
+  global _original
+  from yt_dlp import YoutubeDL
+  from yt_dlp.networking.common import Request
+
+  _original = YoutubeDL.urlopen
+
+  def urlopen(self, req):
+    chain = _chain
+    if chain is _original:
+      return _original(self, req)
+    if isinstance(req, str):
+      req = Request(req)
+    return chain(self, req)
+
+  YoutubeDL.urlopen = urlopen
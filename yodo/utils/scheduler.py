@@ -0,0 +1,268 @@
+"""
+Concurrent download scheduler for batch mode.
+
+Every job runs in its own worker process (forked), so the per download state of yodo.main stays private to
+the job and yt-dlp work doesn't share one GIL. The scheduler starts jobs in queue order while there is a free
+global slot and the job's site is below its own limit (sites tolerate very different request rates), so a
+long run of one site never blocks the other sites queued behind it.
+
+Workers forward the events of their downloads (see yodo.utils.events) and their result over a queue. The scheduler
+publishes the events on its own bus ('--events' sees every job) and draws one shared progress view from them
+(redrawn in place on a terminal, plain log lines otherwise).
+"""
+import multiprocessing
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+from yodo.utils.colors import *
+
+# default number of parallel jobs
+DEFAULT_JOBS = 1
+
+# parallel jobs per site if the site has no own limit
+DEFAULT_PER_SITE = 2
+
+# built-in limits of sites that throttle or block parallel downloads
+SITE_LIMITS = {
+  "youtube": 3,
+  "instagram": 1,
+  "tiktok": 1,
+  "facebook": 1
+}
+
+
+def site_key(url):
+  """
+  Return the key the per site limit is counted under.
+
+  The extractor module matching the URL is used if known (youtu.be and youtube.com share 'youtube'),
+  otherwise the host name.
+  """
+  from yodo.utils.extractor_index import resolve_extractor_modules, _normalize_host
+
+  modules = resolve_extractor_modules(url)
+  if modules:
+    return modules[0].rsplit(".", 1)[-1]
+  try:
+    return _normalize_host(urlsplit(url).netloc) or "unknown"
+  except ValueError:
+    return "unknown"
+
+
+def parse_site_limits(values):
+  """
+  Parse '--per-site' values: 'N' sets the default limit, 'site=N' the limit of one site.
+
+  Returns:
+    tuple: (default limit, {site: limit})
+
+  Raises:
+    ValueError: on malformed values
+  """
+  default = DEFAULT_PER_SITE
+  limits = dict(SITE_LIMITS)
+  for value in values or ():
+    site, sep, number = value.partition("=")
+    if not sep:
+      site, number = None, site
+    if not number.strip().isdigit() or int(number) < 1:
+      raise ValueError(f"invalid per site limit '{value}' (expected N or site=N, N >= 1)")
+    if site is None:
+      default = int(number)
+    else:
+      limits[site.strip().lower()] = int(number)
+  return default, limits
+
+
+def forward_events(index, events):
+  """Forward the events of this (worker) process to the scheduler, as ('event', index, event)."""
+  from yodo.utils.events import bus
+
+  def forward(event):
+    events.put(("event", index, event))
+
+  bus.clear()
+  return bus.subscribe(forward)
+
+
+def _human_size(num):
+  for unit in ("B", "KiB", "MiB", "GiB"):
+    if num < 1024 or unit == "GiB":
+      return f"{num:.1f}{unit}" if unit != "B" else f"{num:.0f}B"
+    num /= 1024
+
+
+class ProgressView:
+  """
+  Shared progress view of all running jobs.
+
+  On a terminal the view is redrawn in place (one line per running job plus a status line),
+  otherwise only job start/finish lines are printed.
+  """
+
+  def __init__(self, total, stream=None):
+    self.total = total
+    self.stream = stream or sys.stdout
+    self.live = self.stream.isatty()
+    self._drawn = 0
+
+  def _write(self, text):
+    self.stream.write(text)
+    self.stream.flush()
+
+  def _clear(self):
+    if self._drawn:
+      self._write("\x1b[1A\x1b[2K" * self._drawn + "\r")
+      self._drawn = 0
+
+  def log(self, line):
+    """Print a permanent line above the live view."""
+    self._clear()
+    self._write(f"{line}\n")
+
+  def draw(self, running, queued, done, failed):
+    if not self.live:
+      return
+    from shutil import get_terminal_size
+    width = get_terminal_size().columns
+
+    lines = []
+    for job in running:
+      progress = job.progress or {}
+      total = progress.get("total") or 0
+      downloaded = progress.get("downloaded") or 0
+      percent = f"{downloaded * 100 / total:5.1f}%" if total else "  ...  "
+      speed = f"{_human_size(progress.get('speed') or 0)}/s" if progress.get("speed") else ""
+      if job.postprocessor:
+        percent, speed = "   pp  ", job.postprocessor
+      name = progress.get("filename") or job.url
+      prefix = f"[{job.index + 1}/{self.total}] {job.site:<10} {percent} {speed:>11} "
+      lines.append(f"{prefix}{name}"[:max(width - 1, 10)])
+    lines.append(
+      f"{CLR_BRIGHT_BLUE}running: {len(running)}  queued: {queued}  "
+      f"{CLR_BRIGHT_GREEN}done: {done}  {CLR_ERROR if failed else ''}failed: {failed}{CLR_RESET}"
+    )
+
+    self._clear()
+    self._write("\n".join(lines) + "\n")
+    self._drawn = len(lines)
+
+  def close(self):
+    self._clear()
+
+
+class Job:
+  def __init__(self, index, url):
+    self.index = index
+    self.url = url
+    self.site = site_key(url)
+    self.process = None
+    self.progress = None # last 'progress' event
+    self.postprocessor = None # running postprocessor
+    self.result = None # (ok, detail)
+
+
+class JobScheduler:
+  """
+  Run worker(index, url, events) for every URL in worker processes, at most `jobs` at once
+  and at most the site limit per site.
+
+  The worker must put ('done', index, ok, detail) on the events queue when it finishes,
+  it may forward the events of its downloads (see forward_events()) before that.
+  """
+
+  def __init__(self, worker, jobs=DEFAULT_JOBS, default_per_site=DEFAULT_PER_SITE, site_limits=None):
+    self.worker = worker
+    self.jobs = max(1, jobs)
+    self.default_per_site = default_per_site
+    self.site_limits = SITE_LIMITS if site_limits is None else site_limits
+
+  def site_limit(self, site):
+    return self.site_limits.get(site, self.default_per_site)
+
+  def run(self, urls):
+    """
+    Run all jobs and wait for them.
+
+    Returns:
+      list: (url, ok, detail) for every URL, in input order
+    """
+    from yodo.utils.events import bus
+
+    ctx = multiprocessing.get_context("fork")
+    events = ctx.Queue()
+    pending = [Job(i, url) for i, url in enumerate(urls)]
+    jobs = list(pending)
+    running = {}
+    per_site = {}
+    view = ProgressView(len(jobs))
+    done = failed = 0
+
+    def finish(job, ok, detail):
+      nonlocal done, failed
+      job.result = (ok, detail)
+      running.pop(job.index, None)
+      per_site[job.site] -= 1
+      if ok:
+        done += 1
+        view.log(f"{CLR_BRIGHT_GREEN}✓ {CLR_RESET}[{job.index + 1}/{len(jobs)}] {job.url}")
+      else:
+        failed += 1
+        view.log(f"{CLR_ERROR}✗ {CLR_RESET}[{job.index + 1}/{len(jobs)}] {job.url} {CLR_DIM}({detail}){CLR_RESET}")
+
+    try:
+      while pending or running:
+        # start every queued job that fits (queue order, skipping sites at their limit)
+        for job in list(pending):
+          if len(running) >= self.jobs:
+            break
+          if per_site.get(job.site, 0) >= self.site_limit(job.site):
+            continue
+          pending.remove(job)
+          per_site[job.site] = per_site.get(job.site, 0) + 1
+          job.process = ctx.Process(target=self.worker, args=(job.index, job.url, events), daemon=True)
+          job.process.start()
+          running[job.index] = job
+          view.log(f"{CLR_BRIGHT_BLUE}→ {CLR_RESET}[{job.index + 1}/{len(jobs)}] {job.url} {CLR_DIM}({job.site}){CLR_RESET}")
+
+        # collect events
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+          try:
+            event = events.get(timeout=max(0.0, deadline - time.monotonic()))
+          except Exception:
+            break
+          kind, index = event[0], event[1]
+          job = running.get(index)
+          if job is None:
+            continue
+          if kind == "event":
+            event = event[2]
+            bus.publish(event)
+            if event["type"] == "progress":
+              job.progress = event
+            elif event["type"] == "postprocess":
+              job.postprocessor = event["postprocessor"] if event["status"] != "finished" else None
+          elif kind == "done":
+            job.process.join()
+            finish(job, event[2], event[3])
+
+        # workers that died without reporting (killed, crashed)
+        for job in list(running.values()):
+          if not job.process.is_alive() and events.empty():
+            job.process.join()
+            finish(job, False, f"worker exited with code {job.process.exitcode}")
+
+        view.draw(list(running.values()), len(pending), done, failed)
+    except KeyboardInterrupt:
+      for job in running.values():
+        job.process.terminate()
+      for job in running.values():
+        job.process.join()
+      view.close()
+      raise
+    view.close()
+
+    return [(job.url, *(job.result or (False, "not started"))) for job in jobs]
@@ -0,0 +1,150 @@
+"""
+Parallel size probing for formats without 'filesize' and 'filesize_approx'.
+
+Many extractors (Instagram, TikTok, generic pages) don't report sizes, so YODO could only show "Unknown".
+For the formats chosen by the options, the media URL is asked for its size with a HEAD request
+(falling back to a 'Range: bytes=0-0' GET when HEAD is refused or has no Content-Length).
+Requests run on a small thread pool under one overall deadline, formats that don't answer in time stay unknown.
+
+Learned sizes are written back into the format dicts of the info dict ('filesize').
+Only progressive http(s) formats are probed, manifest based formats (HLS/DASH) have no single size.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Thread
+
+# overall time budget for probing (seconds)
+PROBE_DEADLINE = 2.5
+
+# parallel requests
+MAX_WORKERS = 4
+
+# options of the caller's YoutubeDL that shape its requests, copied to the probe's own instance
+REQUEST_PARAMS = (
+  "http_headers", "proxy", "impersonate", "source_address", "socket_timeout", "nocheckcertificate",
+  "legacyserverconnect", "client_certificate", "client_certificate_key", "client_certificate_password", "compat_opts",
+)
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+
+def _has_size(f):
+  return bool(f.get("filesize") or f.get("filesize_approx"))
+
+
+def formats_to_probe(format_index, selectors):
+  """
+  Return the (unique) formats chosen by any of the selectors that have no size information.
+
+  Args:
+    format_index (FormatIndex): index of the fetched media
+    selectors (iterable): yt-dlp format selector strings (e.g. the values of OPTIONS)
+  """
+  found = {}
+  for selector in selectors:
+    try:
+      chosen = format_index.select(selector)
+    except Exception:
+      continue
+    for f in chosen:
+      for part in f.get("requested_formats") or [f]:
+        if (
+          not _has_size(part)
+          and part.get("url")
+          and part.get("protocol", "https") in ("http", "https")
+        ):
+          found.setdefault(id(part), part)
+  return list(found.values())
+
+
+def _probe_one(ydl, f, timeout):
+  """Return the size of the format URL in bytes, or None."""
+  from yt_dlp.networking import Request
+  from yt_dlp.networking.exceptions import HTTPError, RequestError
+
+  headers = dict(f.get("http_headers") or {})
+  extensions = {"timeout": timeout}
+
+  # HEAD first, it doesn't transfer any body
+  try:
+    with ydl.urlopen(Request(f["url"], headers=headers, method="HEAD", extensions=extensions)) as response:
+      length = response.headers.get("Content-Length")
+      if length and length.isdigit() and int(length) > 0:
+        return int(length)
+  except HTTPError:
+    pass # some CDNs refuse HEAD (403/405), try a range request
+  except RequestError:
+    return None
+
+  # 1 byte range request, the total size is in Content-Range
+  try:
+    headers["Range"] = "bytes=0-0"
+    with ydl.urlopen(Request(f["url"], headers=headers, extensions=extensions)) as response:
+      match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range") or "")
+      if match:
+        return int(match.group(1))
+  except RequestError:
+    pass
+  return None
+
+
+def _close_when_idle(executor, ydl):
+  """Close the YoutubeDL once the late probes of the pool are finished."""
+  executor.shutdown(wait=True)
+  ydl.close()
+
+
+def probe_sizes(formats, ydl=None, deadline=PROBE_DEADLINE, max_workers=MAX_WORKERS):
+  """
+  Probe the sizes of the formats in parallel and write them back as 'filesize'.
+
+  Args:
+    formats (list): format dicts to probe (see formats_to_probe())
+    ydl (YoutubeDL, optional): its request options (proxy, impersonation, headers) and cookies are used. The probes
+      run on an instance of their own, late probes may still use it after the caller closed ydl
+    deadline (float): overall time budget in seconds
+    max_workers (int): max parallel requests
+
+  Returns:
+    dict: {format_id: size} of the formats whose size was learned
+  """
+  if not formats:
+    return {}
+
+  from yt_dlp import YoutubeDL
+  params = {"quiet": True, "no_warnings": True}
+  if ydl is not None:
+    params.update((key, ydl.params[key]) for key in REQUEST_PARAMS if key in ydl.params)
+  # no extractors needed (auto_init registers all of them)
+  own_ydl = YoutubeDL(params, auto_init=False)
+  if ydl is not None:
+    # same cookies, saved (if at all) by the caller
+    own_ydl.cookiejar = ydl.cookiejar
+
+  end = time.monotonic() + deadline
+  executor = ThreadPoolExecutor(max_workers=min(max_workers, len(formats)), thread_name_prefix="size-probe")
+  futures, done = {}, set()
+  try:
+    futures = {executor.submit(_probe_one, own_ydl, f, deadline): f for f in formats}
+    done, _ = wait(futures, timeout=max(0, end - time.monotonic()))
+  finally:
+    # don't wait for late answers, they are ignored
+    executor.shutdown(wait=False, cancel_futures=True)
+    if all(future.done() for future in futures):
+      own_ydl.close()
+    else:
+      # probes past the deadline still use it
+      Thread(target=_close_when_idle, args=(executor, own_ydl), name="size-probe-close", daemon=True).start()
+
+  probed = {}
+  for future in done:
+    f = futures[future]
+    try:
+      size = future.result()
+    except Exception:
+      continue
+    if size:
+      f["filesize"] = size
+      probed[f.get("format_id")] = size
+  return probed
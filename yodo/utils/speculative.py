@@ -0,0 +1,233 @@
+"""
+Speculative download of the most likely stream while the choice prompt is open.
+
+After the media information is fetched, the user usually needs a few seconds to pick an option.
+In speculative mode YODO guesses the choice (configured default or the most frequent recent choice) and starts
+fetching its audio stream (the 'bestaudio' format that high, medium and audio usually share) into a staging
+directory. When the user confirms, a staged stream that is part of the final selection is moved into place,
+so yt-dlp resumes it (or skips it when complete) instead of downloading it again. Anything else is cancelled and
+removed.
+
+Only progressive http(s) formats are staged, fragmented streams (DASH/HLS) are never speculated.
+"""
+import atexit
+import copy
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from threading import Event, Thread
+
+CHOICES = ("low", "medium", "high", "audio")
+
+# fallback when there is no history
+DEFAULT_CHOICE = "high"
+
+_CACHE_BASE = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo")
+HISTORY_FILE = os.path.join(_CACHE_BASE, "choice_history.json")
+STAGING_BASE = os.path.join(_CACHE_BASE, "staging")
+
+# number of recent choices considered for the prediction
+HISTORY_SIZE = 20
+
+# seconds to wait for the background download to stop (it stops at its next progress update)
+STOP_TIMEOUT = 5
+
+
+class SpeculationCancelled(Exception):
+  """Raised from the progress hook to stop the speculative download."""
+
+
+def load_history():
+  try:
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+      history = json.load(f)
+    return [c for c in history if c in CHOICES]
+  except (OSError, ValueError, TypeError):
+    return []
+
+
+def record_choice(choice):
+  """Append the confirmed choice to the history (best effort)."""
+  if choice not in CHOICES:
+    return
+  history = (load_history() + [choice])[-HISTORY_SIZE:]
+  try:
+    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
+      json.dump(history, f)
+  except OSError:
+    pass
+
+
+def predict_choice(default=None):
+  """Return the configured default, or the most frequent recent choice (latest wins ties)."""
+  if default in CHOICES:
+    return default
+  history = load_history()
+  if not history:
+    return DEFAULT_CHOICE
+  counts = Counter(history)
+  return max(reversed(history), key=lambda c: counts[c])
+
+
+def _selected_parts(ydl, selector_str, info):
+  """Return ([format dicts], merged) that the selector picks for the info dict."""
+  chosen = list(ydl.build_format_selector(selector_str)(info))
+  if not chosen:
+    return [], False
+  first = chosen[0]
+  if first.get("requested_formats"):
+    return list(first["requested_formats"]), True
+  return [first], False
+
+
+class SpeculativeDownload:
+  """
+  A background download of one format into a private staging directory.
+
+  Use start() to begin, adopt() once the user confirmed a choice and cleanup() when done.
+  """
+
+  def __init__(self, info, format_info):
+    self.info = info
+    self.format = format_info
+    self.format_id = format_info["format_id"]
+    self.ext = format_info.get("ext") or "unknown_video"
+    self.staging_dir = None
+    self.finished = False
+    self._cancel = Event()
+    self._thread = None
+    self._abandoned = False
+
+  @property
+  def staged_path(self):
+    return os.path.join(self.staging_dir, f"{self.format_id}.{self.ext}")
+
+  def start(self):
+    os.makedirs(STAGING_BASE, exist_ok=True)
+    self.staging_dir = tempfile.mkdtemp(prefix="speculative-", dir=STAGING_BASE)
+    atexit.register(self.cleanup)
+    self._thread = Thread(target=self._run, daemon=True)
+    self._thread.start()
+    return self
+
+  def _progress_hook(self, status):
+    if self._cancel.is_set():
+      raise SpeculationCancelled()
+
+  def _run(self):
+    from yt_dlp import YoutubeDL
+
+    opts = {
+      "format": self.format_id,
+      "outtmpl": os.path.join(self.staging_dir, "%(format_id)s.%(ext)s"),
+      "quiet": True,
+      "no_warnings": True,
+      "noprogress": True,
+      "noplaylist": True,
+      "continuedl": True,
+      "update_time": False,
+      "progress_hooks": [self._progress_hook],
+    }
+    try:
+      with YoutubeDL(opts) as ydl:
+        # copy, yt-dlp modifies the info dict in place
+        ydl.process_ie_result(copy.deepcopy(self.info), download=True)
+      self.finished = os.path.exists(self.staged_path)
+    except BaseException:
+      # cancelled or failed, whatever was written stays as '.part' for adopt()
+      self.finished = False
+
+  def stop(self):
+    """
+    Stop the background download and wait (at most STOP_TIMEOUT seconds) for it to release its files.
+
+    Returns:
+      bool: False if it is still running (e.g. a stalled connection), its files must not be used
+    """
+    self._cancel.set()
+    if self._thread and self._thread.is_alive() and not self._abandoned:
+      self._thread.join(timeout=STOP_TIMEOUT)
+      # waited once, later calls don't wait again
+      self._abandoned = self._thread.is_alive()
+    return not (self._thread and self._thread.is_alive())
+
+  def adopt(self, ydl, info, selector_str):
+    """
+    Move the staged stream to the path the final download (ydl) will use for it.
+
+    Returns:
+      bool: True if the staged bytes were reused
+    """
+    stopped = self.stop()
+    from yt_dlp.utils import prepend_extension
+
+    try:
+      # still writing, the staged file is discarded by cleanup() below
+      if not stopped:
+        return False
+
+      parts, merged = _selected_parts(ydl, selector_str, info)
+      match = next((f for f in parts if f.get("format_id") == self.format_id), None)
+      if match is None:
+        return False
+
+      # same naming yt-dlp uses in process_info()
+      target = ydl.prepare_filename(dict(info, **match), "temp")
+      if merged:
+        target = prepend_extension(target, f"f{self.format_id}", match.get("ext"))
+
+      source = self.staged_path if self.finished else f"{self.staged_path}.part"
+      if not os.path.exists(source):
+        return False
+      if not self.finished:
+        target = f"{target}.part"
+      # never replace an existing file
+      if os.path.exists(target):
+        return False
+
+      os.makedirs(os.path.dirname(target), exist_ok=True)
+      shutil.move(source, target)
+      return True
+    except Exception:
+      return False
+    finally:
+      self.cleanup()
+
+  def cleanup(self):
+    """Cancel and remove everything in the staging directory (a download that doesn't stop is abandoned)."""
+    self.stop()
+    if self.staging_dir:
+      shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def start_speculative_download(info, options, default_choice=None):
+  """
+  Guess the user's choice and start staging its audio stream.
+
+  Args:
+    info (dict): extracted media info dict, without an earlier format selection (main.unselect_formats())
+    options (dict): yt-dlp format selectors for each choice (low, medium, high, audio)
+    default_choice (str): configured choice, or None/'auto' to use the history
+
+  Returns:
+    SpeculativeDownload or None: None if nothing suitable could be staged
+  """
+  from yt_dlp import YoutubeDL
+
+  choice = predict_choice(default_choice)
+  try:
+    with YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+      parts, _ = _selected_parts(ydl, options[choice], info)
+  except Exception:
+    return None
+
+  # prefer the audio stream, it's smaller and shared by most choices
+  audio_only = [f for f in parts if f.get("vcodec") == "none"]
+  candidates = audio_only or parts[:1]
+  if not candidates or candidates[0].get("protocol") not in ("http", "https"):
+    return None
+
+  return SpeculativeDownload(info, candidates[0]).start()
@@ -0,0 +1,243 @@
+"""
+Staging directory for downloads on slow storage.
+
+On Android the download directory (/storage/emulated/0/YODO) sits behind a FUSE layer, every fragment write,
+'.part' rename, merge and postprocessor rewrite on it is slow. With a staging directory on fast internal storage
+(Termux' app-private home, a tmpfs) yt-dlp downloads and postprocesses there ('paths': temp) and the finished
+files are moved to the download directory once, by yt-dlp's MoveFiles step.
+
+Moves across file systems use copy_file_range (sendfile, plain read/write as fallbacks) into a temporary file
+next to the destination, fsync it and rename it over the destination: a crash never leaves a half written file
+under the final name. Within one file system a move is a rename.
+
+Every download stages in its own directory (named after its journal job), so an interrupted download is
+continued by 'yodo --resume' and a failed one is removed without touching the others.
+"""
+import errno
+import os
+import shutil
+import threading
+
+DEFAULT_STAGING_DIR = os.path.join(
+  os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "yodo", "staging"
+)
+
+# --staging-dir values that turn staging off
+OFF_VALUES = ("off", "none", "no", "false", "0")
+
+# below this much free space in the staging directory downloads go to the download directory directly
+MIN_FREE_BYTES = 1024 * 1024 * 1024
+
+# bytes per copy_file_range/sendfile call
+CHUNK_SIZE = 64 * 1024 * 1024
+
+_installed = False
+# staging directories of the downloads running in this process
+_claimed = set()
+_claimed_lock = threading.Lock()
+
+
+def is_termux():
+  return os.getenv("PREFIX") is not None or os.path.exists("/data/data/com.termux/files/usr")
+
+
+def resolve_staging_dir(value, download_dir):
+  """
+  Resolve the staging directory for a download directory.
+
+  Args:
+    value (str): '--staging-dir' / STAGING_DIR value, None for the default
+    download_dir (str): resolved download directory
+
+  Returns:
+    str or None: absolute staging directory, None if downloads go to the download directory directly
+  """
+  if value is not None and value.strip().lower() in OFF_VALUES:
+    return None
+  if value:
+    staging_dir = os.path.abspath(os.path.expanduser(value))
+  elif is_termux() and os.path.abspath(download_dir).startswith(("/storage/", "/sdcard/")):
+    # default: only where the download directory is shared (FUSE) storage
+    staging_dir = DEFAULT_STAGING_DIR
+  else:
+    return None
+
+  try:
+    os.makedirs(staging_dir, exist_ok=True)
+    if shutil.disk_usage(staging_dir).free < MIN_FREE_BYTES:
+      return None
+  except OSError:
+    return None
+  return staging_dir
+
+
+def claim(path):
+  """
+  Reserve the staging directory of one download (e.g. os.path.join(staging_dir, job_id)).
+
+  The same URL queued twice in one batch gets a second directory, released ones are reused.
+
+  Returns:
+    str: the reserved directory
+  """
+  with _claimed_lock:
+    candidate, n = path, 1
+    while candidate in _claimed:
+      n += 1
+      candidate = f"{path}-{n}"
+    _claimed.add(candidate)
+  return candidate
+
+
+def _copy_data(src_fd, dst_fd, size):
+  """Copy size bytes in the kernel if possible (copy_file_range, then sendfile), else through a buffer."""
+  offset = 0
+  if hasattr(os, "copy_file_range"):
+    try:
+      while offset < size:
+        copied = os.copy_file_range(src_fd, dst_fd, min(CHUNK_SIZE, size - offset))
+        if copied == 0:
+          break
+        offset += copied
+      return
+    except OSError as e:
+      # EXDEV (kernels that only copy within one file system), ENOSYS, EINVAL/EOPNOTSUPP (FUSE)
+      if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+        raise
+  if hasattr(os, "sendfile"):
+    try:
+      while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, min(CHUNK_SIZE, size - offset))
+        if sent == 0:
+          break
+        offset += sent
+      return
+    except OSError as e:
+      if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        raise
+  os.lseek(src_fd, offset, os.SEEK_SET)
+  os.lseek(dst_fd, offset, os.SEEK_SET)
+  while True:
+    chunk = os.read(src_fd, 1024 * 1024)
+    if not chunk:
+      break
+    os.write(dst_fd, chunk)
+
+
+def _fsync_dir(path):
+  try:
+    fd = os.open(path, os.O_RDONLY)
+  except OSError:
+    return
+  try:
+    os.fsync(fd)
+  except OSError:
+    pass # not supported by every file system (FUSE)
+  finally:
+    os.close(fd)
+
+
+def move_file(src, dst):
+  """
+  Move a file: rename within one file system, else copy, fsync and atomically rename into place.
+
+  Returns:
+    str: dst
+  """
+  try:
+    os.replace(src, dst)
+    return dst
+  except OSError as e:
+    if e.errno != errno.EXDEV:
+      raise
+
+  tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{os.getpid()}.yodo-move")
+  try:
+    with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+      _copy_data(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size)
+      fdst.flush()
+      os.fsync(fdst.fileno())
+    try:
+      shutil.copystat(src, tmp)
+    except OSError:
+      pass # shared storage on Android doesn't allow chmod/utime
+    os.replace(tmp, dst)
+  except BaseException:
+    try:
+      os.remove(tmp)
+    except OSError:
+      pass
+    raise
+  _fsync_dir(os.path.dirname(dst))
+  os.remove(src)
+  return dst
+
+
+class _Shutil:
+  """shutil of yt-dlp's MoveFiles postprocessor, with move_file() as move."""
+
+  def __getattr__(self, name):
+    return getattr(shutil, name)
+
+  @staticmethod
+  def move(src, dst):
+    if os.path.isdir(src):
+      return shutil.move(src, dst)
+    return move_file(src, dst)
+
+
+def keep_staged_pp(ydl):
+  """
+  Postprocessor that keeps a download in its staging directory: yt-dlp's MoveFiles step (which runs after every
+  download) finds nothing to move. For downloads postprocessed later (batch pipeline).
+  """
+  from yt_dlp.postprocessor.common import PostProcessor
+
+  class KeepStagedPP(PostProcessor):
+    def run(self, info):
+      info["__finaldir"] = os.path.dirname(os.path.abspath(info["filepath"]))
+      info["__files_to_move"] = dict.fromkeys(info.get("__files_to_move") or {})
+      return [], info
+
+  return KeepStagedPP(ydl)
+
+
+def install():
+  """Make yt-dlp's MoveFiles step use move_file() (once per process)."""
+  global _installed
+  if _installed:
+    return
+  from yt_dlp.postprocessor import movefilesafterdownload
+
+  movefilesafterdownload.shutil = _Shutil()
+  _installed = True
+
+
+def release(path, download_dir, keep=True):
+  """
+  Empty and remove the staging directory of a download.
+
+  Args:
+    path (str): staging directory of the download (claim())
+    download_dir (str): where remaining finished files go (a download whose postprocessing failed)
+    keep (bool): False if the download failed, its files are deleted
+
+  Returns:
+    dict: moved files, {staged path: final path}
+  """
+  moved = {}
+  with _claimed_lock:
+    _claimed.discard(path)
+  if not os.path.isdir(path):
+    return moved
+  if keep:
+    for name in os.listdir(path):
+      src = os.path.join(path, name)
+      # partial data of yt-dlp ('.part', fragments, '.ytdl'), temp files of ffmpeg
+      if not os.path.isfile(src) or ".part" in name or name.endswith((".ytdl", ".yodo-move")) or ".temp." in name:
+        continue
+      dst = os.path.join(download_dir, name)
+      if not os.path.exists(dst):
+        moved[src] = move_file(src, dst)
+  shutil.rmtree(path, ignore_errors=True)
+  return moved
@@ -0,0 +1,340 @@
+"""
+In place tagging of audio downloads with mutagen.
+
+yt-dlp writes the tags of an audio file with FFmpegMetadata and the cover with EmbedThumbnail (ffmpeg for mp3),
+both start ffmpeg and copy the whole file. TagPP writes tags, chapters and the cover in place with mutagen,
+in one save:
+  mp3           ID3v2.3 frames (+ ID3v1), APIC cover, CHAP/CTOC chapters
+  m4a/mp4       MP4 atoms, 'covr' cover
+  opus/ogg      Vorbis comments, METADATA_BLOCK_PICTURE cover, CHAPTERxxx chapters
+  flac          Vorbis comments, FLAC picture block, CHAPTERxxx chapters
+
+ffmpeg is only used where mutagen can't do the job: m4a chapters (no mutagen support) and containers without a
+mutagen tag format (wav, ac3, ...), these go through yt-dlp's own postprocessors. Without mutagen plan() returns
+the ffmpeg chain.
+
+The tag values are the ones FFmpegMetadata would write (including --parse-metadata 'meta_' fields).
+"""
+import base64
+import os
+
+# key of TagPP in yt-dlp's postprocessor registry ('postprocessors' option)
+KEY = "YodoTags"
+
+ID3_EXTS = ("mp3",)
+MP4_EXTS = ("m4a", "mp4", "m4b")
+VORBIS_EXTS = ("opus", "ogg", "oga", "flac")
+
+# FFmpegMetadata names → ID3 frames (the others become TXXX frames)
+ID3_FRAMES = {
+  "title": "TIT2",
+  "artist": "TPE1",
+  "album": "TALB",
+  "album_artist": "TPE2",
+  "composer": "TCOM",
+  "genre": "TCON",
+  "date": "TDRC",
+  "track": "TRCK",
+  "disc": "TPOS",
+}
+
+# FFmpegMetadata names → MP4 atoms (the others become iTunes freeform atoms)
+MP4_ATOMS = {
+  "title": "\xa9nam",
+  "artist": "\xa9ART",
+  "album": "\xa9alb",
+  "album_artist": "aART",
+  "composer": "\xa9wrt",
+  "genre": "\xa9gen",
+  "date": "\xa9day",
+  "comment": "\xa9cmt",
+  "description": "desc",
+  "synopsis": "ldes",
+  "show": "tvsh",
+  "episode_id": "tven",
+}
+
+# Vorbis comment names that differ from the FFmpegMetadata names (the others are upper-cased)
+VORBIS_NAMES = {
+  "album_artist": "ALBUMARTIST",
+  "track": "TRACKNUMBER",
+  "disc": "DISCNUMBER",
+}
+
+_registered = False
+
+
+def available():
+  """True if mutagen can be imported."""
+  try:
+    import mutagen # noqa: F401
+  except ImportError:
+    return False
+  return True
+
+
+def plan(attributes):
+  """
+  Plan the tagging of an audio download (after FFmpegExtractAudio).
+
+  Args:
+    attributes (dict): audio options of the choice (options_attributes['audio']: format, thumbnail, metadata)
+
+  Returns:
+    list: yt-dlp postprocessors
+  """
+  postprocessors = []
+  cover = attributes["thumbnail"]["enabled"]
+  if cover:
+    # image only, the audio file isn't touched
+    postprocessors.append({"key": "FFmpegThumbnailsConvertor", "format": attributes["thumbnail"]["ext"]})
+  if not cover and not attributes["metadata"]:
+    return postprocessors
+
+  if not available():
+    # metadata first, EmbedThumbnail keeps the tags
+    if attributes["metadata"]:
+      postprocessors.append({"key": "FFmpegMetadata"})
+    if cover:
+      postprocessors.append({"key": "EmbedThumbnail"})
+    return postprocessors
+
+  register()
+  postprocessors.append({"key": KEY, "metadata": attributes["metadata"], "cover": cover})
+  return postprocessors
+
+
+def register():
+  """Make TagPP available to the 'postprocessors' option of every YoutubeDL instance."""
+  global _registered
+  if _registered:
+    return
+  from yt_dlp.globals import postprocessors
+
+  postprocessors.value[f"{KEY}PP"] = _tag_pp()
+  _registered = True
+
+
+def _iso_date(value):
+  """'20240131' → '2024-01-31' (ffmpeg writes the upload date as is)."""
+  if len(value) == 8 and value.isdigit():
+    return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+  return value
+
+
+def _number_pair(value):
+  """'3' or '3/12' → (3, 12), for MP4 'trkn'/'disk'; None if it isn't a number."""
+  number, _, total = str(value).partition("/")
+  try:
+    return int(number), int(total or 0)
+  except ValueError:
+    return None
+
+
+def _write_id3(path, tags, chapters, cover):
+  from mutagen.id3 import APIC, CHAP, COMM, CTOC, CTOCFlags, ID3, ID3NoHeaderError, TIT2, TXXX, Frames
+
+  try:
+    id3 = ID3(path)
+  except ID3NoHeaderError:
+    id3 = ID3()
+  for name, value in tags.items():
+    if name == "comment":
+      id3.setall("COMM", [COMM(encoding=3, lang="eng", desc="", text=value)])
+    elif name in ID3_FRAMES:
+      frame = ID3_FRAMES[name]
+      id3.setall(frame, [Frames[frame](encoding=3, text=value)])
+    else:
+      id3.setall(f"TXXX:{name}", [TXXX(encoding=3, desc=name, text=value)])
+
+  if chapters:
+    id3.delall("CHAP")
+    id3.delall("CTOC")
+    ids = [f"chp{i}" for i in range(len(chapters))]
+    id3.add(CTOC(element_id="toc", flags=CTOCFlags.TOP_LEVEL | CTOCFlags.ORDERED, child_element_ids=ids, sub_frames=[]))
+    for element_id, chapter in zip(ids, chapters):
+      id3.add(CHAP(
+        element_id=element_id,
+        start_time=int(chapter["start_time"] * 1000),
+        end_time=int(chapter["end_time"] * 1000),
+        sub_frames=[TIT2(encoding=3, text=chapter.get("title") or element_id)],
+      ))
+
+  if cover:
+    mime, data = cover
+    id3.setall("APIC", [APIC(encoding=3, mime=mime, type=3, desc="Cover", data=data)])
+
+  # v2.3 like yt-dlp's EmbedThumbnail (Windows), plus ID3v1 like FFmpegMetadata
+  id3.save(path, v1=2, v2_version=3)
+
+
+def _write_mp4(path, tags, cover):
+  from mutagen.mp4 import MP4, MP4Cover, MP4FreeForm
+
+  audio = MP4(path)
+  if audio.tags is None:
+    audio.add_tags()
+  for name, value in tags.items():
+    if name in ("track", "disc"):
+      pair = _number_pair(value)
+      if pair:
+        audio.tags["trkn" if name == "track" else "disk"] = [pair]
+    elif name == "season_number" and value.isdigit():
+      audio.tags["tvsn"] = [int(value)]
+    elif name == "episode_sort" and value.isdigit():
+      audio.tags["tves"] = [int(value)]
+    elif name in MP4_ATOMS:
+      audio.tags[MP4_ATOMS[name]] = [value]
+    else:
+      audio.tags[f"----:com.apple.iTunes:{name}"] = [MP4FreeForm(value.encode("utf-8"))]
+  if cover:
+    mime, data = cover
+    image_format = MP4Cover.FORMAT_PNG if mime == "image/png" else MP4Cover.FORMAT_JPEG
+    audio.tags["covr"] = [MP4Cover(data, imageformat=image_format)]
+  audio.save()
+
+
+def _vorbis_time(seconds):
+  hours, rest = divmod(seconds, 3600)
+  minutes, seconds = divmod(rest, 60)
+  return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def _write_vorbis(path, tags, chapters, cover):
+  import mutagen
+  from mutagen.flac import FLAC, Picture
+
+  audio = mutagen.File(path)
+  if audio is None:
+    raise ValueError("unknown Ogg/FLAC stream")
+  if audio.tags is None:
+    audio.add_tags()
+  for name, value in tags.items():
+    audio.tags[VORBIS_NAMES.get(name, name.upper())] = [value]
+
+  if chapters:
+    for key in [key for key in audio.tags.keys() if key.upper().startswith("CHAPTER")]:
+      del audio.tags[key]
+    for i, chapter in enumerate(chapters, 1):
+      audio.tags[f"CHAPTER{i:03d}"] = [_vorbis_time(chapter["start_time"])]
+      if chapter.get("title"):
+        audio.tags[f"CHAPTER{i:03d}NAME"] = [chapter["title"]]
+
+  if cover:
+    picture = Picture()
+    picture.type = 3
+    picture.desc = "Cover"
+    picture.mime, picture.data = cover
+    if isinstance(audio, FLAC):
+      audio.clear_pictures()
+      audio.add_picture(picture)
+    else:
+      audio.tags["METADATA_BLOCK_PICTURE"] = [base64.b64encode(picture.write()).decode("ascii")]
+  audio.save()
+
+
+def _tag_pp():
+  from yt_dlp.postprocessor.common import PostProcessor
+  from yt_dlp.postprocessor.embedthumbnail import EmbedThumbnailPP
+  from yt_dlp.postprocessor.ffmpeg import FFmpegMetadataPP, FFmpegThumbnailsConvertorPP
+
+  class TagPP(PostProcessor):
+    """
+    Write tags, chapters and the cover of an audio file in place.
+
+    Args:
+      metadata (bool): write tags and chapters
+      cover (bool): embed the last downloaded thumbnail
+    """
+
+    def __init__(self, downloader=None, metadata=True, cover=True):
+      super().__init__(downloader)
+      self.metadata = metadata
+      self.cover = cover
+
+    @classmethod
+    def pp_key(cls):
+      return KEY
+
+    def _tags(self, info):
+      """The common tags FFmpegMetadata would write, as {name: value}."""
+      tags = {}
+      for opt in FFmpegMetadataPP(self._downloader)._get_metadata_opts(info):
+        if opt[0] == "-metadata":
+          name, _, value = opt[1].partition("=")
+          tags[name] = _iso_date(value) if name == "date" else value
+      return tags
+
+    def _chapters(self, info):
+      chapters = [c for c in info.get("chapters") or [] if c.get("start_time") is not None]
+      if chapters and not chapters[-1].get("end_time"):
+        chapters[-1]["end_time"] = info.get("duration") or chapters[-1]["start_time"]
+      return chapters
+
+    def _cover(self, info, ext):
+      """(mime type, image data) of the last downloaded thumbnail and its path, or (None, None)."""
+      thumbnails = info.get("thumbnails") or []
+      idx = next((-i for i, t in enumerate(thumbnails[::-1], 1) if t.get("filepath")), None)
+      if idx is None or not os.path.exists(thumbnails[idx]["filepath"]):
+        self.report_warning("Skipping the cover, the thumbnail file is missing")
+        return None, None
+      convertor = FFmpegThumbnailsConvertorPP(self._downloader)
+      convertor.fixup_webp(info, idx)
+      path = thumbnails[idx]["filepath"]
+      image_ext = os.path.splitext(path)[1][1:].lower().replace("jpeg", "jpg")
+      if ext in MP4_EXTS and image_ext not in ("jpg", "png"):
+        # 'covr' holds jpeg or png only
+        converted = convertor.convert_thumbnail(path, "png")
+        self._delete_downloaded_files(path, info=info)
+        thumbnails[idx]["filepath"] = path = converted
+        image_ext = "png"
+      with open(path, "rb") as f:
+        data = f.read()
+      return (f"image/{image_ext.replace('jpg', 'jpeg')}", data), path
+
+    def _ffmpeg(self, info, metadata, cover):
+      """yt-dlp's ffmpeg postprocessors, for what mutagen can't write."""
+      if metadata:
+        _, info = FFmpegMetadataPP(self._downloader, add_metadata=True, add_chapters=True).run(info)
+      if cover:
+        files, info = EmbedThumbnailPP(self._downloader).run(info)
+        self._delete_downloaded_files(*files, info=info)
+      return info
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+      path, ext = info["filepath"], info["ext"].lower()
+      if ext not in ID3_EXTS + MP4_EXTS + VORBIS_EXTS:
+        if self.cover:
+          self.report_warning(f"A cover can't be embedded in {ext} files")
+        if self.metadata:
+          self.to_screen(f"{ext} has no mutagen tag format, using ffmpeg")
+        return [], self._ffmpeg(info, self.metadata, False)
+
+      tags = self._tags(info) if self.metadata else {}
+      chapters = self._chapters(info) if self.metadata else []
+      if chapters and ext in MP4_EXTS:
+        # mutagen can't write MP4 chapters: tags and chapters with ffmpeg, the cover in place
+        info = self._ffmpeg(info, True, False)
+        tags, chapters = {}, []
+      cover, cover_path = self._cover(info, ext) if self.cover else (None, None)
+      if not (tags or chapters or cover):
+        return [], info
+
+      self.to_screen(f'Tagging "{path}"' + (" (with cover)" if cover else ""))
+      try:
+        if ext in ID3_EXTS:
+          _write_id3(path, tags, chapters, cover)
+        elif ext in MP4_EXTS:
+          _write_mp4(path, tags, cover)
+        else:
+          _write_vorbis(path, tags, chapters, cover)
+      except Exception as e:
+        self.report_warning(f"Unable to tag with mutagen ({e}), using ffmpeg")
+        return [], self._ffmpeg(info, bool(tags or chapters), bool(cover))
+
+      if cover_path:
+        self._delete_downloaded_files(cover_path, info=info)
+      return [], info
+
+  return TagPP